@@ -16,6 +16,8 @@ from discord.ext import commands
 from config import Emojis, PET_DEFINITIONS, PET_EMOJIS, QUERY_TIMEOUT_SECONDS, scale_pet_value
 from database.db import DatabaseError
 from utils import embeds
+from utils.cache import cache_stats
+from utils.keyed_lock import keyed_lock_stats
 
 logger = logging.getLogger(__name__)
 
@@ -403,6 +405,7 @@ class Admin(commands.Cog):
     async def reset_user(self, ctx: commands.Context, user: discord.Member) -> None:
         """Admin: Réinitialiser un utilisateur."""
 
+        self.database.forget_user(user.id)
         await self.database.ensure_user(user.id)
         balance = await self.database.fetch_balance(user.id)
         if balance > 0:
@@ -417,6 +420,8 @@ class Admin(commands.Cog):
             await connection.execute("DELETE FROM user_pets WHERE user_id = $1", user.id)
             await connection.execute("DELETE FROM pet_openings WHERE user_id = $1", user.id)
             await connection.execute("UPDATE users SET last_daily = NULL, pet_last_claim = NULL WHERE user_id = $1", user.id)
+            await self.database.refresh_user_rap_totals([user.id], connection=connection)
+            await self.database.reset_pet_index(user.id, connection=connection)
 
         await self.database.reset_user_grade(user.id)
 
@@ -569,6 +574,70 @@ class Admin(commands.Cog):
             f"Richesse totale : **{embeds.format_currency(int(stats['total_balance']))}**"
         )
         embed = embeds.info_embed(description, title="Statistiques base de données")
+        cache_lines = [
+            f"`{stats.name}` : {stats.size}/{stats.max_entries} · "
+            f"{stats.hits} hits / {stats.misses} miss ({stats.hit_ratio:.0%}) · "
+            f"{stats.evictions} évincées · {stats.expirations} expirées"
+            for stats in cache_stats()
+        ]
+        if cache_lines:
+            embed.add_field(name="Caches", value="\n".join(cache_lines)[:1024], inline=False)
+        lock_lines = [
+            f"`{stats.name}` : {stats.active_keys} clés · {stats.waiting} en attente · "
+            f"{stats.contended}/{stats.acquisitions} contestées · "
+            f"attente max {stats.max_wait_seconds * 1000:.0f} ms"
+            for stats in keyed_lock_stats()
+        ]
+        if lock_lines:
+            embed.add_field(name="Verrous", value="\n".join(lock_lines)[:1024], inline=False)
+        pool_lines = [
+            f"`{lane}` : {int(stats['size'])}/{int(stats['max'])} connexions · "
+            f"{int(stats['idle'])} libres · {int(stats['waiting'])} en attente · "
+            f"attente p95 {stats['acquire_wait_p95_seconds'] * 1000:.0f} ms / "
+            f"max {stats['acquire_wait_max_seconds'] * 1000:.0f} ms"
+            for lane, stats in (self.database.pool_stats() or {}).items()
+        ]
+        if pool_lines:
+            embed.add_field(name="Pools", value="\n".join(pool_lines)[:1024], inline=False)
+        query_lines = [
+            f"`{entry['label']}` : {entry['calls']} appels · "
+            f"p50 {entry['p50'] * 1000:.0f} ms / p95 {entry['p95'] * 1000:.0f} ms / "
+            f"p99 {entry['p99'] * 1000:.0f} ms · {entry['errors']} erreurs"
+            for entry in self.database.query_metrics.snapshot()[:8]
+        ]
+        if query_lines:
+            embed.add_field(
+                name="Requêtes SQL (temps total décroissant)",
+                value="\n".join(query_lines)[:1024],
+                inline=False,
+            )
+        await ctx.send(embed=embed)
+
+    @commands.command(name="cmdstats")
+    @commands.is_owner()
+    async def command_stats(self, ctx: commands.Context) -> None:
+        """Admin: Durée et requêtes SQL par commande."""
+
+        metrics = getattr(self.bot, "command_metrics", None)
+        entries = metrics.snapshot()[:10] if metrics is not None else []
+        if not entries:
+            await ctx.send(embed=embeds.info_embed("Aucune commande mesurée pour le moment."))
+            return
+
+        lines = []
+        for entry in entries:
+            budget = f"/{entry['budget']}" if entry["budget"] else ""
+            lines.append(
+                f"`{entry['command']}` : {entry['calls']} appels · "
+                f"p50 {entry['p50'] * 1000:.0f} ms / p95 {entry['p95'] * 1000:.0f} ms\n"
+                f"  SQL {entry['statements_avg']:.1f} req. (max {entry['statements_max']}{budget}) · "
+                f"{entry['rows_avg']:.0f} lignes · attente pool "
+                f"{entry['acquire_seconds'] * 1000 / max(1, entry['calls']):.1f} ms · "
+                f"{entry['over_budget']} hors budget"
+            )
+        embed = embeds.info_embed(
+            "\n".join(lines)[:4000], title="Commandes (temps total décroissant)"
+        )
         await ctx.send(embed=embed)
 
     @commands.command(name="analytics")
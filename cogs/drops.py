@@ -19,6 +19,7 @@ from utils.enchantments import (
 )
 from utils.formatting import format_compact, format_currency
 from utils.pet_formatting import pet_emoji
+from utils.telemetry import mark_loop, traced_interaction
 
 logger = logging.getLogger(__name__)
 
@@ -163,6 +164,7 @@ class DropClaimView(discord.ui.View):
         raise DatabaseError("Type de drop inconnu")
 
     @discord.ui.button(label="Claim le drop", style=discord.ButtonStyle.success)
+    @traced_interaction("drop.claim")
     async def claim(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
         if self.claimed_by is not None:
             await interaction.response.send_message(
@@ -237,6 +239,7 @@ class Drops(commands.Cog):
 
     @tasks.loop(seconds=1)
     async def _drop_loop(self) -> None:
+        mark_loop("drops")
         if random.random() > DROP_CHANCE:
             return
         channel = await self._get_drop_channel()
@@ -6,7 +6,6 @@ import contextlib
 import logging
 import random
 import time
-from weakref import WeakValueDictionary
 from collections import Counter
 from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, timezone
@@ -31,6 +30,7 @@ from config import (
     DAILY_REWARD,
     DAILY_STREAK_TOLERANCE,
     CACHE_TTL_INVENTORY,
+    CACHE_USER_MAX_ENTRIES,
     DEBUG_CACHE,
     INVENTORY_ENCHANTMENTS_PAGE_SIZE,
     INVENTORY_PETS_PAGE_SIZE,
@@ -68,6 +68,7 @@ from config import (
 )
 from utils import embeds
 from utils.cache import TTLCache
+from database import invalidation
 from database.db import (
     Database,
     DatabaseError,
@@ -86,6 +87,7 @@ from utils.enchantments import (
     get_enchantment_emoji,
 )
 from utils.pet_formatting import PetDisplay
+from utils.telemetry import mark_loop
 
 logger = logging.getLogger(__name__)
 
@@ -1858,11 +1860,10 @@ class Economy(commands.Cog):
         self._cleanup_task: asyncio.Task[None] | None = None
         self.mastermind_helper = MASTERMIND_HELPER
         self._active_race_players: set[int] = set()
-        self._message_reward_locks: WeakValueDictionary[int, asyncio.Lock] = (
-            WeakValueDictionary()
+        self._inventory_cache = TTLCache[InventorySnapshot](
+            CACHE_TTL_INVENTORY, CACHE_USER_MAX_ENTRIES, name="economy.inventory"
         )
-        self._message_reward_lock_guard = asyncio.Lock()
-        self._inventory_cache = TTLCache[InventorySnapshot](CACHE_TTL_INVENTORY)
+        self._unsubscribe_inventory_cache: Callable[[], None] | None = None
         # FIX: Manage Mastermind cooldown manually to support grade-based bypass.
         self._mastermind_cooldown = commands.CooldownMapping.from_cooldown(
             1, MASTERMIND_CONFIG.cooldown, commands.BucketType.user
@@ -1874,6 +1875,10 @@ class Economy(commands.Cog):
         self._last_raffle_draw: datetime | None = None
 
     async def cog_load(self) -> None:
+        self._unsubscribe_inventory_cache = self.database.invalidation_bus.subscribe_cache(
+            self._inventory_cache,
+            (invalidation.BALANCE, invalidation.GEMS, invalidation.MARKET, *invalidation.INVENTORY),
+        )
         self._cleanup_task = asyncio.create_task(self._cleanup_loop())
         now = datetime.now(timezone.utc)
         try:
@@ -1895,6 +1900,9 @@ class Economy(commands.Cog):
         logger.info("Cog Economy chargé")
 
     async def cog_unload(self) -> None:
+        if self._unsubscribe_inventory_cache is not None:
+            self._unsubscribe_inventory_cache()
+            self._unsubscribe_inventory_cache = None
         if self._cleanup_task:
             self._cleanup_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
@@ -2401,14 +2409,6 @@ class Economy(commands.Cog):
     # ------------------------------------------------------------------
     # Récompenses de messages
     # ------------------------------------------------------------------
-    async def _get_message_reward_lock(self, user_id: int) -> asyncio.Lock:
-        async with self._message_reward_lock_guard:
-            lock = self._message_reward_locks.get(user_id)
-            if lock is None:
-                lock = asyncio.Lock()
-                self._message_reward_locks[user_id] = lock
-            return lock
-
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
         if message.author.bot or not message.guild:
@@ -2416,18 +2416,11 @@ class Economy(commands.Cog):
         if not message.content.strip():
             return
 
-        lock = await self._get_message_reward_lock(message.author.id)
-        async with lock:
-            remaining = await self.message_cooldown.check_and_trigger(message.author.id)
-            if remaining > 0:
-                return
-            await self.database.ensure_user(message.author.id)
-            await self.database.increment_balance(
-                message.author.id,
-                MESSAGE_REWARD,
-                transaction_type="message_reward",
-                description=f"Récompense de message {message.channel.id}:{message.id}",
-            )
+        remaining = await self.message_cooldown.check_and_trigger(message.author.id)
+        if remaining > 0:
+            return
+        # Crédit différé : le tampon partagé l'écrit en base par lots.
+        self.bot.message_ingest.add_reward(message.author.id, MESSAGE_REWARD)
 
     # ------------------------------------------------------------------
     # Commandes économie
@@ -2454,6 +2447,7 @@ class Economy(commands.Cog):
         if cached is not None:
             snapshot = cached
         else:
+            generation = self._inventory_cache.generation()
             try:
                 snapshot = await InventorySnapshot.build(self.database, ctx.author.id)
             except Exception:
@@ -2464,7 +2458,7 @@ class Economy(commands.Cog):
                     )
                 )
                 return
-            self._inventory_cache.set(ctx.author.id, snapshot)
+            self._inventory_cache.set(ctx.author.id, snapshot, generation=generation)
             if DEBUG_CACHE:
                 logger.debug("Cache inventaire mis à jour", extra={"user_id": ctx.author.id})
         view = InventoryView(ctx, snapshot)
@@ -3176,6 +3170,12 @@ class Economy(commands.Cog):
 
     @tasks.loop(seconds=KOTH_ROLL_INTERVAL)
     async def koth_reward_loop(self) -> None:
+        mark_loop("koth")
+        # Tâche de fond : elle ne doit pas concurrencer les commandes pour le pool.
+        with self.database.background():
+            await self._roll_koth_rewards()
+
+    async def _roll_koth_rewards(self) -> None:
         try:
             states = await self.database.get_all_koth_states()
         except Exception:
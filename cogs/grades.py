@@ -4,7 +4,7 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import logging
-from typing import Mapping, Optional
+from typing import Callable, Mapping, Optional
 from datetime import datetime, timezone
 
 import discord
@@ -13,6 +13,7 @@ from discord.ext import commands
 from config import (
     BASE_PET_SLOTS,
     CACHE_TTL_PROFILE,
+    CACHE_USER_MAX_ENTRIES,
     DAILY_COOLDOWN,
     DAILY_GEMS_BASE,
     DAILY_GEMS_CAP,
@@ -28,6 +29,7 @@ from config import (
     QUEST_WEEKLY_RESET_WEEKDAY,
     QUEST_WEEKLY_RESET_HOUR,
 )
+from database import invalidation
 from database.db import DatabaseError
 from utils import embeds
 from utils.cache import TTLCache
@@ -44,7 +46,10 @@ class GradeSystem(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
         self.database = bot.database
-        self._profile_cache = TTLCache[dict[str, object]](CACHE_TTL_PROFILE)
+        self._profile_cache = TTLCache[dict[str, object]](
+            CACHE_TTL_PROFILE, CACHE_USER_MAX_ENTRIES, name="grades.profile"
+        )
+        self._unsubscribe_profile_cache: Callable[[], None] | None = None
 
     class RebirthConfirmView(discord.ui.View):
         def __init__(self, author_id: int) -> None:
@@ -85,8 +90,17 @@ class GradeSystem(commands.Cog):
         return len(GRADE_DEFINITIONS)
 
     async def cog_load(self) -> None:
+        self._unsubscribe_profile_cache = self.database.invalidation_bus.subscribe_cache(
+            self._profile_cache,
+            (invalidation.GRADE, invalidation.DAILY, invalidation.PETS, invalidation.MARKET),
+        )
         logger.info("Cog Grades chargé")
 
+    async def cog_unload(self) -> None:
+        if self._unsubscribe_profile_cache is not None:
+            self._unsubscribe_profile_cache()
+            self._unsubscribe_profile_cache = None
+
     async def _ack_heavy_command(self, ctx: commands.Context) -> None:
         interaction = getattr(ctx, "interaction", None)
         if interaction is not None and not interaction.response.is_done():
@@ -103,6 +117,7 @@ class GradeSystem(commands.Cog):
         cached = self._profile_cache.get(user_id)
         if cached is not None:
             return cached
+        generation = self._profile_cache.generation()
         try:
             grade_row, rap_total, daily_state = await asyncio.gather(
                 self.database.get_user_grade(user_id),
@@ -119,7 +134,7 @@ class GradeSystem(commands.Cog):
             "last_daily": last_daily,
             "daily_streak": daily_streak,
         }
-        self._profile_cache.set(user_id, snapshot)
+        self._profile_cache.set(user_id, snapshot, generation=generation)
         if DEBUG_CACHE:
             logger.debug("Cache profil mis à jour", extra={"user_id": user_id})
         return snapshot
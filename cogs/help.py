@@ -239,8 +239,8 @@ _HELP_SECTION_BLUEPRINTS: Dict[str, Tuple[dict[str, object], ...]] = {
             "description": "Tout pour gérer ton armée de pets.",
             "commands": (
                 {
-                    "command": f"{PREFIX}openbox [œuf]",
-                    "description": "Ouvre un œuf pour obtenir un nouveau pet.",
+                    "command": f"{PREFIX}openbox [œuf] [x10|x50|x100]",
+                    "description": "Ouvre un œuf pour obtenir un nouveau pet, ou plusieurs d'un coup.",
                 },
                 {
                     "command": f"{PREFIX}eggs",
@@ -519,8 +519,8 @@ _HELP_SECTION_BLUEPRINTS: Dict[str, Tuple[dict[str, object], ...]] = {
             "description": "Everything you need to manage your pet army.",
             "commands": (
                 {
-                    "command": f"{PREFIX}openbox [egg]",
-                    "description": "Open an egg to obtain a new pet.",
+                    "command": f"{PREFIX}openbox [egg] [x10|x50|x100]",
+                    "description": "Open an egg to obtain a new pet, or several at once.",
                 },
                 {
                     "command": f"{PREFIX}eggs",
@@ -19,6 +19,7 @@ from config import (
 from database.db import DatabaseError
 from utils.mastery import EGG_MASTERY, MASTERMIND_MASTERY, PET_MASTERY, MasteryDefinition
 from utils import embeds
+from utils.telemetry import mark_loop
 
 logger = logging.getLogger(__name__)
 
@@ -167,7 +168,9 @@ class Leaderboard(commands.Cog):
 
     @tasks.loop(minutes=TOP_PB_ROLE_REFRESH_MINUTES)
     async def _top_pb_role_loop(self) -> None:
-        await self._refresh_top_pb_roles()
+        mark_loop("top_pb_roles")
+        with self.database.background():
+            await self._refresh_top_pb_roles()
 
     @_top_pb_role_loop.before_loop
     async def _before_top_pb_role_loop(self) -> None:
@@ -0,0 +1,108 @@
+"""Distribution des messages attendus par les sessions interactives."""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+WaiterKey = Tuple[int, Optional[int]]
+
+
+class MessageRouter(commands.Cog):
+    """Réveille les attentes de message indexées par joueur (et salon).
+
+    ``bot.wait_for("message", check=...)`` évalue chaque ``check`` en attente
+    pour chaque message reçu : le coût croît avec le nombre de sessions. Ici,
+    un message coûte au plus deux recherches dans un dictionnaire, quel que
+    soit le nombre d'attentes.
+    """
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self._waiters: Dict[WaiterKey, List[asyncio.Future[discord.Message]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(futures) for futures in self._waiters.values())
+
+    async def wait_for_user_message(
+        self,
+        user_id: int,
+        *,
+        channel_id: int | None = None,
+        timeout: float | None = None,
+    ) -> discord.Message:
+        """Attend le prochain message de ``user_id`` (dans ``channel_id`` si fourni).
+
+        Lève :class:`asyncio.TimeoutError` après ``timeout`` secondes.
+        """
+
+        key: WaiterKey = (int(user_id), int(channel_id) if channel_id is not None else None)
+        future: asyncio.Future[discord.Message] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            futures = self._waiters.get(key)
+            if futures is not None:
+                if future in futures:
+                    futures.remove(future)
+                if not futures:
+                    self._waiters.pop(key, None)
+
+    def dispatch(self, message: discord.Message) -> int:
+        """Remet ``message`` aux attentes concernées et renvoie leur nombre."""
+
+        if not self._waiters or message.author.bot:
+            return 0
+        author_id = message.author.id
+        delivered = 0
+        for key in ((author_id, message.channel.id), (author_id, None)):
+            futures = self._waiters.pop(key, None)
+            if not futures:
+                continue
+            for future in futures:
+                if not future.done():
+                    future.set_result(message)
+                    delivered += 1
+        return delivered
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        self.dispatch(message)
+
+    async def cog_unload(self) -> None:
+        waiters = [future for futures in self._waiters.values() for future in futures]
+        self._waiters.clear()
+        for future in waiters:
+            future.cancel()
+
+
+async def wait_for_user_message(
+    bot: commands.Bot,
+    user_id: int,
+    *,
+    channel_id: int | None = None,
+    timeout: float | None = None,
+) -> discord.Message:
+    """Passe par :class:`MessageRouter` s'il est chargé, sinon par ``bot.wait_for``."""
+
+    router = bot.get_cog("MessageRouter")
+    if isinstance(router, MessageRouter):
+        return await router.wait_for_user_message(
+            user_id, channel_id=channel_id, timeout=timeout
+        )
+
+    def _check(message: discord.Message) -> bool:
+        return (
+            message.author.id == user_id
+            and not message.author.bot
+            and (channel_id is None or message.channel.id == channel_id)
+        )
+
+    return await bot.wait_for("message", check=_check, timeout=timeout)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(MessageRouter(bot))
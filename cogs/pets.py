@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import asyncio
-from collections import OrderedDict
+from collections import OrderedDict, deque
 import contextlib
 import logging
 import math
@@ -11,12 +11,15 @@ import unicodedata
 from decimal import Decimal, ROUND_HALF_UP
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Final, Iterable, List, Mapping, Optional, Sequence, Set
+from typing import Any, Callable, Deque, Dict, Final, Iterable, List, Mapping, Optional, Sequence, Set
 
 import discord
 from discord.ext import commands
 
 from config import (
+    AUTO_HATCH_BATCH_INTERVAL_SECONDS,
+    AUTO_HATCH_BATCH_SIZE,
+    AUTO_HATCH_SUMMARY_INTERVAL_SECONDS,
     BASE_PET_SLOTS,
     MEXICO_ZONE_SLUG,
     DEFAULT_PET_EGG_SLUG,
@@ -78,6 +81,7 @@ from config import (
     FUSION_COST_RARITY_MULTIPLIERS,
     PETS_PAGE_SIZE,
     CACHE_TTL_PETS,
+    CACHE_USER_MAX_ENTRIES,
     DEBUG_CACHE,
     STEAL_PROTECTED_ROLE_ID,
     VOICE_XP_ROLE_ID,
@@ -97,6 +101,10 @@ from config import (
 from utils import embeds
 from utils.cache import TTLCache
 from utils.pet_formatting import PetDisplay, pet_emoji
+from utils.keyed_lock import KeyedLock
+from utils.sampling import BoostedSampler
+from utils.telemetry import traced_interaction
+from cogs.message_router import wait_for_user_message
 from cogs.economy import (
     CASINO_HUGE_CHANCE_PER_PB,
     CASINO_HUGE_MAX_CHANCE,
@@ -113,7 +121,9 @@ from utils.mastery import (
     MasteryDefinition,
     iter_masteries,
 )
+from database import invalidation
 from database.db import ActivePetLimitError, DatabaseError, InsufficientBalanceError
+from database.pet_index import PetIndex
 from utils.enchantments import (
     compute_egg_luck_bonus,
     get_source_label,
@@ -140,6 +150,21 @@ INDEX_SHINY_BONUS_PER_PET: Final[float] = 0.0005
 GOLD_MASTERY_POINTS: Final[int] = 10
 RAINBOW_MASTERY_POINTS: Final[int] = 100
 GALAXY_MASTERY_POINTS: Final[int] = 10_000
+BULK_HATCH_COUNTS: Final[frozenset[int]] = frozenset({10, 50, 100})
+AUTO_HATCH_MAX_HIGHLIGHTS: Final[int] = 8
+AUTO_HATCH_HIGHLIGHT_RARITY: Final[int] = PET_RARITY_ORDER["Épique"]
+
+
+def _compile_egg_sampler(egg: PetEggDefinition) -> BoostedSampler[PetDefinition]:
+    """Tables d'alias d'un œuf ; la chance multiplie le tiers le plus rare."""
+
+    pets = egg.pets
+    by_rarity = sorted(
+        range(len(pets)),
+        key=lambda idx: (pets[idx].drop_rate, -pets[idx].base_income_per_hour),
+    )
+    rare_count = max(1, len(by_rarity) // 3)
+    return BoostedSampler(pets, [pet.drop_rate for pet in pets], by_rarity[:rare_count])
 
 
 
@@ -528,6 +553,109 @@ class PetHatchResult:
     was_forced_gold: bool = False
 
 
+@dataclass
+class HatchModifiers:
+    """Bonus du joueur chargés une fois avant une ou plusieurs ouvertures."""
+
+    egg_mastery_level: int
+    pet_mastery_level: int
+    egg_perks: EggMasteryPerks
+    pet_perks: PetMasteryPerks
+    clan_shiny_multiplier: float
+    index_unique: int
+    index_bonus: float
+    rebirth_count: int
+    active_potion: tuple[PotionDefinition, datetime] | None
+    enchantments: Mapping[str, int]
+
+
+@dataclass
+class AutoHatchSummary:
+    """Compteurs agrégés d'une session AUTO, affichés dans un seul message."""
+
+    egg: PetEggDefinition
+    opened: int = 0
+    bonus: int = 0
+    spent: int = 0
+    rarities: Dict[str, int] = field(default_factory=dict)
+    variants: Dict[str, int] = field(
+        default_factory=lambda: {
+            "Huge": 0,
+            "Galaxy": 0,
+            "Rainbow": 0,
+            "Or": 0,
+            "Shiny": 0,
+        }
+    )
+    highlights: Deque[Dict[str, object]] = field(
+        default_factory=lambda: deque(maxlen=AUTO_HATCH_MAX_HIGHLIGHTS)
+    )
+    notes: Deque[str] = field(default_factory=lambda: deque(maxlen=3))
+
+    @staticmethod
+    def is_highlight(result: PetHatchResult) -> bool:
+        return (
+            result.is_huge
+            or result.is_galaxy
+            or result.is_rainbow
+            or result.is_shiny
+            or PET_RARITY_ORDER.get(result.definition.rarity, -1)
+            >= AUTO_HATCH_HIGHLIGHT_RARITY
+        )
+
+    def record(self, results: Sequence[PetHatchResult], spent: int) -> None:
+        self.spent += max(0, int(spent))
+        for result in results:
+            self.opened += 1
+            if result.bonus:
+                self.bonus += 1
+            rarity = result.definition.rarity
+            self.rarities[rarity] = self.rarities.get(rarity, 0) + 1
+            if result.is_huge:
+                self.variants["Huge"] += 1
+            if result.is_galaxy:
+                self.variants["Galaxy"] += 1
+            elif result.is_rainbow:
+                self.variants["Rainbow"] += 1
+            elif result.is_gold:
+                self.variants["Or"] += 1
+            if result.is_shiny:
+                self.variants["Shiny"] += 1
+            if self.is_highlight(result):
+                self.highlights.appendleft(
+                    {
+                        "name": result.definition.name,
+                        "rarity": result.definition.rarity,
+                        "income_per_hour": result.income_per_hour,
+                        "is_huge": result.is_huge,
+                        "is_gold": result.is_gold,
+                        "is_rainbow": result.is_rainbow,
+                        "is_galaxy": result.is_galaxy,
+                        "is_shiny": result.is_shiny,
+                    }
+                )
+            self.notes.extend(result.auto_messages)
+
+    def embed(self, *, running: bool, stop_reason: str | None = None) -> discord.Embed:
+        spent_text = (
+            embeds.format_gems(self.spent)
+            if self.egg.currency == "gem"
+            else embeds.format_currency(self.spent)
+        )
+        return embeds.auto_hatch_summary_embed(
+            egg_name=self.egg.name,
+            opened=self.opened,
+            bonus=self.bonus,
+            spent_text=spent_text,
+            rarity_counts=self.rarities,
+            variant_counts=self.variants,
+            highlights=list(self.highlights),
+            running=running,
+            notes=list(self.notes),
+            stop_reason=stop_reason,
+        )
+
+
 class PetInventoryView(discord.ui.View):
     """Interface paginée pour afficher la collection de pets par lots de huit."""
 
@@ -799,6 +927,7 @@ class HatchReplayView(discord.ui.View):
         return True
 
     @discord.ui.button(label="Encore!", style=discord.ButtonStyle.success)
+    @traced_interaction("openbox.replay")
     async def replay(
         self, interaction: discord.Interaction, button: discord.ui.Button
     ) -> None:
@@ -806,6 +935,7 @@ class HatchReplayView(discord.ui.View):
         await self.pets_cog._openbox_impl(self.ctx, self.egg_slug)
 
     @discord.ui.button(label="AUTO", style=discord.ButtonStyle.primary)
+    @traced_interaction("openbox.auto")
     async def auto_open(
         self, interaction: discord.Interaction, button: discord.ui.Button
     ) -> None:
@@ -824,6 +954,42 @@ class HatchReplayView(discord.ui.View):
                 await self.message.edit(view=self)
 
 
+class BulkHatchConfirmView(discord.ui.View):
+    def __init__(self, author_id: int) -> None:
+        super().__init__(timeout=60)
+        self.author_id = int(author_id)
+        self.value: Optional[bool] = None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                "Seul l'acheteur peut confirmer cette ouverture.",
+                ephemeral=True,
+            )
+            return False
+        return True
+
+    @discord.ui.button(label="Ouvrir", style=discord.ButtonStyle.success)
+    async def confirm(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ) -> None:
+        self.value = True
+        for child in self.children:
+            child.disabled = True
+        await interaction.response.edit_message(view=self)
+        self.stop()
+
+    @discord.ui.button(label="Annuler", style=discord.ButtonStyle.secondary)
+    async def cancel(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ) -> None:
+        self.value = False
+        for child in self.children:
+            child.disabled = True
+        await interaction.response.edit_message(view=self)
+        self.stop()
+
+
 class PetIndexView(discord.ui.View):
     @dataclass(frozen=True)
     class CategoryDefinition:
@@ -1542,11 +1708,17 @@ class Pets(commands.Cog):
                     self._egg_lookup[variant] = egg.slug
         if self._default_egg_slug:
             self._egg_lookup.setdefault(self._default_egg_slug, self._default_egg_slug)
-        self._egg_open_locks: Dict[int, asyncio.Lock] = {}
-        self._claim_locks: Dict[int, asyncio.Lock] = {}
+        self._egg_samplers: Dict[str, BoostedSampler[PetDefinition]] = {
+            slug: _compile_egg_sampler(egg) for slug, egg in self._eggs.items() if egg.pets
+        }
+        self._egg_open_locks = KeyedLock("pets.open")
+        self._claim_locks = KeyedLock("pets.claim")
         self._last_clock_sample = datetime.now(timezone.utc)
         self._auto_hatch_tasks: Dict[int, asyncio.Task] = {}
-        self._pets_cache = TTLCache[tuple[Sequence[Mapping[str, object]], Mapping[int, int]]](CACHE_TTL_PETS)
+        self._pets_cache = TTLCache[tuple[Sequence[Mapping[str, object]], Mapping[int, int]]](
+            CACHE_TTL_PETS, CACHE_USER_MAX_ENTRIES, name="pets.owned"
+        )
+        self._unsubscribe_pets_cache: Callable[[], None] | None = None
 
     @staticmethod
     def _normalize_pet_key(value: str) -> str:
@@ -1670,8 +1842,8 @@ class Pets(commands.Cog):
         return max(0, int(unique_count)) * INDEX_SHINY_BONUS_PER_PET
 
     async def _fetch_index_shiny_bonus(self, user_id: int) -> tuple[int, float]:
-        unique_count = await self.database.get_unique_pet_count(user_id)
-        return unique_count, self._index_bonus_from_count(unique_count)
+        index = await self.database.get_pet_index(user_id)
+        return index.unique_count, self._index_bonus_from_count(index.unique_count)
 
     @staticmethod
     def _variant_income_multiplier(
@@ -1777,13 +1949,6 @@ class Pets(commands.Cog):
             return False
         return None
 
-    def _get_open_lock(self, user_id: int) -> asyncio.Lock:
-        lock = self._egg_open_locks.get(user_id)
-        if lock is None:
-            lock = asyncio.Lock()
-            self._egg_open_locks[user_id] = lock
-        return lock
-
     def _resolve_market_value(
         self,
         market_values: Mapping[tuple[int, str], int],
@@ -1842,10 +2007,18 @@ class Pets(commands.Cog):
         return 0
 
     async def cog_load(self) -> None:
+        self._unsubscribe_pets_cache = self.database.invalidation_bus.subscribe_cache(
+            self._pets_cache, (invalidation.PETS, invalidation.MARKET)
+        )
         self._pet_ids = await self.database.sync_pets(self._definitions)
         self._definition_by_id = {pet_id: self._definition_by_name[name] for name, pet_id in self._pet_ids.items()}
         logger.info("Catalogue de pets synchronisé (%d entrées)", len(self._definition_by_id))
 
+    async def cog_unload(self) -> None:
+        if self._unsubscribe_pets_cache is not None:
+            self._unsubscribe_pets_cache()
+            self._unsubscribe_pets_cache = None
+
     async def _resync_pets(self) -> None:
         self._pet_ids = await self.database.sync_pets(self._definitions)
         self._definition_by_id = {
@@ -1863,7 +2036,7 @@ class Pets(commands.Cog):
         if definition is None:
             return False
         try:
-            new_ids = await self.database.sync_pets([definition])
+            new_ids = await self.database.sync_pets([definition], full_catalog=False)
         except Exception:
             logger.exception(
                 "Impossible de synchroniser le pet manquant",
@@ -1885,23 +2058,17 @@ class Pets(commands.Cog):
     def _choose_pet(
         self, egg: PetEggDefinition, *, luck_bonus: float = 0.0
     ) -> tuple[PetDefinition, int]:
-        weights = [pet.drop_rate for pet in egg.pets]
-        if luck_bonus > 0 and egg.pets:
-            sorted_indices = sorted(
-                range(len(egg.pets)),
-                key=lambda idx: (
-                    egg.pets[idx].drop_rate,
-                    -egg.pets[idx].base_income_per_hour,
-                ),
-            )
-            rare_count = max(1, len(sorted_indices) // 3)
-            multiplier = 1.0 + float(luck_bonus)
-            for idx in sorted_indices[:rare_count]:
-                weights[idx] *= multiplier
-        pet = random.choices(egg.pets, weights=weights, k=1)[0]
+        multiplier = 1.0 + float(luck_bonus) if luck_bonus > 0 else 1.0
+        pet = self._egg_sampler(egg).draw(multiplier)
         pet_id = self._pet_ids[pet.name]
         return pet, pet_id
 
+    def _egg_sampler(self, egg: PetEggDefinition) -> BoostedSampler[PetDefinition]:
+        sampler = self._egg_samplers.get(egg.slug)
+        if sampler is None or sampler.items is not egg.pets:
+            sampler = self._egg_samplers[egg.slug] = _compile_egg_sampler(egg)
+        return sampler
+
     def _egg_showcase_image(self, egg: PetEggDefinition) -> str | None:
         if egg.image_url:
             return egg.image_url
@@ -2070,17 +2237,12 @@ class Pets(commands.Cog):
         data["base_income_per_hour"] = int(effective_income)
         return data
 
-    def _owned_pet_names(self, records: Iterable[Mapping[str, Any]]) -> Set[str]:
+    def _owned_pet_names(self, index: PetIndex) -> Set[str]:
         owned: Set[str] = set()
-        for record in records:
-            pet_id = int(record.get("pet_id", 0))
+        for pet_id in index.pet_ids():
             definition = self._definition_by_id.get(pet_id)
             if definition is not None:
                 owned.add(definition.name.casefold())
-                continue
-            raw_name = str(record.get("name", "")).strip()
-            if raw_name:
-                owned.add(raw_name.casefold())
         return owned
 
     async def _prepare_pet_data(
@@ -3023,62 +3185,17 @@ class Pets(commands.Cog):
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("Impossible d'envoyer l'alerte Huge Shelly", exc_info=exc)
 
-    async def _hatch_pet(
+    def _effective_egg_luck(
         self,
         ctx: commands.Context,
-        egg: PetEggDefinition,
         *,
-        mastery_perks: EggMasteryPerks | None = None,
-        pet_mastery_perks: PetMasteryPerks | None = None,
-        clan_shiny_multiplier: float = 1.0,
-        active_potion: tuple[PotionDefinition, datetime] | None = None,
-        rebirth_count: int = 0,
-        charge_cost: bool = True,
-        bonus: bool = False,
-        price_multiplier: int = 1,
-        force_gold: bool = False,
-        index_bonus: float = 0.0,
-    ) -> PetHatchResult | None:
-        await self.database.ensure_user(ctx.author.id)
-        if charge_cost:
-            effective_price = egg.price * max(1, int(price_multiplier))
-            if egg.currency == "gem":
-                balance = await self.database.fetch_gems(ctx.author.id)
-                if balance < effective_price:
-                    await ctx.send(
-                        embed=embeds.error_embed(
-                            f"Tu n'as pas assez de {Emojis.GEM}. Il t'en faut "
-                            f"**{embeds.format_gems(effective_price)}** pour acheter {egg.name}."
-                        )
-                    )
-                    return None
-
-                await self.database.increment_gems(
-                    ctx.author.id,
-                    -effective_price,
-                    transaction_type="pet_purchase",
-                    description=f"Achat de {egg.name}",
-                )
-            else:
-                balance = await self.database.fetch_balance(ctx.author.id)
-                if balance < effective_price:
-                    await ctx.send(
-                        embed=embeds.error_embed(
-                            "Tu n'as pas assez de PB. Il te faut "
-                            f"**{embeds.format_currency(effective_price)}** pour acheter {egg.name}."
-                        )
-                    )
-                    return None
-
-                await self.database.increment_balance(
-                    ctx.author.id,
-                    -effective_price,
-                    transaction_type="pet_purchase",
-                    description=f"Achat de {egg.name}",
-                )
-        enchantments = await self.database.get_enchantment_powers(ctx.author.id)
+        mastery_perks: EggMasteryPerks | None,
+        active_potion: tuple[PotionDefinition, datetime] | None,
+        rebirth_count: int,
+        enchantments: Mapping[str, int] | None,
+        frenzy_active: bool,
+    ) -> float:
         effective_luck_bonus = 0.0
-        frenzy_active = is_egg_frenzy_active()
         if mastery_perks:
             effective_luck_bonus += max(0.0, float(mastery_perks.luck_bonus))
         if active_potion:
@@ -3100,6 +3217,85 @@ class Pets(commands.Cog):
             role.id == EGG_LUCK_ROLE_ID for role in ctx.author.roles
         ):
             effective_luck_bonus += 0.10
+        return effective_luck_bonus
+
+    def _roll_hatch_variants(
+        self,
+        definition: PetDefinition,
+        *,
+        mastery_perks: EggMasteryPerks | None,
+        pet_mastery_perks: PetMasteryPerks | None,
+        clan_shiny_multiplier: float,
+        index_bonus: float,
+    ) -> tuple[bool, bool, bool, bool]:
+        if definition.is_huge:
+            return self._roll_huge_variants(index_bonus=index_bonus)
+        return self._roll_standard_pet_variants(
+            mastery_perks=mastery_perks,
+            pet_mastery_perks=pet_mastery_perks,
+            clan_shiny_multiplier=clan_shiny_multiplier,
+            index_bonus=index_bonus,
+        )
+
+    async def _load_hatch_modifiers(self, ctx: commands.Context) -> HatchModifiers:
+        egg_progress = await self.database.get_mastery_progress(
+            ctx.author.id, EGG_MASTERY.slug
+        )
+        egg_mastery_level = int(egg_progress.get("level", 1))
+        pet_progress = await self.database.get_mastery_progress(
+            ctx.author.id, PET_MASTERY.slug
+        )
+        pet_mastery_level = int(pet_progress.get("level", 1))
+
+        clan_row = await self.database.get_user_clan(ctx.author.id)
+        clan_shiny_multiplier = 1.0
+        if clan_row is not None:
+            clan_shiny_multiplier = max(
+                1.0, float(clan_row.get("shiny_luck_multiplier") or 1.0)
+            )
+
+        index_unique, index_bonus = await self._fetch_index_shiny_bonus(ctx.author.id)
+        return HatchModifiers(
+            egg_mastery_level=egg_mastery_level,
+            pet_mastery_level=pet_mastery_level,
+            egg_perks=_compute_egg_mastery_perks(egg_mastery_level),
+            pet_perks=_compute_pet_mastery_perks(pet_mastery_level),
+            clan_shiny_multiplier=clan_shiny_multiplier,
+            index_unique=index_unique,
+            index_bonus=index_bonus,
+            rebirth_count=await self.database.get_rebirth_count(ctx.author.id),
+            active_potion=await self.database.get_active_potion(ctx.author.id),
+            enchantments=await self.database.get_enchantment_powers(ctx.author.id),
+        )
+
+    async def _hatch_pet(
+        self,
+        ctx: commands.Context,
+        egg: PetEggDefinition,
+        *,
+        mastery_perks: EggMasteryPerks | None = None,
+        pet_mastery_perks: PetMasteryPerks | None = None,
+        clan_shiny_multiplier: float = 1.0,
+        active_potion: tuple[PotionDefinition, datetime] | None = None,
+        rebirth_count: int = 0,
+        charge_cost: bool = True,
+        bonus: bool = False,
+        price_multiplier: int = 1,
+        force_gold: bool = False,
+        index_bonus: float = 0.0,
+        enchantments: Mapping[str, int] | None = None,
+    ) -> PetHatchResult | None:
+        if enchantments is None:
+            enchantments = await self.database.get_enchantment_powers(ctx.author.id)
+        frenzy_active = is_egg_frenzy_active()
+        effective_luck_bonus = self._effective_egg_luck(
+            ctx,
+            mastery_perks=mastery_perks,
+            active_potion=active_potion,
+            rebirth_count=rebirth_count,
+            enchantments=enchantments,
+            frenzy_active=frenzy_active,
+        )
         pet_definition: PetDefinition | None = None
         pet_id: int | None = None
         last_missing_name = ""
@@ -3151,45 +3347,47 @@ class Pets(commands.Cog):
                 )
             )
             return None
-        is_gold = False
-        is_rainbow = False
-        is_galaxy = False
-        is_shiny = False
-        if pet_definition.is_huge:
-            (
-                is_gold,
-                is_rainbow,
-                is_galaxy,
-                is_shiny,
-            ) = self._roll_huge_variants(index_bonus=index_bonus)
-        else:
-            (
-                is_gold,
-                is_rainbow,
-                is_galaxy,
-                is_shiny,
-            ) = self._roll_standard_pet_variants(
-                mastery_perks=mastery_perks,
-                pet_mastery_perks=pet_mastery_perks,
-                clan_shiny_multiplier=clan_shiny_multiplier,
-                index_bonus=index_bonus,
-            )
+        is_gold, is_rainbow, is_galaxy, is_shiny = self._roll_hatch_variants(
+            pet_definition,
+            mastery_perks=mastery_perks,
+            pet_mastery_perks=pet_mastery_perks,
+            clan_shiny_multiplier=clan_shiny_multiplier,
+            index_bonus=index_bonus,
+        )
 
         if force_gold and not pet_definition.is_huge:
             is_rainbow = False
             is_galaxy = False
             is_gold = True
 
-        await self.database.add_user_pet(
-            ctx.author.id,
-            pet_id,
-            is_huge=pet_definition.is_huge,
-            is_gold=is_gold,
-            is_rainbow=is_rainbow,
-            is_galaxy=is_galaxy,
-            is_shiny=is_shiny,
-        )
-        await self.database.record_pet_opening(ctx.author.id, pet_id)
+        effective_price = egg.price * max(1, int(price_multiplier)) if charge_cost else 0
+        try:
+            outcome = await self.database.hatch_egg(
+                ctx.author.id,
+                pet_id,
+                is_huge=pet_definition.is_huge,
+                is_gold=is_gold,
+                is_rainbow=is_rainbow,
+                is_galaxy=is_galaxy,
+                is_shiny=is_shiny,
+                currency=egg.currency,
+                cost=effective_price,
+                mastery_slug=EGG_MASTERY.slug,
+                description=f"Achat de {egg.name}",
+            )
+        except InsufficientBalanceError:
+            if egg.currency == "gem":
+                message = (
+                    f"Tu n'as pas assez de {Emojis.GEM}. Il t'en faut "
+                    f"**{embeds.format_gems(effective_price)}** pour acheter {egg.name}."
+                )
+            else:
+                message = (
+                    "Tu n'as pas assez de PB. Il te faut "
+                    f"**{embeds.format_currency(effective_price)}** pour acheter {egg.name}."
+                )
+            await ctx.send(embed=embeds.error_embed(message))
+            return None
 
         auto_messages: List[str] = []
         if frenzy_active:
@@ -3252,10 +3450,7 @@ class Pets(commands.Cog):
         if pet_definition.name == HUGE_PET_NAME:
             await self._send_huge_shelly_alert(ctx)
 
-        mastery_update = await self.database.add_mastery_experience(
-            ctx.author.id, EGG_MASTERY.slug, 1
-        )
-        await self._handle_mastery_notifications(ctx, mastery_update)
+        await self._handle_mastery_notifications(ctx, outcome["mastery"])
 
         self._dispatch_grade_progress(ctx, "egg", 1)
         return PetHatchResult(
@@ -3272,6 +3467,212 @@ class Pets(commands.Cog):
             was_forced_gold=force_gold,
         )
 
+    async def _hatch_pets_bulk(
+        self,
+        ctx: commands.Context,
+        egg: PetEggDefinition,
+        count: int,
+        *,
+        mastery_perks: EggMasteryPerks | None = None,
+        pet_mastery_perks: PetMasteryPerks | None = None,
+        clan_shiny_multiplier: float = 1.0,
+        active_potion: tuple[PotionDefinition, datetime] | None = None,
+        rebirth_count: int = 0,
+        index_bonus: float = 0.0,
+        enchantments: Mapping[str, int] | None = None,
+        channel: discord.abc.Messageable | None = None,
+    ) -> tuple[List[PetHatchResult], int] | None:
+        """Ouvre ``count`` œufs payants d'un coup via :meth:`Database.hatch_eggs_bulk`.
+
+        Les tirages (œufs bonus de la maîtrise compris) sont faits en mémoire,
+        puis débit, insertions, compteurs d'ouverture et expérience de
+        maîtrise partent dans une seule transaction. Renvoie les résultats et
+        le solde restant dans la devise de l'œuf.
+        """
+
+        target_channel: discord.abc.Messageable = channel or ctx
+
+        count = max(1, int(count))
+        total_cost = egg.price * count
+        frenzy_active = is_egg_frenzy_active()
+        luck_bonus = self._effective_egg_luck(
+            ctx,
+            mastery_perks=mastery_perks,
+            active_potion=active_potion,
+            rebirth_count=rebirth_count,
+            enchantments=enchantments,
+            frenzy_active=frenzy_active,
+        )
+
+        bonus_eggs = 0
+        if mastery_perks is not None:
+            for _ in range(count):
+                if mastery_perks.triple_chance > 0 and random.random() < mastery_perks.triple_chance:
+                    bonus_eggs += 2
+                elif mastery_perks.double_chance > 0 and random.random() < mastery_perks.double_chance:
+                    bonus_eggs += 1
+
+        draws: list[tuple[PetDefinition, int]] = []
+        for attempt in range(2):
+            try:
+                draws = [
+                    self._choose_pet(egg, luck_bonus=luck_bonus)
+                    for _ in range(count + bonus_eggs)
+                ]
+                break
+            except KeyError as exc:
+                if attempt == 0:
+                    await self._resync_pets()
+                    continue
+                logger.exception(
+                    "Pet introuvable lors d'une ouverture multiple",
+                    extra={
+                        "user_id": ctx.author.id,
+                        "egg": egg.slug,
+                        "missing_pet": exc.args[0] if exc.args else "",
+                    },
+                )
+                await target_channel.send(
+                    embed=embeds.error_embed(
+                        "Impossible d'ouvrir cet œuf pour le moment. "
+                        "Réessaie dans quelques instants."
+                    )
+                )
+                return None
+
+        rolls: list[dict[str, Any]] = []
+        for definition, pet_id in draws:
+            is_gold, is_rainbow, is_galaxy, is_shiny = self._roll_hatch_variants(
+                definition,
+                mastery_perks=mastery_perks,
+                pet_mastery_perks=pet_mastery_perks,
+                clan_shiny_multiplier=clan_shiny_multiplier,
+                index_bonus=index_bonus,
+            )
+            rolls.append(
+                {
+                    "pet_id": pet_id,
+                    "is_huge": definition.is_huge,
+                    "is_gold": is_gold,
+                    "is_rainbow": is_rainbow,
+                    "is_galaxy": is_galaxy,
+                    "is_shiny": is_shiny,
+                }
+            )
+
+        try:
+            outcome = await self.database.hatch_eggs_bulk(
+                ctx.author.id,
+                rolls,
+                currency=egg.currency,
+                cost=total_cost,
+                mastery_slug=EGG_MASTERY.slug,
+                description=f"Achat de {count}× {egg.name}",
+            )
+        except InsufficientBalanceError:
+            price_text = (
+                embeds.format_gems(total_cost)
+                if egg.currency == "gem"
+                else embeds.format_currency(total_cost)
+            )
+            await target_channel.send(
+                embed=embeds.error_embed(
+                    f"Il te faut **{price_text}** pour ouvrir {count} {egg.name}."
+                )
+            )
+            return None
+
+        auto_messages: List[str] = []
+        if frenzy_active:
+            auto_messages.append(
+                "🍀 **Egg Frenzy** : tes chances ont profité d'un bonus de "
+                f"{EGG_FRENZY_LUCK_BONUS * 100:.0f}% !"
+            )
+        if pet_mastery_perks is not None and (
+            pet_mastery_perks.auto_goldify or pet_mastery_perks.auto_rainbowify
+        ):
+            auto_settings: Mapping[str, bool] | None = None
+            try:
+                auto_settings = await self.database.get_pet_auto_settings(ctx.author.id)
+            except DatabaseError:
+                logger.exception(
+                    "Impossible de récupérer les préférences auto pet",
+                    extra={"user_id": ctx.author.id},
+                )
+            # Les améliorations automatiques consomment tous les doublons
+            # disponibles : un passage par espèce suffit.
+            upgraded: dict[int, PetDefinition] = {}
+            for definition, pet_id in draws:
+                if not definition.is_huge:
+                    upgraded.setdefault(pet_id, definition)
+            for pet_id, definition in upgraded.items():
+                auto_messages.extend(
+                    await self._apply_auto_upgrades(
+                        ctx,
+                        definition,
+                        pet_id,
+                        pet_mastery_perks,
+                        clan_shiny_multiplier=clan_shiny_multiplier,
+                        auto_settings=auto_settings,
+                        index_bonus=index_bonus,
+                    )
+                )
+
+        market_values = await self.database.get_pet_market_values()
+        best_non_huge_income = 0
+        if any(definition.is_huge for definition, _ in draws):
+            best_non_huge_income = await self.database.get_best_non_huge_income(
+                ctx.author.id
+            )
+
+        results: List[PetHatchResult] = []
+        for position, ((definition, pet_id), roll) in enumerate(zip(draws, rolls)):
+            if definition.is_huge:
+                reference_income = (
+                    best_non_huge_income
+                    if best_non_huge_income and best_non_huge_income > 0
+                    else definition.base_income_per_hour
+                )
+                income_per_hour = self._compute_huge_income(
+                    reference_income, pet_name=definition.name, level=1
+                )
+            else:
+                multiplier = self._variant_income_multiplier(
+                    is_gold=roll["is_gold"],
+                    is_rainbow=roll["is_rainbow"],
+                    is_galaxy=roll["is_galaxy"],
+                    is_shiny=roll["is_shiny"],
+                )
+                income_per_hour = int(definition.base_income_per_hour * multiplier)
+            results.append(
+                PetHatchResult(
+                    definition=definition,
+                    income_per_hour=income_per_hour,
+                    market_value=self._resolve_market_value(
+                        market_values,
+                        pet_id=pet_id,
+                        is_gold=roll["is_gold"],
+                        is_rainbow=roll["is_rainbow"],
+                        is_galaxy=roll["is_galaxy"],
+                        is_shiny=roll["is_shiny"],
+                    ),
+                    is_gold=roll["is_gold"],
+                    is_rainbow=roll["is_rainbow"],
+                    is_galaxy=roll["is_galaxy"],
+                    is_shiny=roll["is_shiny"],
+                    is_huge=definition.is_huge,
+                    bonus=position >= count,
+                )
+            )
+            if definition.name == HUGE_PET_NAME:
+                await self._send_huge_shelly_alert(ctx)
+
+        if results:
+            results[0].auto_messages.extend(auto_messages)
+        await self._handle_mastery_notifications(ctx, outcome["mastery"])
+        self._dispatch_grade_progress(ctx, "egg", len(results))
+        return results, int(outcome["after"])
+
     async def _display_hatch_results(
         self,
         ctx: commands.Context,
@@ -3547,10 +3948,90 @@ class Pets(commands.Cog):
     @commands.command(name="openbox", aliases=("buyegg", "openegg", "egg"))
     async def openbox(self, ctx: commands.Context, egg: str | None = None) -> None:
         await self._ack_heavy_command(ctx)
-        lock = self._get_open_lock(ctx.author.id)
-        async with lock:
+        # La confirmation d'une ouverture multiple se fait hors du verrou :
+        # l'attente du bouton ne bloque ni les autres ouvertures ni l'AUTO.
+        # Le solde est revérifié au débit, atomique dans ``hatch_eggs_bulk``.
+        raw_request, _double, _force_gold, bulk_count = self._parse_openbox_request(egg)
+        if bulk_count:
+            egg_definition = self._resolve_egg(raw_request or None)
+            if egg_definition is not None and not await self._confirm_bulk_hatch(
+                ctx, egg_definition, bulk_count, channel=ctx.channel
+            ):
+                return
+        async with self._egg_open_locks(ctx.author.id):
             await self._openbox_impl(ctx, egg)
 
+    @staticmethod
+    def _parse_openbox_request(egg: str | None) -> tuple[str, bool, bool, int]:
+        """Sépare le nom de l'œuf des options finales (double, gold, x10…)."""
+
+        raw_request = (egg or "").strip()
+        double_request = False
+        force_gold_request = False
+        bulk_count = 0
+        if raw_request:
+            tokens = raw_request.split()
+            while tokens:
+                token = tokens[-1].lower()
+                if token in {"x2", "2", "double"}:
+                    double_request = True
+                    tokens.pop()
+                    continue
+                if token in {"gold", "golden", "garanti", "garantie", "guaranteed", "100x"}:
+                    force_gold_request = True
+                    tokens.pop()
+                    continue
+                if token.startswith("x") and token[1:].isdigit():
+                    if int(token[1:]) in BULK_HATCH_COUNTS:
+                        bulk_count = int(token[1:])
+                        tokens.pop()
+                        continue
+                break
+            raw_request = " ".join(tokens).strip()
+        return raw_request, double_request, force_gold_request, bulk_count
+
+    async def _confirm_bulk_hatch(
+        self,
+        ctx: commands.Context,
+        egg: PetEggDefinition,
+        count: int,
+        *,
+        channel: discord.abc.Messageable,
+    ) -> bool:
+        """Demande confirmation avant de débiter une ouverture multiple.
+
+        Appelée hors du verrou d'ouverture du joueur : l'attente peut durer
+        jusqu'à une minute.
+        """
+
+        total_cost = egg.price * count
+        price_text = (
+            embeds.format_gems(total_cost)
+            if egg.currency == "gem"
+            else embeds.format_currency(total_cost)
+        )
+        lines = [f"Ouvrir **{count}× {egg.name}** pour **{price_text}** ?"]
+        if count == 100:
+            # ``x100`` garantissait autrefois un pet or : on le rappelle.
+            lines.append(
+                "`x100` ouvre désormais 100 œufs. Pour le gold garanti, "
+                "utilise `gold` ou `100x`."
+            )
+        prompt = embeds.warning_embed("\n".join(lines), title="Ouverture multiple")
+        view = BulkHatchConfirmView(ctx.author.id)
+        message = await channel.send(embed=prompt, view=view)
+        await view.wait()
+        if view.value is True:
+            return True
+        with contextlib.suppress(discord.HTTPException):
+            await message.edit(view=None)
+        await channel.send(
+            embed=embeds.info_embed(
+                "Ouverture annulée." if view.value is False else "Temps écoulé, ouverture annulée."
+            )
+        )
+        return False
+
     async def _openbox_impl(
         self,
         ctx: commands.Context,
@@ -3571,26 +4052,13 @@ class Pets(commands.Cog):
 
         try:
             log_context["stage"] = "normalize_request"
-            raw_request = (egg or "").strip()
-            double_request = False
-            force_gold_request = False
-            if raw_request:
-                tokens = raw_request.split()
-                while tokens:
-                    token = tokens[-1].lower()
-                    if token in {"x2", "2", "double"}:
-                        double_request = True
-                        tokens.pop()
-                        continue
-                    if token in {"gold", "golden", "garanti", "garantie", "guaranteed", "100x", "x100"}:
-                        force_gold_request = True
-                        tokens.pop()
-                        continue
-                    break
-                raw_request = " ".join(tokens).strip()
+            raw_request, double_request, force_gold_request, bulk_count = (
+                self._parse_openbox_request(egg)
+            )
 
             log_context["double_request"] = double_request
             log_context["force_gold_initial"] = force_gold_request
+            log_context["bulk_count"] = bulk_count
 
             normalized_request = raw_request or None
             log_context["normalized_request"] = normalized_request
@@ -3630,36 +4098,29 @@ class Pets(commands.Cog):
             if not await self._ensure_zone_access(ctx, zone):
                 return
 
-            log_context["stage"] = "load_egg_mastery"
-            mastery_progress = await self.database.get_mastery_progress(
-                ctx.author.id, EGG_MASTERY.slug
-            )
-            mastery_level = int(mastery_progress.get("level", 1))
-            log_context["egg_mastery_level"] = mastery_level
-            egg_perks = _compute_egg_mastery_perks(mastery_level)
-
-            log_context["stage"] = "load_pet_mastery"
-            pet_mastery_progress = await self.database.get_mastery_progress(
-                ctx.author.id, PET_MASTERY.slug
-            )
-            pet_mastery_level = int(pet_mastery_progress.get("level", 1))
-            log_context["pet_mastery_level"] = pet_mastery_level
-            pet_perks = _compute_pet_mastery_perks(pet_mastery_level)
-
-            log_context["stage"] = "fetch_clan"
-            clan_row = await self.database.get_user_clan(ctx.author.id)
-            clan_shiny_multiplier = 1.0
-            if clan_row is not None:
-                clan_shiny_multiplier = max(
-                    1.0, float(clan_row.get("shiny_luck_multiplier") or 1.0)
-                )
+            log_context["stage"] = "load_modifiers"
+            modifiers = await self._load_hatch_modifiers(ctx)
+            egg_perks = modifiers.egg_perks
+            pet_perks = modifiers.pet_perks
+            clan_shiny_multiplier = modifiers.clan_shiny_multiplier
+            index_bonus_ratio = modifiers.index_bonus
+            rebirth_count = modifiers.rebirth_count
+            active_potion = modifiers.active_potion
+            enchantments = modifiers.enchantments
+            log_context["egg_mastery_level"] = modifiers.egg_mastery_level
+            log_context["pet_mastery_level"] = modifiers.pet_mastery_level
             log_context["clan_shiny_multiplier"] = clan_shiny_multiplier
-
-            log_context["stage"] = "index_bonus"
-            index_unique_count, index_bonus_ratio = await self._fetch_index_shiny_bonus(
-                ctx.author.id
-            )
-            log_context["index_unique"] = index_unique_count
+            log_context["index_unique"] = modifiers.index_unique
+            log_context["rebirth_count"] = rebirth_count
+            if active_potion is not None:
+                potion_definition, potion_expires_at = active_potion
+                log_context["active_potion"] = getattr(potion_definition, "slug", None)
+                log_context["potion_expires_at"] = getattr(
+                    potion_expires_at, "isoformat", lambda: None
+                )()
+            else:
+                log_context["active_potion"] = None
+            log_context["enchantments_loaded"] = bool(enchantments)
 
             if double_request:
                 log_context["stage"] = "inform_double_request"
@@ -3677,10 +4138,14 @@ class Pets(commands.Cog):
                         )
                     )
 
-            log_context["stage"] = "fetch_rebirth_count"
-            rebirth_count = await self.database.get_rebirth_count(ctx.author.id)
-            log_context["rebirth_count"] = rebirth_count
             price_multiplier = 1
+            if force_gold_request and bulk_count:
+                await target_channel.send(
+                    embed=embeds.warning_embed(
+                        "Le gold garanti n'est pas disponible en ouverture multiple."
+                    )
+                )
+                force_gold_request = False
             if force_gold_request:
                 log_context["stage"] = "handle_force_gold"
                 if rebirth_count <= 0:
@@ -3707,21 +4172,6 @@ class Pets(commands.Cog):
             log_context["price_multiplier"] = price_multiplier
             log_context["force_gold_final"] = force_gold_request
 
-            log_context["stage"] = "fetch_active_potion"
-            active_potion = await self.database.get_active_potion(ctx.author.id)
-            if active_potion is not None:
-                potion_definition, potion_expires_at = active_potion
-                log_context["active_potion"] = getattr(potion_definition, "slug", None)
-                log_context["potion_expires_at"] = getattr(
-                    potion_expires_at, "isoformat", lambda: None
-                )()
-            else:
-                log_context["active_potion"] = None
-
-            log_context["stage"] = "fetch_enchantments"
-            enchantments = await self.database.get_enchantment_powers(ctx.author.id)
-            log_context["enchantments_loaded"] = bool(enchantments)
-
             frenzy_active = is_egg_frenzy_active()
             has_luck_role = (
                 isinstance(ctx.author, discord.Member)
@@ -3736,6 +4186,41 @@ class Pets(commands.Cog):
                 has_luck_role=has_luck_role,
             )
 
+            if bulk_count:
+                log_context["stage"] = "hatch_bulk"
+                bulk_outcome = await self._hatch_pets_bulk(
+                    ctx,
+                    egg_definition,
+                    bulk_count,
+                    pet_mastery_perks=pet_perks,
+                    clan_shiny_multiplier=clan_shiny_multiplier,
+                    active_potion=active_potion,
+                    mastery_perks=egg_perks,
+                    rebirth_count=rebirth_count,
+                    index_bonus=index_bonus_ratio,
+                    enchantments=enchantments,
+                    channel=target_channel,
+                )
+                if bulk_outcome is None:
+                    return
+                bulk_results, _ = bulk_outcome
+
+                log_context["stage"] = "display_results"
+                await self._display_hatch_results(
+                    ctx,
+                    egg_definition,
+                    bulk_results,
+                    mastery_perks=egg_perks,
+                    luck_bonus_total=luck_bonus_total,
+                    luck_bonus_lines=luck_bonus_lines,
+                    channel_override=target_channel,
+                )
+                for result in bulk_results:
+                    for auto_message in result.auto_messages:
+                        await target_channel.send(auto_message)
+                log_context["stage"] = "completed"
+                return
+
             log_context["stage"] = "hatch_primary"
             primary_result = await self._hatch_pet(
                 ctx,
@@ -3748,6 +4233,7 @@ class Pets(commands.Cog):
                 price_multiplier=price_multiplier,
                 force_gold=force_gold_request,
                 index_bonus=index_bonus_ratio,
+                enchantments=enchantments,
             )
             if primary_result is None:
                 return
@@ -3790,6 +4276,7 @@ class Pets(commands.Cog):
                         charge_cost=False,
                         bonus=True,
                         index_bonus=index_bonus_ratio,
+                        enchantments=enchantments,
                     )
                     if bonus_result is not None:
                         results.append(bonus_result)
@@ -3889,16 +4376,9 @@ class Pets(commands.Cog):
 
         stop_event = asyncio.Event()
 
-        def _message_check(message: discord.Message) -> bool:
-            return (
-                message.author.id == ctx.author.id
-                and not message.author.bot
-                and message.content is not None
-            )
-
         async def _wait_for_user_message() -> None:
             try:
-                await ctx.bot.wait_for("message", check=_message_check)
+                await wait_for_user_message(ctx.bot, ctx.author.id)
             except asyncio.CancelledError:
                 return
             stop_event.set()
@@ -3906,56 +4386,80 @@ class Pets(commands.Cog):
         wait_task = asyncio.create_task(_wait_for_user_message())
 
         async def _runner() -> None:
-            await thread.send(
-                embed=embeds.info_embed(
-                    "Ouverture automatique activée. Envoie n'importe quel message pour arrêter.",
-                    title="AUTO en cours",
-                )
-            )
+            loop = asyncio.get_running_loop()
+            summary = AutoHatchSummary(egg_definition)
+            stop_reason: str | None = None
+            summary_message = await thread.send(embed=summary.embed(running=True))
+            last_render = loop.time()
             try:
+                if egg_definition.currency == "gem":
+                    balance = await self.database.fetch_gems(ctx.author.id)
+                    missing_funds = f"Tu n'as plus assez de {Emojis.GEM} pour continuer."
+                else:
+                    balance = await self.database.fetch_balance(ctx.author.id)
+                    missing_funds = "Tu n'as plus assez de PB pour continuer."
+                modifiers = await self._load_hatch_modifiers(ctx)
                 while not stop_event.is_set():
-                    if egg_definition.currency == "gem":
-                        balance = await self.database.fetch_gems(ctx.author.id)
-                        if balance < egg_definition.price:
-                            await thread.send(
-                                embed=embeds.warning_embed(
-                                    f"Tu n'as plus assez de {Emojis.GEM} pour continuer l'ouverture automatique."
-                                )
-                            )
-                            stop_event.set()
-                            break
-                    else:
-                        balance = await self.database.fetch_balance(ctx.author.id)
-                        if balance < egg_definition.price:
-                            await thread.send(
-                                embed=embeds.warning_embed(
-                                    "Tu n'as plus assez de PB pour continuer l'ouverture automatique."
-                                )
+                    # Chaque lot débite d'avance tout ce qu'il va ouvrir ; le
+                    # solde renvoyé par le débit dimensionne le lot suivant.
+                    batch = AUTO_HATCH_BATCH_SIZE
+                    if egg_definition.price > 0:
+                        batch = min(batch, balance // egg_definition.price)
+                    if batch <= 0:
+                        stop_reason = missing_funds
+                        break
+                    try:
+                        async with self._egg_open_locks(ctx.author.id):
+                            outcome = await self._hatch_pets_bulk(
+                                ctx,
+                                egg_definition,
+                                batch,
+                                mastery_perks=modifiers.egg_perks,
+                                pet_mastery_perks=modifiers.pet_perks,
+                                clan_shiny_multiplier=modifiers.clan_shiny_multiplier,
+                                active_potion=modifiers.active_potion,
+                                rebirth_count=modifiers.rebirth_count,
+                                index_bonus=modifiers.index_bonus,
+                                enchantments=modifiers.enchantments,
+                                channel=thread,
                             )
-                            stop_event.set()
-                            break
-                    lock = self._get_open_lock(ctx.author.id)
-                    async with lock:
-                        await self._openbox_impl(
-                            ctx, egg_slug, channel_override=thread
+                    except Exception:
+                        logger.exception(
+                            "Erreur pendant un lot d'ouverture automatique",
+                            extra={"user_id": ctx.author.id, "egg": egg_definition.slug},
+                        )
+                        stop_reason = "Une erreur inattendue a interrompu l'ouverture."
+                        break
+                    if outcome is None:
+                        stop_reason = missing_funds
+                        break
+                    results, balance = outcome
+                    summary.record(results, egg_definition.price * batch)
+
+                    now = loop.time()
+                    if now - last_render >= AUTO_HATCH_SUMMARY_INTERVAL_SECONDS:
+                        last_render = now
+                        with contextlib.suppress(discord.HTTPException):
+                            await summary_message.edit(embed=summary.embed(running=True))
+                        # Les bonus (maîtrise, potion…) évoluent pendant la session.
+                        modifiers = await self._load_hatch_modifiers(ctx)
+
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(
+                            stop_event.wait(), timeout=AUTO_HATCH_BATCH_INTERVAL_SECONDS
                         )
-
-                    try:
-                        await asyncio.wait_for(wait_task, timeout=1.5)
-                    except asyncio.TimeoutError:
-                        continue
             finally:
                 stop_event.set()
                 if not wait_task.done():
                     wait_task.cancel()
                 with contextlib.suppress(asyncio.CancelledError):
                     await wait_task
+                final_embed = summary.embed(
+                    running=False, stop_reason=stop_reason or "Arrêt demandé."
+                )
+                with contextlib.suppress(discord.HTTPException):
+                    await channel.send(embed=final_embed)
                 with contextlib.suppress(discord.HTTPException):
-                    await thread.send(
-                        embed=embeds.warning_embed(
-                            "Ouverture automatique arrêtée. Le fil va être supprimé."
-                        )
-                    )
                     await thread.delete()
 
         task = asyncio.create_task(_runner())
@@ -4055,7 +4559,10 @@ class Pets(commands.Cog):
 
     @commands.command(name="eggindex", aliases=("eggdex", "oeufsdex", "oeufindex"))
     async def egg_index(self, ctx: commands.Context) -> None:
-        embed = embeds.egg_index_embed(eggs=PET_EGG_DEFINITIONS)
+        pet_index = await self.database.get_pet_index(ctx.author.id)
+        embed = embeds.egg_index_embed(
+            eggs=PET_EGG_DEFINITIONS, owned=self._owned_pet_names(pet_index)
+        )
         embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.display_avatar.url)
 
         if self._embed_length(embed) > 5_500:
@@ -4128,11 +4635,14 @@ class Pets(commands.Cog):
         if cached is not None:
             records, market_values = cached
         else:
+            generation = self._pets_cache.generation()
             records, market_values = await asyncio.gather(
                 self.database.get_user_pets(ctx.author.id),
                 self.database.get_pet_market_values(),
             )
-            self._pets_cache.set(ctx.author.id, (records, market_values))
+            self._pets_cache.set(
+                ctx.author.id, (records, market_values), generation=generation
+            )
             if DEBUG_CACHE:
                 logger.debug("Cache pets mis à jour", extra={"user_id": ctx.author.id})
         pets = self._sort_pets_for_display(records, market_values)
@@ -4271,34 +4781,21 @@ class Pets(commands.Cog):
     @commands.command(name="index", aliases=("petindex", "dex"))
     async def pet_index_command(self, ctx: commands.Context) -> None:
         (
-            records,
+            pet_index,
             pet_counts_by_id,
             market_values_by_id,
         ) = await asyncio.gather(
-            self.database.get_user_pets(ctx.author.id),
+            self.database.get_pet_index(ctx.author.id),
             self.database.get_pet_counts(),
             self.database.get_pet_market_values(),
         )
         variant_sets: Dict[str, Set[int]] = {
-            "normal": set(),
-            "gold": set(),
-            "rainbow": set(),
-            "galaxy": set(),
-            "shiny": set(),
+            "normal": set(pet_index.pet_ids("owned")),
+            "gold": set(pet_index.pet_ids("gold")),
+            "rainbow": set(pet_index.pet_ids("rainbow")),
+            "galaxy": set(pet_index.pet_ids("galaxy")),
+            "shiny": set(pet_index.pet_ids("shiny")),
         }
-        for record in records:
-            pet_id = int(record.get("pet_id") or 0)
-            if pet_id <= 0:
-                continue
-            variant_sets["normal"].add(pet_id)
-            if bool(record.get("is_gold")):
-                variant_sets["gold"].add(pet_id)
-            if bool(record.get("is_rainbow")):
-                variant_sets["rainbow"].add(pet_id)
-            if bool(record.get("is_galaxy")):
-                variant_sets["galaxy"].add(pet_id)
-            if bool(record.get("is_shiny")):
-                variant_sets["shiny"].add(pet_id)
         count_lookup: Dict[str, int] = {}
         market_lookup: Dict[str, int] = {}
         for definition in self._definitions:
@@ -4315,8 +4812,7 @@ class Pets(commands.Cog):
                 is_galaxy=False,
                 is_shiny=False,
             )
-        normal_unique = len(variant_sets["normal"])
-        index_bonus_percent = self._index_bonus_from_count(normal_unique) * 100
+        index_bonus_percent = self._index_bonus_from_count(pet_index.unique_count) * 100
 
         view = PetIndexView(
             ctx=ctx,
@@ -6520,11 +7016,7 @@ class Pets(commands.Cog):
 
     @commands.command(name="claim")
     async def claim(self, ctx: commands.Context) -> None:
-        lock = self._claim_locks.get(ctx.author.id)
-        if lock is None:
-            lock = asyncio.Lock()
-            self._claim_locks[ctx.author.id] = lock
-        async with lock:
+        async with self._claim_locks(ctx.author.id):
             (
                 amount,
                 rows,
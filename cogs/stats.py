@@ -44,14 +44,7 @@ class ActivityStats(commands.Cog):
         if message.author.bot or message.guild is None:
             return
 
-        try:
-            await self.database.record_message_activity(message.guild.id, message.author.id)
-        except Exception:
-            logger.exception(
-                "Impossible d'enregistrer l'activité de %s dans le serveur %s",
-                message.author.id,
-                message.guild.id,
-            )
+        self.bot.message_ingest.add_activity(message.guild.id, message.author.id)
 
     # ------------------------------------------------------------------
     # Commandes
@@ -229,6 +229,25 @@ PREFIX = os.getenv("PREFIX", "e!")
 OWNER_ID = int(os.getenv("OWNER_ID", "0"))
 DATABASE_URL = os.getenv("DATABASE_URL")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Pools PostgreSQL : voie interactive (commandes) et voie des tâches de fond
+# (classements, KOTH, journal). ``DB_BACKGROUND_POOL_MAX_SIZE=0`` partage le
+# pool interactif ; les ``statement_timeout`` valent 0 pour « illimité ».
+DB_POOL_MIN_SIZE = _get_int_env("DB_POOL_MIN_SIZE", 2, minimum=0)
+DB_POOL_MAX_SIZE = _get_int_env("DB_POOL_MAX_SIZE", 10, minimum=1)
+DB_BACKGROUND_POOL_MIN_SIZE = _get_int_env("DB_BACKGROUND_POOL_MIN_SIZE", 1, minimum=0)
+DB_BACKGROUND_POOL_MAX_SIZE = _get_int_env("DB_BACKGROUND_POOL_MAX_SIZE", 3, minimum=0)
+DB_STATEMENT_TIMEOUT_MS = _get_int_env("DB_STATEMENT_TIMEOUT_MS", 15_000, minimum=0)
+DB_BACKGROUND_STATEMENT_TIMEOUT_MS = _get_int_env(
+    "DB_BACKGROUND_STATEMENT_TIMEOUT_MS", 120_000, minimum=0
+)
+# Réplica en lecture optionnel pour les agrégations tolérant un léger retard.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+DB_REPLICA_POOL_MAX_SIZE = _get_int_env("DB_REPLICA_POOL_MAX_SIZE", 5, minimum=1)
+DB_REPLICA_MAX_LAG_SECONDS = _get_int_env("DB_REPLICA_MAX_LAG_SECONDS", 30, minimum=0)
+DB_REPLICA_CHECK_INTERVAL_SECONDS = _get_int_env("DB_REPLICA_CHECK_INTERVAL_SECONDS", 10, minimum=1)
+# Serveur de santé / métriques (Koyeb fournit ``PORT``) ; 0 le désactive.
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = _get_int_env("PORT", 8000, minimum=0)
 
 if not TOKEN:
     raise ValueError("DISCORD_TOKEN manquant dans le fichier .env")
@@ -342,11 +361,46 @@ DAILY_GEMS_BONUS_MAX = _get_balance_int(
 DAILY_GEMS_CAP = _get_balance_int("daily_gems_cap", 12, minimum=0)
 MESSAGE_REWARD = _get_balance_int("message_reward", 1, minimum=0)
 MESSAGE_COOLDOWN = 60
+MESSAGE_FLUSH_INTERVAL_SECONDS = _get_economy_int("message_flush_interval_seconds", 5, minimum=1)
+MESSAGE_BUFFER_MAX_PENDING = _get_economy_int("message_buffer_max_pending", 500, minimum=1)
+LEDGER_QUEUE_MAX = _get_economy_int("ledger_queue_max", 10_000, minimum=1)
+LEDGER_BATCH_SIZE = _get_economy_int("ledger_batch_size", 500, minimum=1)
+LEDGER_FLUSH_INTERVAL_SECONDS = _get_economy_int("ledger_flush_interval_seconds", 2, minimum=1)
+LEDGER_PUT_TIMEOUT_SECONDS = _get_economy_float("ledger_put_timeout_seconds", 1.0, minimum=0.0)
+LEDGER_MAX_ATTEMPTS = _get_economy_int("ledger_max_attempts", 5, minimum=1)
 LEADERBOARD_LIMIT = _get_economy_int("leaderboard_limit", 10, minimum=1)
+# Mode AUTO : œufs ouverts par lot (un seul débit par lot), pause entre deux
+# lots et cadence de mise à jour du message récapitulatif.
+AUTO_HATCH_BATCH_SIZE = _get_economy_int("auto_hatch_batch_size", 10, minimum=1)
+AUTO_HATCH_BATCH_INTERVAL_SECONDS = _get_economy_float(
+    "auto_hatch_batch_interval_seconds", 2.0, minimum=0.5
+)
+AUTO_HATCH_SUMMARY_INTERVAL_SECONDS = _get_economy_float(
+    "auto_hatch_summary_interval_seconds", 5.0, minimum=1.0
+)
 CACHE_TTL_SECONDS = _get_economy_int("cache_ttl_seconds", 60, minimum=0)
 CACHE_MAX_ENTRIES = _get_economy_int("cache_max_entries", 128, minimum=1)
+CACHE_STALE_SECONDS = _get_economy_int("cache_stale_seconds", 30, minimum=0)
+CACHE_TTL_MARKET_VALUES = _get_economy_int("cache_ttl_market_values_seconds", 900, minimum=0)
 QUERY_TIMEOUT_SECONDS = _get_economy_int("query_timeout_seconds", 3, minimum=1)
 DEBUG_SQL_TIMING = _get_economy_bool("debug_sql_timing", False)
+QUERY_STATS_WINDOW = _get_economy_int("query_stats_window", 512, minimum=16)
+SLOW_QUERY_THRESHOLD_MS = _get_economy_int("slow_query_threshold_ms", 250, minimum=1)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = _get_economy_float(
+    "slow_query_explain_sample_rate", 0.1, minimum=0.0, maximum=1.0
+)
+# Nombre de requêtes SQL au-delà duquel une commande est signalée (0 = désactivé).
+COMMAND_ROUNDTRIP_BUDGET = _get_economy_int("command_roundtrip_budget", 40, minimum=0)
+COMMAND_ROUNDTRIP_BUDGETS: Mapping[str, int] = {
+    name: max(0, int(value))
+    for name, value in _get_economy_mapping(
+        "command_roundtrip_budgets", {"openbox": 15, "claim": 12, "pets": 8}
+    ).items()
+}
+KNOWN_USERS_MAX_ENTRIES = _get_economy_int("known_users_max_entries", 10_000, minimum=1)
+KNOWN_USERS_TTL_SECONDS = _get_economy_int("known_users_ttl_seconds", 3_600, minimum=0)
+PET_INDEX_CACHE_MAX_ENTRIES = _get_economy_int("pet_index_cache_max_entries", 10_000, minimum=1)
+PET_INDEX_CACHE_TTL_SECONDS = _get_economy_int("pet_index_cache_ttl_seconds", 3_600, minimum=0)
 SLOT_MIN_BET = _get_balance_int("slots_min_bet", 50, minimum=1)
 SLOT_MAX_BET = _get_balance_int("slots_max_bet", 1_000_000_000_000_000, minimum=SLOT_MIN_BET)
 CASINO_HUGE_MAX_CHANCE = _get_balance_float("casino_huge_max_chance", 0.10, minimum=0.0, maximum=1.0)
@@ -415,9 +469,10 @@ STEAL_LOG_BASE = _get_balance_float("steal_log_base", 10.0, minimum=2.0)
 STEAL_LOG_SCALE = _get_balance_float("steal_log_scale", 1.2, minimum=0.0)
 STEAL_MIN_CHANCE = _get_balance_float("steal_min_chance", 0.05, minimum=0.0, maximum=1.0)
 STEAL_MAX_CHANCE = _get_balance_float("steal_max_chance", 0.9, minimum=0.0, maximum=1.0)
-CACHE_TTL_INVENTORY = _get_balance_int("cache_ttl_inventory_seconds", 20, minimum=0)
-CACHE_TTL_PETS = _get_balance_int("cache_ttl_pets_seconds", 20, minimum=0)
-CACHE_TTL_PROFILE = _get_balance_int("cache_ttl_profile_seconds", 15, minimum=0)
+CACHE_TTL_INVENTORY = _get_balance_int("cache_ttl_inventory_seconds", 600, minimum=0)
+CACHE_TTL_PETS = _get_balance_int("cache_ttl_pets_seconds", 600, minimum=0)
+CACHE_TTL_PROFILE = _get_balance_int("cache_ttl_profile_seconds", 600, minimum=0)
+CACHE_USER_MAX_ENTRIES = _get_balance_int("cache_user_max_entries", 5000, minimum=1)
 PETS_PAGE_SIZE = _get_balance_int("pets_page_size", 8, minimum=1, maximum=25)
 INVENTORY_POTIONS_PAGE_SIZE = _get_balance_int("inventory_potions_page_size", 6, minimum=1, maximum=25)
 INVENTORY_ENCHANTMENTS_PAGE_SIZE = _get_balance_int(
@@ -1,6 +1,9 @@
 """Couche d'accès aux données minimaliste pour EcoBot."""
 from __future__ import annotations
 
+import functools
+import hashlib
+import json
 import logging
 import math
 import asyncio
@@ -8,12 +11,15 @@ import os
 import random
 import sys
 import statistics
+from array import array
 import time
 from collections import defaultdict
-from contextlib import asynccontextmanager, suppress
+from contextlib import asynccontextmanager, contextmanager, suppress
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, TypeVar
 
 import asyncpg
 
@@ -43,8 +49,22 @@ from config import (
     PET_DEFINITIONS,
     PET_EGG_DEFINITIONS,
     CACHE_MAX_ENTRIES,
+    CACHE_STALE_SECONDS,
+    CACHE_TTL_MARKET_VALUES,
     CACHE_TTL_SECONDS,
     DEBUG_SQL_TIMING,
+    QUERY_STATS_WINDOW,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    SLOW_QUERY_THRESHOLD_MS,
+    KNOWN_USERS_MAX_ENTRIES,
+    KNOWN_USERS_TTL_SECONDS,
+    PET_INDEX_CACHE_MAX_ENTRIES,
+    PET_INDEX_CACHE_TTL_SECONDS,
+    LEDGER_BATCH_SIZE,
+    LEDGER_FLUSH_INTERVAL_SECONDS,
+    LEDGER_MAX_ATTEMPTS,
+    LEDGER_PUT_TIMEOUT_SECONDS,
+    LEDGER_QUEUE_MAX,
     PET_FARM_ENCHANT_BASE,
     PET_FARM_ENCHANT_MAX_CHANCE,
     PET_FARM_ENCHANT_PER_PET,
@@ -83,6 +103,19 @@ from utils.enchantments import (
     roll_enchantment_power,
 )
 from utils.cache import LruTTLCache
+from utils.single_flight import SingleFlight
+from database import invalidation
+from database.instrumentation import (
+    InstrumentedConnection,
+    InstrumentedPool,
+    QueryMetrics,
+    label_queries,
+)
+from database.invalidation import InvalidationBatch, InvalidationBus
+from database.ledger import LEDGER_COLUMNS, LedgerEntry, TransactionLedger
+from database.replica import REPLICA_FAILURES, REPLICA_LAG_QUERY, ReplicaMonitor
+from database.migrations import Migration, build_registry, load_sql_migrations, pending_migrations
+from database.pet_index import PET_INDEX_COLUMNS, PetIndex
 
 __all__ = [
     "Database",
@@ -94,6 +127,39 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+# Voie de pool du contexte courant : ``Database.background()`` et les méthodes
+# marquées :func:`replica_read` la changent le temps d'un appel.
+_LANE_INTERACTIVE = "interactive"
+_LANE_BACKGROUND = "background"
+_LANE_REPLICA = "replica"
+_POOL_LANE: ContextVar[str] = ContextVar("db_pool_lane", default=_LANE_INTERACTIVE)
+
+_ReadMethod = TypeVar("_ReadMethod", bound=Callable[..., Awaitable[Any]])
+
+
+def replica_read(method: _ReadMethod) -> _ReadMethod:
+    """Marque une lecture seule qui tolère quelques secondes de retard.
+
+    Ses requêtes partent sur le réplica quand il est sain ; sinon, ou si le
+    réplica lâche en cours d'appel, la méthode s'exécute sur le primaire.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self: "Database", *args: Any, **kwargs: Any) -> Any:
+        monitor = self._replica_monitor
+        if self._replica_pool is None or monitor is None or not monitor.healthy:
+            return await method(self, *args, **kwargs)
+        token = _POOL_LANE.set(_LANE_REPLICA)
+        try:
+            return await method(self, *args, **kwargs)
+        except REPLICA_FAILURES as exc:
+            monitor.mark_failed(exc)
+        finally:
+            _POOL_LANE.reset(token)
+        return await method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
 _HUGE_PET_NAME_LOOKUP = {name.lower() for name in HUGE_PET_NAMES}
 _MARKET_HISTORY_SAMPLE = 20
 _MARKET_BASE_MULTIPLIER = 80
@@ -137,6 +203,81 @@ _PET_ZONE_BY_NAME = {
 }
 
 
+@dataclass(frozen=True)
+class _MarketSnapshot:
+    """Copie immuable des valeurs marché, liée à une version locale."""
+
+    version: int
+    values: Mapping[Tuple[int, str], int]
+    loaded_at: float
+
+
+_VARIANT_FLAG_GOLD = 1
+_VARIANT_FLAG_RAINBOW = 2
+_VARIANT_FLAG_GALAXY = 4
+_VARIANT_FLAG_SHINY = 8
+_VARIANT_FLAG_HUGE = 16
+_VARIANT_FLAG_SLOTS = 32
+
+
+def _variant_flags(row: Mapping[str, Any]) -> int:
+    flags = 0
+    if row.get("is_gold"):
+        flags |= _VARIANT_FLAG_GOLD
+    if row.get("is_rainbow"):
+        flags |= _VARIANT_FLAG_RAINBOW
+    if row.get("is_galaxy"):
+        flags |= _VARIANT_FLAG_GALAXY
+    if row.get("is_shiny"):
+        flags |= _VARIANT_FLAG_SHINY
+    if row.get("is_huge"):
+        flags |= _VARIANT_FLAG_HUGE
+    return flags
+
+
+@functools.lru_cache(maxsize=None)
+def _mastery_xp_floors(slug: str) -> tuple[int, ...]:
+    """Expérience cumulée nécessaire pour atteindre chaque niveau (index 0 = niveau 1)."""
+
+    definition = get_mastery_definition(slug)
+    floors = [0]
+    for level in range(1, definition.max_level):
+        floors.append(floors[-1] + definition.required_xp(level))
+    return tuple(floors)
+
+
+def _mastery_xp_potions() -> tuple[list[str], list[float]]:
+    slugs: list[str] = []
+    bonuses: list[float] = []
+    for slug, definition in POTION_DEFINITION_MAP.items():
+        if definition.effect_type == "mastery_xp":
+            slugs.append(slug)
+            bonuses.append(float(definition.effect_value))
+    return slugs, bonuses
+
+
+class _PriceMatrix:
+    """Valeurs finales (prix marché, repli et mise à l'échelle) par pet et variante.
+
+    Le tableau est indexé par ``pet_id * 32 + drapeaux`` où les cinq bits de
+    drapeaux codent or / arc-en-ciel / galaxie / shiny / huge. Une case à -1
+    signale un pet absent du catalogue au moment de la construction.
+    """
+
+    __slots__ = ("source", "_values")
+
+    def __init__(self, source: Mapping[Tuple[int, str], int], values: "array[int]") -> None:
+        self.source = source
+        self._values = values
+
+    def lookup(self, pet_id: int, flags: int) -> int | None:
+        index = pet_id * _VARIANT_FLAG_SLOTS + flags
+        if index < 0 or index >= len(self._values):
+            return None
+        value = self._values[index]
+        return None if value < 0 else value
+
+
 @dataclass(frozen=True)
 class _BoosterComputation:
     extra_income: int = 0
@@ -217,63 +358,146 @@ class ActivePetLimitError(DatabaseError):
         super().__init__(f"Active pet slots full ({self.active}/{self.limit})")
 
 
+@label_queries
 class Database:
     """Gestionnaire de connexion PostgreSQL réduit aux besoins essentiels."""
 
     _INSTANCE_LOCK_KEY = (0x45534F42, 0x4F54504C)  # "ESOB"/"OTPL" packed into int32 pairs
+    _MIGRATION_LOCK_KEY = (0x45534F42, 0x4D494752)  # "ESOB"/"MIGR"
+    _POWER_UNNERF_FLAG = "economy_power_unnerf_v1"
+    _RAP_TOTALS_FLAG = "user_rap_totals_v1"
     _LOCK_WAIT_SECONDS = max(0, int(os.getenv("DB_LOCK_WAIT", "25")))
     _LOCK_FORCE_TAKEOVER = os.getenv("DB_LOCK_FORCE", "1").lower() not in {"0", "false", "no"}
 
-    def __init__(self, dsn: str, *, min_size: int = 1, max_size: int = 10) -> None:
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        background_min_size: int = 0,
+        background_max_size: int = 0,
+        statement_timeout_ms: int = 0,
+        background_statement_timeout_ms: int = 0,
+        read_dsn: str | None = None,
+        replica_max_size: int = 5,
+        replica_max_lag_seconds: float = 30.0,
+        replica_check_interval: float = 10.0,
+    ) -> None:
         if not dsn:
             raise ValueError("Le DSN PostgreSQL est obligatoire")
 
         self._dsn = dsn
-        self._pool: Optional[asyncpg.Pool] = None
+        self._pool: Optional[InstrumentedPool] = None
         self._min_size = min_size
         self._max_size = max_size
+        # Voie « background » : pool séparé pour les tâches de fond, afin qu'un
+        # scan de classement n'immobilise pas les connexions des commandes.
+        # ``background_max_size=0`` la replie sur le pool principal.
+        self._background_pool: Optional[InstrumentedPool] = None
+        self._background_min_size = max(0, background_min_size)
+        self._background_max_size = max(0, background_max_size)
+        self._statement_timeout_ms = max(0, statement_timeout_ms)
+        self._background_statement_timeout_ms = max(0, background_statement_timeout_ms)
+        # Réplica optionnel pour les lectures marquées :func:`replica_read`.
+        self._read_dsn = read_dsn or None
+        self._replica_pool: Optional[InstrumentedPool] = None
+        self._replica_max_size = max(1, replica_max_size)
+        self._replica_monitor: Optional[ReplicaMonitor] = None
+        if self._read_dsn is not None:
+            self._replica_monitor = ReplicaMonitor(
+                self._probe_replica_lag,
+                max_lag_seconds=replica_max_lag_seconds,
+                interval=replica_check_interval,
+            )
         self._lock_connection: asyncpg.Connection | None = None
         self._leaderboard_cache: LruTTLCache[object] = LruTTLCache(
-            CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES
+            CACHE_TTL_SECONDS,
+            CACHE_MAX_ENTRIES,
+            name="db.leaderboard",
+            stale_seconds=CACHE_STALE_SECONDS,
         )
         self._analytics_cache: LruTTLCache[object] = LruTTLCache(
-            CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES
+            CACHE_TTL_SECONDS,
+            CACHE_MAX_ENTRIES,
+            name="db.analytics",
+            stale_seconds=CACHE_STALE_SECONDS,
+        )
+        self._single_flight = SingleFlight()
+        self.query_metrics = QueryMetrics(
+            window=QUERY_STATS_WINDOW,
+            slow_threshold_seconds=SLOW_QUERY_THRESHOLD_MS / 1000,
+            explain_sample_rate=SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+            log_every_query=DEBUG_SQL_TIMING,
+        )
+        self.query_metrics.set_explain_runner(self._explain_query)
+        # Joueurs dont les lignes users/user_grades existent déjà : évite de
+        # renvoyer les INSERT de ``ensure_user`` à chaque appel.
+        self._known_users: LruTTLCache[bool] = LruTTLCache(
+            KNOWN_USERS_TTL_SECONDS, KNOWN_USERS_MAX_ENTRIES, name="db.known_users"
+        )
+        # Index des pets découverts : invalidé seulement quand un bit change.
+        self._pet_index_cache: LruTTLCache[PetIndex] = LruTTLCache(
+            PET_INDEX_CACHE_TTL_SECONDS, PET_INDEX_CACHE_MAX_ENTRIES, name="db.pet_index"
         )
         self._market_values_ready = False
-
+        self._market_version = 0
+        self._market_snapshot: _MarketSnapshot | None = None
+        self._price_matrix: _PriceMatrix | None = None
+        self._ledger = TransactionLedger(
+            self._write_ledger_batch,
+            max_queue=LEDGER_QUEUE_MAX,
+            batch_size=LEDGER_BATCH_SIZE,
+            flush_interval=LEDGER_FLUSH_INTERVAL_SECONDS,
+            put_timeout=LEDGER_PUT_TIMEOUT_SECONDS,
+            max_attempts=LEDGER_MAX_ATTEMPTS,
+        )
+        # Lignes du journal produites dans une transaction en cours, publiées
+        # seulement après le COMMIT (clé : id de la connexion).
+        self._ledger_pending: Dict[int, list[LedgerEntry]] = {}
+        # Bus public : les cogs y abonnent leurs caches par joueur.
+        self.invalidation_bus = InvalidationBus()
+        self.invalidation_bus.subscribe_cache(self._pet_index_cache, (invalidation.PET_INDEX,))
+        # La version du marché suit le bus : une nouvelle cote écrite dans une
+        # transaction n'est visible (et rechargée) qu'après son COMMIT.
+        self.invalidation_bus.subscribe(self._bump_market_version, (invalidation.MARKET,))
+        self._invalidations_pending: Dict[int, InvalidationBatch] = {}
+        # Travaux à lancer une fois la transaction validée (recalculs hors verrou).
+        self._after_commit_pending: Dict[int, list[Callable[[], Awaitable[None]]]] = {}
+        self._ledger_partitions: Set[tuple[int, int]] = set()
+
+    # Les durées, lignes et erreurs sont relevées par ``InstrumentedConnection``
+    # pour toutes les requêtes du pool, que l'appel passe par ces aides ou non.
     async def _fetch(
         self, query: str, *args: object, timeout: float | None = QUERY_TIMEOUT_SECONDS
     ) -> Sequence[asyncpg.Record]:
-        start = time.monotonic()
-        rows = await self.pool.fetch(query, *args, timeout=timeout)
-        if DEBUG_SQL_TIMING:
-            logger.info("SQL fetch in %.3fs", time.monotonic() - start)
-        return rows
+        return await self.pool.fetch(query, *args, timeout=timeout)
 
     async def _fetchrow(
         self, query: str, *args: object, timeout: float | None = QUERY_TIMEOUT_SECONDS
     ) -> asyncpg.Record | None:
-        start = time.monotonic()
-        row = await self.pool.fetchrow(query, *args, timeout=timeout)
-        if DEBUG_SQL_TIMING:
-            logger.info("SQL fetchrow in %.3fs", time.monotonic() - start)
-        return row
+        return await self.pool.fetchrow(query, *args, timeout=timeout)
 
     async def _fetchval(
         self, query: str, *args: object, timeout: float | None = QUERY_TIMEOUT_SECONDS
     ) -> object:
-        start = time.monotonic()
-        value = await self.pool.fetchval(query, *args, timeout=timeout)
-        if DEBUG_SQL_TIMING:
-            logger.info("SQL fetchval in %.3fs", time.monotonic() - start)
-        return value
+        return await self.pool.fetchval(query, *args, timeout=timeout)
+
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        if isinstance(connection, InstrumentedConnection):
+            connection.query_metrics = self.query_metrics
+
+    async def _explain_query(self, query: str, args: Sequence[Any]) -> str:
+        rows = await self.pool.fetch(f"EXPLAIN {query}", *args)
+        return "\n".join(str(row[0]) for row in rows)
 
     async def _ensure_market_values_ready(self) -> None:
         if self._market_values_ready:
             return
         count = await self._fetchval("SELECT COUNT(*) FROM pet_market_values")
         if int(count or 0) <= 0:
-            await self.sync_pet_market_values()
+            with self.background():
+                await self.sync_pet_market_values()
         self._market_values_ready = True
 
     @staticmethod
@@ -459,23 +683,123 @@ class Database:
 
     @property
     def pool(self) -> asyncpg.Pool:
+        """Pool de la voie courante (voir :meth:`background`)."""
+
         if self._pool is None:
             raise DatabaseError("La base de données n'est pas connectée")
+        lane = _POOL_LANE.get()
+        if lane == _LANE_REPLICA and self._replica_pool is not None:
+            return self._replica_pool
+        if lane == _LANE_BACKGROUND and self._background_pool is not None:
+            return self._background_pool
         return self._pool
 
+    @contextmanager
+    def background(self) -> Iterator[None]:
+        """Route les requêtes du bloc vers le pool des tâches de fond.
+
+        Le choix suit le contexte asyncio : les tâches créées dans le bloc
+        (single-flight, rafraîchissements) héritent de la voie.
+        """
+
+        token = _POOL_LANE.set(_LANE_BACKGROUND)
+        try:
+            yield
+        finally:
+            _POOL_LANE.reset(token)
+
+    def _pools(self) -> list[InstrumentedPool]:
+        pools = (self._pool, self._background_pool, self._replica_pool)
+        return [pool for pool in pools if pool is not None]
+
+    async def _probe_replica_lag(self) -> float:
+        if self._replica_pool is None:
+            raise DatabaseError("Réplica non connecté")
+        return float(await self._replica_pool.fetchval(REPLICA_LAG_QUERY) or 0.0)
+
+    def replica_status(self) -> Optional[Dict[str, float]]:
+        """État du réplica (``None`` sans ``read_dsn``)."""
+
+        monitor = self._replica_monitor
+        if monitor is None:
+            return None
+        return {
+            "healthy": float(monitor.healthy),
+            "lag_seconds": monitor.lag_seconds if monitor.lag_seconds is not None else -1.0,
+            "probe_failures": monitor.failures,
+            "fallbacks": monitor.fallbacks,
+        }
+
+    def pool_stats(self) -> Optional[Dict[str, Dict[str, float]]]:
+        """Occupation et attente de chaque voie, ou ``None`` hors connexion."""
+
+        if self._pool is None or self._pool.is_closing():
+            return None
+        lanes: Dict[str, Dict[str, float]] = {}
+        for pool in self._pools():
+            wait = pool.wait_stats
+            lanes[pool.lane] = {
+                "size": pool.get_size(),
+                "idle": pool.get_idle_size(),
+                "min": pool.get_min_size(),
+                "max": pool.get_max_size(),
+                "waiting": wait.waiting,
+                "acquires": wait.acquires,
+                "acquire_timeouts": wait.timeouts,
+                "acquire_wait_seconds": wait.total_seconds,
+                "acquire_wait_max_seconds": wait.max_seconds,
+                "acquire_wait_p95_seconds": wait.p95(),
+            }
+        return lanes
+
+    async def _create_pool(
+        self,
+        lane: str,
+        *,
+        min_size: int,
+        max_size: int,
+        statement_timeout_ms: int,
+        dsn: str | None = None,
+    ) -> InstrumentedPool:
+        server_settings: Dict[str, str] = {}
+        if statement_timeout_ms > 0:
+            server_settings["statement_timeout"] = str(statement_timeout_ms)
+        # Le délai client reste au-dessus du ``statement_timeout`` serveur pour
+        # que PostgreSQL annule la requête proprement le premier.
+        pool = await asyncpg.create_pool(
+            dsn or self._dsn,
+            min_size=min_size,
+            max_size=max_size,
+            init=self._init_connection,
+            connection_class=InstrumentedConnection,
+            command_timeout=max(30.0, statement_timeout_ms / 1000 + 5),
+            server_settings=server_settings or None,
+        )
+        return InstrumentedPool(pool, lane=lane)
+
     async def connect(self) -> None:
         if self._pool is not None:
             return
 
         try:
-            self._pool = await asyncpg.create_pool(
-                dsn=self._dsn,
+            self._pool = await self._create_pool(
+                "interactive",
                 min_size=self._min_size,
                 max_size=self._max_size,
-                command_timeout=30,
+                statement_timeout_ms=self._statement_timeout_ms,
             )
+            if self._background_max_size > 0:
+                self._background_pool = await self._create_pool(
+                    "background",
+                    min_size=min(self._background_min_size, self._background_max_size),
+                    max_size=self._background_max_size,
+                    statement_timeout_ms=self._background_statement_timeout_ms,
+                )
         except Exception as exc:  # pragma: no cover - log only
             logger.exception("Impossible de créer le pool PostgreSQL")
+            if self._pool is not None:
+                await self._pool.close()
+                self._pool = None
             raise DatabaseError("Connexion base de données échouée") from exc
 
         logger.info("Connexion PostgreSQL établie — initialisation du schéma")
@@ -485,19 +809,106 @@ class Database:
         except Exception:
             await self.close()
             raise
+        self._ledger.start()
+        await self._connect_replica()
+
+    async def _connect_replica(self) -> None:
+        if self._read_dsn is None or self._replica_monitor is None:
+            return
+        try:
+            self._replica_pool = await self._create_pool(
+                _LANE_REPLICA,
+                min_size=1,
+                max_size=self._replica_max_size,
+                statement_timeout_ms=self._background_statement_timeout_ms,
+                dsn=self._read_dsn,
+            )
+        except Exception:
+            # Le bot reste utilisable : les lectures marquées restent sur le primaire.
+            logger.exception("Réplica PostgreSQL injoignable, lectures servies par le primaire")
+            return
+        await self._replica_monitor.check()
+        self._replica_monitor.start()
 
     async def close(self) -> None:
         if self._pool is not None:
+            await self._ledger.stop()
             await self._release_instance_lock()
+            if self._replica_monitor is not None:
+                await self._replica_monitor.stop()
+            if self._replica_pool is not None:
+                await self._replica_pool.close()
+                self._replica_pool = None
+            if self._background_pool is not None:
+                await self._background_pool.close()
+                self._background_pool = None
             await self._pool.close()
             self._pool = None
             logger.info("Pool PostgreSQL fermé")
 
     @asynccontextmanager
     async def transaction(self) -> AsyncIterator[asyncpg.Connection]:
+        ledger_entries: list[LedgerEntry] = []
+        invalidations = InvalidationBatch()
+        after_commit: list[Callable[[], Awaitable[None]]] = []
         async with self.pool.acquire() as connection:
-            async with connection.transaction():
-                yield connection
+            key = id(connection)
+            self._ledger_pending[key] = ledger_entries
+            self._invalidations_pending[key] = invalidations
+            self._after_commit_pending[key] = after_commit
+            try:
+                async with connection.transaction():
+                    yield connection
+            finally:
+                self._ledger_pending.pop(key, None)
+                self._invalidations_pending.pop(key, None)
+                self._after_commit_pending.pop(key, None)
+        if invalidations:
+            invalidations.publish_to(self.invalidation_bus)
+        if ledger_entries:
+            await self._ledger.put(ledger_entries)
+        for callback in after_commit:
+            try:
+                await callback()
+            except Exception:
+                logger.exception("Traitement post-COMMIT en échec")
+
+    async def _after_commit(
+        self,
+        connection: asyncpg.Connection | None,
+        callback: Callable[[], Awaitable[None]],
+    ) -> None:
+        """Exécute ``callback`` après le COMMIT de la transaction de ``connection``.
+
+        Sans connexion, il n'y a rien à attendre et le travail part tout de suite.
+        """
+
+        if connection is None:
+            await callback()
+            return
+        pending = self._after_commit_pending.get(id(connection))
+        if pending is None:
+            raise DatabaseError("La connexion doit provenir de Database.transaction()")
+        pending.append(callback)
+
+    def _publish_invalidation(
+        self,
+        user_ids: Iterable[int] | None,
+        *kinds: str,
+        connection: asyncpg.Connection | None = None,
+    ) -> None:
+        """Signale aux caches abonnés que des données joueur ont changé.
+
+        Dans une transaction ouverte via :meth:`transaction`, la publication
+        attend le COMMIT pour qu'aucun cache ne relise l'état précédent.
+        """
+
+        if connection is not None:
+            pending = self._invalidations_pending.get(id(connection))
+            if pending is not None:
+                pending.add(user_ids, kinds)
+                return
+        self.invalidation_bus.publish(user_ids, kinds)
 
     @staticmethod
     def _coerce_positive_ids(values: Sequence[object], *, field: str = "identifiants") -> list[int]:
@@ -643,38 +1054,108 @@ class Database:
                 logger.exception("Erreur lors de la libération de la connexion")
             self._lock_connection = None
 
-    async def _ensure_transactions_table(
-        self, executor: asyncpg.Connection | asyncpg.Pool
+    async def _ensure_transactions_partition(
+        self, executor: asyncpg.Connection | asyncpg.Pool, year: int, month: int
     ) -> None:
+        if (year, month) in self._ledger_partitions:
+            return
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
         await executor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS transactions (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                transaction_type VARCHAR(50) NOT NULL,
-                currency TEXT NOT NULL DEFAULT 'pb',
-                amount BIGINT NOT NULL,
-                balance_before BIGINT NOT NULL,
-                balance_after BIGINT NOT NULL,
-                description TEXT,
-                related_user_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
-                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            )
+            f"""
+            CREATE TABLE IF NOT EXISTS transactions_y{year:04d}m{month:02d}
+            PARTITION OF transactions
+            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
             """
         )
-        await executor.execute(
-            "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS currency TEXT NOT NULL DEFAULT 'pb'"
+        self._ledger_partitions.add((year, month))
+
+    async def _ensure_transactions_table(self, connection: asyncpg.Connection) -> None:
+        """Crée le journal ``transactions`` partitionné par mois.
+
+        Une ancienne table non partitionnée est convertie une seule fois : ses
+        lignes sont recopiées dans les partitions mensuelles correspondantes.
+        """
+
+        relkind = await connection.fetchval(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass('transactions')"
         )
-        await executor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id)"
+        if relkind != "p":
+            async with connection.transaction():
+                if relkind is not None:
+                    await connection.execute("ALTER TABLE transactions RENAME TO transactions_legacy")
+                    for index_name in ("user", "type", "date"):
+                        await connection.execute(
+                            f"ALTER INDEX IF EXISTS idx_transactions_{index_name} "
+                            f"RENAME TO idx_transactions_legacy_{index_name}"
+                        )
+                await connection.execute(
+                    """
+                    CREATE TABLE transactions (
+                        id BIGSERIAL,
+                        user_id BIGINT NOT NULL,
+                        transaction_type VARCHAR(50) NOT NULL,
+                        currency TEXT NOT NULL DEFAULT 'pb',
+                        amount BIGINT NOT NULL,
+                        balance_before BIGINT NOT NULL,
+                        balance_after BIGINT NOT NULL,
+                        description TEXT,
+                        related_user_id BIGINT,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        PRIMARY KEY (id, created_at)
+                    ) PARTITION BY RANGE (created_at)
+                    """
+                )
+                await connection.execute(
+                    "CREATE TABLE transactions_default PARTITION OF transactions DEFAULT"
+                )
+                if relkind is not None:
+                    months = await connection.fetch(
+                        """
+                        SELECT DISTINCT
+                            EXTRACT(YEAR FROM created_at AT TIME ZONE 'UTC')::INT AS year,
+                            EXTRACT(MONTH FROM created_at AT TIME ZONE 'UTC')::INT AS month
+                        FROM transactions_legacy
+                        """
+                    )
+                    for row in months:
+                        await self._ensure_transactions_partition(
+                            connection, int(row["year"]), int(row["month"])
+                        )
+                    await connection.execute(
+                        f"""
+                        INSERT INTO transactions ({", ".join(LEDGER_COLUMNS)})
+                        SELECT {", ".join(LEDGER_COLUMNS)}
+                        FROM transactions_legacy
+                        ORDER BY id
+                        """
+                    )
+                    await connection.execute("DROP TABLE transactions_legacy")
+
+        now = datetime.now(timezone.utc)
+        await self._ensure_transactions_partition(connection, now.year, now.month)
+        next_month = now.replace(day=1) + timedelta(days=32)
+        await self._ensure_transactions_partition(connection, next_month.year, next_month.month)
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id, created_at DESC)"
         )
-        await executor.execute(
+        await connection.execute(
             "CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(transaction_type)"
         )
-        await executor.execute(
+        await connection.execute(
             "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(created_at)"
         )
 
+    async def _write_ledger_batch(self, entries: Sequence[LedgerEntry]) -> None:
+        months = sorted({(entry.created_at.year, entry.created_at.month) for entry in entries})
+        with self.background():
+            async with self.pool.acquire() as connection:
+                for year, month in months:
+                    await self._ensure_transactions_partition(connection, year, month)
+                await connection.copy_records_to_table(
+                    "transactions", records=entries, columns=LEDGER_COLUMNS
+                )
+
     async def _get_config_flag_in_connection(
         self, connection: asyncpg.Connection, flag_name: str
     ) -> bool:
@@ -701,7 +1182,7 @@ class Database:
     async def _apply_power_unnerf_migration(
         self, connection: asyncpg.Connection
     ) -> None:
-        flag_name = "economy_power_unnerf_v1"
+        flag_name = self._POWER_UNNERF_FLAG
         if await self._get_config_flag_in_connection(connection, flag_name):
             return
         row = await connection.fetchrow(
@@ -734,7 +1215,7 @@ class Database:
     ) -> None:
         if GEMS_REBASE_FACTOR <= 1:
             return
-        flag_name = f"economy_gems_rebase_v1_{GEMS_REBASE_FACTOR}"
+        flag_name = self._gems_rebase_flag()
         if await self._get_config_flag_in_connection(connection, flag_name):
             return
         factor = int(GEMS_REBASE_FACTOR)
@@ -813,626 +1294,812 @@ class Database:
         )
         await self._set_config_flag_in_connection(connection, flag_name, True)
 
+    async def _apply_rap_totals_backfill(self, connection: asyncpg.Connection) -> None:
+        flag_name = self._RAP_TOTALS_FLAG
+        if await self._get_config_flag_in_connection(connection, flag_name):
+            return
+        await self._rebuild_user_rap_totals(connection)
+        await self._set_config_flag_in_connection(connection, flag_name, True)
+
+    @staticmethod
+    def _gems_rebase_flag() -> str:
+        return f"economy_gems_rebase_v1_{GEMS_REBASE_FACTOR}"
+
+    def _economy_data_flags(self) -> list[str]:
+        flags = [self._POWER_UNNERF_FLAG, self._RAP_TOTALS_FLAG]
+        if GEMS_REBASE_FACTOR > 1:
+            flags.append(self._gems_rebase_flag())
+        return flags
+
+    async def _economy_data_pending(self, connection: asyncpg.Connection) -> bool:
+        flags = self._economy_data_flags()
+        applied = await connection.fetchval(
+            "SELECT COUNT(*) FROM config_flags WHERE flag_name = ANY($1::TEXT[]) AND value",
+            flags,
+        )
+        return int(applied or 0) < len(flags)
+
     async def _apply_economy_migrations(self, connection: asyncpg.Connection) -> None:
-        await self._apply_power_unnerf_migration(connection)
-        await self._apply_gems_rebase_migration(connection)
+        """Corrections de données pilotées par la configuration.
+
+        Elles restent hors du registre versionné : chacune est gardée par son
+        propre drapeau (celui du rebase dépend de ``GEMS_REBASE_FACTOR``) et
+        revérifiée à chaque démarrage, si bien qu'un changement de
+        configuration s'applique au démarrage suivant.
+        """
+
+        for step in (
+            self._apply_power_unnerf_migration,
+            self._apply_gems_rebase_migration,
+            self._apply_rap_totals_backfill,
+        ):
+            async with connection.transaction():
+                await step(connection)
+
+    def _schema_migrations(self) -> tuple[Migration, ...]:
+        """Registre complet : étapes Python puis fichiers ``migrations/NNNN_*.sql``.
+
+        Toute évolution future du schéma s'ajoute ici (ou dans ``migrations/``)
+        avec un numéro de version supérieur ; l'état de base n'est plus rejoué.
+        La version 4 est retirée : les corrections de données qu'elle portait
+        dépendent de la configuration et passent par
+        :meth:`_apply_economy_migrations` à chaque démarrage.
+        """
+
+        return build_registry(
+            (
+                Migration(1, "baseline", self._create_base_schema),
+                Migration(5, "catalog_fingerprints", self._create_catalog_fingerprints),
+                Migration(6, "user_pet_index", self._create_user_pet_index),
+            ),
+            load_sql_migrations(),
+        )
+
+    async def _get_schema_version(self, connection: asyncpg.Connection) -> int:
+        try:
+            version = await connection.fetchval("SELECT MAX(version) FROM schema_version")
+        except asyncpg.UndefinedTableError:
+            return 0
+        return int(version or 0)
 
     async def _initialise_schema(self) -> None:
+        registry = self._schema_migrations()
+        target_version = registry[-1].version if registry else 0
         async with self.pool.acquire() as connection:
+            schema_current = await self._get_schema_version(connection) >= target_version
+            if schema_current and not await self._economy_data_pending(connection):
+                logger.info("Schéma à jour (version %d)", target_version)
+                return
+
+            # Les migrations peuvent dépasser le ``statement_timeout`` de la voie
+            # interactive ; le RESET ALL d'asyncpg le rétablit à la libération.
+            await connection.execute("SET statement_timeout = 0")
+
             await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id BIGINT PRIMARY KEY,
-                    balance BIGINT NOT NULL DEFAULT 0 CHECK (balance >= 0),
-                    gems BIGINT NOT NULL DEFAULT 0 CHECK (gems >= 0),
-                    last_daily TIMESTAMPTZ,
-                    daily_streak INTEGER NOT NULL DEFAULT 0 CHECK (daily_streak >= 0),
-                    mastermind_winstreak INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_winstreak >= 0),
-                    mastermind_best_winstreak INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_best_winstreak >= 0),
-                    mastermind_wins INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_wins >= 0),
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    pet_last_claim TIMESTAMPTZ
-                )
-                """
+                "SELECT pg_advisory_lock($1::integer, $2::integer)", *self._MIGRATION_LOCK_KEY
             )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_users_balance_desc ON users(balance DESC)"
+            try:
+                await connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    )
+                    """
+                )
+                # Une autre instance a pu migrer pendant l'attente du verrou.
+                current_version = await self._get_schema_version(connection)
+                for migration in pending_migrations(registry, current_version):
+                    logger.info(
+                        "Migration du schéma %d (%s)", migration.version, migration.name
+                    )
+                    async with connection.transaction():
+                        await migration.apply(connection)
+                        await connection.execute(
+                            "INSERT INTO schema_version (version, name) VALUES ($1, $2)",
+                            migration.version,
+                            migration.name,
+                        )
+                await self._apply_economy_migrations(connection)
+            finally:
+                await connection.execute(
+                    "SELECT pg_advisory_unlock($1::integer, $2::integer)",
+                    *self._MIGRATION_LOCK_KEY,
+                )
+
+    async def _create_catalog_fingerprints(self, connection: asyncpg.Connection) -> None:
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_fingerprints (
+                catalog TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_users_gems_desc ON users(gems DESC)"
+            """
+        )
+
+    async def _create_user_pet_index(self, connection: asyncpg.Connection) -> None:
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_pet_index (
+                user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+                owned BYTEA NOT NULL DEFAULT ''::BYTEA,
+                gold BYTEA NOT NULL DEFAULT ''::BYTEA,
+                rainbow BYTEA NOT NULL DEFAULT ''::BYTEA,
+                galaxy BYTEA NOT NULL DEFAULT ''::BYTEA,
+                shiny BYTEA NOT NULL DEFAULT ''::BYTEA,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS gems BIGINT NOT NULL DEFAULT 0"
-                " CHECK (gems >= 0)"
+            """
+        )
+        # Amorçage depuis les collections actuelles ; l'encodage des bitsets
+        # reste côté Python pour n'avoir qu'une seule définition.
+        rows = await connection.fetch(self._PET_INDEX_SOURCE_QUERY.format(filter=""))
+        await self._store_pet_index(connection, self._pet_index_by_user(rows), replace=True)
+
+    async def _create_base_schema(self, connection: asyncpg.Connection) -> None:
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id BIGINT PRIMARY KEY,
+                balance BIGINT NOT NULL DEFAULT 0 CHECK (balance >= 0),
+                gems BIGINT NOT NULL DEFAULT 0 CHECK (gems >= 0),
+                last_daily TIMESTAMPTZ,
+                daily_streak INTEGER NOT NULL DEFAULT 0 CHECK (daily_streak >= 0),
+                mastermind_winstreak INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_winstreak >= 0),
+                mastermind_best_winstreak INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_best_winstreak >= 0),
+                mastermind_wins INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_wins >= 0),
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                pet_last_claim TIMESTAMPTZ
             )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_last_claim TIMESTAMPTZ"
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_balance_desc ON users(balance DESC)"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_gems_desc ON users(gems DESC)"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS gems BIGINT NOT NULL DEFAULT 0"
+            " CHECK (gems >= 0)"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_last_claim TIMESTAMPTZ"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_streak INTEGER NOT NULL DEFAULT 0"
+            " CHECK (daily_streak >= 0)"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS mastermind_winstreak INTEGER NOT NULL DEFAULT 0"
+            " CHECK (mastermind_winstreak >= 0)"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS mastermind_best_winstreak INTEGER NOT NULL DEFAULT 0"
+            " CHECK (mastermind_best_winstreak >= 0)"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS mastermind_wins INTEGER NOT NULL DEFAULT 0"
+            " CHECK (mastermind_wins >= 0)"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS help_dm_sent_at TIMESTAMPTZ"
+        )
+        await connection.execute(
+            f"""
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS language TEXT NOT NULL
+            DEFAULT '{DEFAULT_LANGUAGE}'
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_booster_multiplier
+            DOUBLE PRECISION NOT NULL DEFAULT 1
+            """
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_booster_expires_at TIMESTAMPTZ"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_booster_activated_at TIMESTAMPTZ"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS active_potion_slug TEXT"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS active_potion_expires_at TIMESTAMPTZ"
+        )
+        await connection.execute(
+            """
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS extra_pet_slots
+            INTEGER NOT NULL DEFAULT 0 CHECK (extra_pet_slots >= 0)
+            """
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS mexico_dispenser_last_claim TIMESTAMPTZ"
+        )
+        await connection.execute(
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS daycare_last_claim TIMESTAMPTZ"
+        )
+        await connection.execute(
+            """
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS race_best_stage
+            INTEGER NOT NULL DEFAULT 0 CHECK (race_best_stage >= 0)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS rebirth_count
+            INTEGER NOT NULL DEFAULT 0 CHECK (rebirth_count >= 0)
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_grades (
+                user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+                grade_level INTEGER NOT NULL DEFAULT 0 CHECK (grade_level >= 0),
+                mastermind_progress INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_progress >= 0),
+                egg_progress INTEGER NOT NULL DEFAULT 0 CHECK (egg_progress >= 0),
+                sale_progress INTEGER NOT NULL DEFAULT 0 CHECK (sale_progress >= 0),
+                potion_progress INTEGER NOT NULL DEFAULT 0 CHECK (potion_progress >= 0),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_streak INTEGER NOT NULL DEFAULT 0"
-                " CHECK (daily_streak >= 0)"
+            """
+        )
+        await connection.execute(
+            "ALTER TABLE user_grades ADD COLUMN IF NOT EXISTS mastermind_progress INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_progress >= 0)"
+        )
+        await connection.execute(
+            "ALTER TABLE user_grades ADD COLUMN IF NOT EXISTS sale_progress INTEGER NOT NULL DEFAULT 0 CHECK (sale_progress >= 0)"
+        )
+        await connection.execute(
+            "ALTER TABLE user_grades ADD COLUMN IF NOT EXISTS potion_progress INTEGER NOT NULL DEFAULT 0 CHECK (potion_progress >= 0)"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_zones (
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                zone_slug TEXT NOT NULL,
+                unlocked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (user_id, zone_slug)
             )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS mastermind_winstreak INTEGER NOT NULL DEFAULT 0"
-                " CHECK (mastermind_winstreak >= 0)"
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pets (
+                pet_id SERIAL PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL,
+                rarity TEXT NOT NULL,
+                image_url TEXT NOT NULL,
+                base_income_per_hour BIGINT NOT NULL CHECK (base_income_per_hour >= 0),
+                drop_rate DOUBLE PRECISION NOT NULL CHECK (drop_rate >= 0)
             )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS mastermind_best_winstreak INTEGER NOT NULL DEFAULT 0"
-                " CHECK (mastermind_best_winstreak >= 0)"
+            """
+        )
+        await connection.execute(
+            "ALTER TABLE pets ALTER COLUMN base_income_per_hour TYPE BIGINT"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_pets (
+                id SERIAL PRIMARY KEY,
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
+                nickname TEXT,
+                acquired_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                is_active BOOLEAN NOT NULL DEFAULT FALSE,
+                is_huge BOOLEAN NOT NULL DEFAULT FALSE,
+                is_gold BOOLEAN NOT NULL DEFAULT FALSE
             )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS mastermind_wins INTEGER NOT NULL DEFAULT 0"
-                " CHECK (mastermind_wins >= 0)"
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_pets_user ON user_pets(user_id)"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_pets_active ON user_pets(user_id) WHERE is_active"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_daycare (
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                user_pet_id INTEGER NOT NULL REFERENCES user_pets(id) ON DELETE CASCADE,
+                deposited_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (user_id, user_pet_id)
             )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS help_dm_sent_at TIMESTAMPTZ"
-            )
-            await connection.execute(
-                f"""
-                ALTER TABLE users ADD COLUMN IF NOT EXISTS language TEXT NOT NULL
-                DEFAULT '{DEFAULT_LANGUAGE}'
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_booster_multiplier
-                DOUBLE PRECISION NOT NULL DEFAULT 1
-                """
-            )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_booster_expires_at TIMESTAMPTZ"
-            )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS pet_booster_activated_at TIMESTAMPTZ"
-            )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS active_potion_slug TEXT"
-            )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS active_potion_expires_at TIMESTAMPTZ"
-            )
-            await connection.execute(
-                """
-                ALTER TABLE users ADD COLUMN IF NOT EXISTS extra_pet_slots
-                INTEGER NOT NULL DEFAULT 0 CHECK (extra_pet_slots >= 0)
-                """
-            )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS mexico_dispenser_last_claim TIMESTAMPTZ"
-            )
-            await connection.execute(
-                "ALTER TABLE users ADD COLUMN IF NOT EXISTS daycare_last_claim TIMESTAMPTZ"
-            )
-            await connection.execute(
-                """
-                ALTER TABLE users ADD COLUMN IF NOT EXISTS race_best_stage
-                INTEGER NOT NULL DEFAULT 0 CHECK (race_best_stage >= 0)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE users ADD COLUMN IF NOT EXISTS rebirth_count
-                INTEGER NOT NULL DEFAULT 0 CHECK (rebirth_count >= 0)
-                """
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_grades (
-                    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
-                    grade_level INTEGER NOT NULL DEFAULT 0 CHECK (grade_level >= 0),
-                    mastermind_progress INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_progress >= 0),
-                    egg_progress INTEGER NOT NULL DEFAULT 0 CHECK (egg_progress >= 0),
-                    sale_progress INTEGER NOT NULL DEFAULT 0 CHECK (sale_progress >= 0),
-                    potion_progress INTEGER NOT NULL DEFAULT 0 CHECK (potion_progress >= 0),
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
-            )
-            await connection.execute(
-                "ALTER TABLE user_grades ADD COLUMN IF NOT EXISTS mastermind_progress INTEGER NOT NULL DEFAULT 0 CHECK (mastermind_progress >= 0)"
-            )
-            await connection.execute(
-                "ALTER TABLE user_grades ADD COLUMN IF NOT EXISTS sale_progress INTEGER NOT NULL DEFAULT 0 CHECK (sale_progress >= 0)"
-            )
-            await connection.execute(
-                "ALTER TABLE user_grades ADD COLUMN IF NOT EXISTS potion_progress INTEGER NOT NULL DEFAULT 0 CHECK (potion_progress >= 0)"
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_zones (
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    zone_slug TEXT NOT NULL,
-                    unlocked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    PRIMARY KEY (user_id, zone_slug)
-                )
-                """
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS pets (
-                    pet_id SERIAL PRIMARY KEY,
-                    name TEXT UNIQUE NOT NULL,
-                    rarity TEXT NOT NULL,
-                    image_url TEXT NOT NULL,
-                    base_income_per_hour BIGINT NOT NULL CHECK (base_income_per_hour >= 0),
-                    drop_rate DOUBLE PRECISION NOT NULL CHECK (drop_rate >= 0)
-                )
-                """
-            )
-            await connection.execute(
-                "ALTER TABLE pets ALTER COLUMN base_income_per_hour TYPE BIGINT"
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_pets (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
-                    nickname TEXT,
-                    acquired_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    is_active BOOLEAN NOT NULL DEFAULT FALSE,
-                    is_huge BOOLEAN NOT NULL DEFAULT FALSE,
-                    is_gold BOOLEAN NOT NULL DEFAULT FALSE
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_pets_user ON user_pets(user_id)"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_pets_active ON user_pets(user_id) WHERE is_active"
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_daycare (
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    user_pet_id INTEGER NOT NULL REFERENCES user_pets(id) ON DELETE CASCADE,
-                    deposited_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    PRIMARY KEY (user_id, user_pet_id)
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_daycare_user ON user_daycare(user_id)"
-            )
-            await connection.execute(
-                "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_gold BOOLEAN NOT NULL DEFAULT FALSE"
-            )
-            await connection.execute(
-                "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_rainbow BOOLEAN NOT NULL DEFAULT FALSE"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_pets_rainbow ON user_pets(user_id) WHERE is_rainbow"
-            )
-            await connection.execute(
-                "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_galaxy BOOLEAN NOT NULL DEFAULT FALSE"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_pets_galaxy ON user_pets(user_id) WHERE is_galaxy"
-            )
-            await connection.execute(
-                "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_shiny BOOLEAN NOT NULL DEFAULT FALSE"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_pets_shiny ON user_pets(user_id) WHERE is_shiny"
-            )
-            await connection.execute(
-                "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS huge_level INTEGER NOT NULL DEFAULT 1"
-            )
-            await connection.execute(
-                "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS huge_xp BIGINT NOT NULL DEFAULT 0"
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS pet_openings (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
-                    opened_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_pet_openings_user ON pet_openings(user_id)"
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_masteries (
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    mastery_slug TEXT NOT NULL,
-                    level INTEGER NOT NULL DEFAULT 1 CHECK (level >= 1),
-                    experience BIGINT NOT NULL DEFAULT 0 CHECK (experience >= 0),
-                    PRIMARY KEY (user_id, mastery_slug)
-                )
-                """
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_daycare_user ON user_daycare(user_id)"
+        )
+        await connection.execute(
+            "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_gold BOOLEAN NOT NULL DEFAULT FALSE"
+        )
+        await connection.execute(
+            "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_rainbow BOOLEAN NOT NULL DEFAULT FALSE"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_pets_rainbow ON user_pets(user_id) WHERE is_rainbow"
+        )
+        await connection.execute(
+            "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_galaxy BOOLEAN NOT NULL DEFAULT FALSE"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_pets_galaxy ON user_pets(user_id) WHERE is_galaxy"
+        )
+        await connection.execute(
+            "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS is_shiny BOOLEAN NOT NULL DEFAULT FALSE"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_pets_shiny ON user_pets(user_id) WHERE is_shiny"
+        )
+        await connection.execute(
+            "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS huge_level INTEGER NOT NULL DEFAULT 1"
+        )
+        await connection.execute(
+            "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS huge_xp BIGINT NOT NULL DEFAULT 0"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pet_openings (
+                id SERIAL PRIMARY KEY,
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
+                opened_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_masteries_slug ON user_masteries(mastery_slug)"
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pet_openings_user ON pet_openings(user_id)"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_masteries (
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                mastery_slug TEXT NOT NULL,
+                level INTEGER NOT NULL DEFAULT 1 CHECK (level >= 1),
+                experience BIGINT NOT NULL DEFAULT 0 CHECK (experience >= 0),
+                PRIMARY KEY (user_id, mastery_slug)
             )
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_masteries_slug ON user_masteries(mastery_slug)"
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_pet_preferences (
-                    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
-                    auto_goldify_enabled BOOLEAN NOT NULL DEFAULT TRUE,
-                    auto_rainbowify_enabled BOOLEAN NOT NULL DEFAULT TRUE
-                )
-                """
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_pet_preferences (
+                user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+                auto_goldify_enabled BOOLEAN NOT NULL DEFAULT TRUE,
+                auto_rainbowify_enabled BOOLEAN NOT NULL DEFAULT TRUE
             )
+            """
+        )
 
-            await self._ensure_transactions_table(connection)
+        await self._ensure_transactions_table(connection)
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS gemshop_roles (
-                    role_id BIGINT PRIMARY KEY,
-                    sold INTEGER NOT NULL DEFAULT 0
-                )
-                """
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS gemshop_roles (
+                role_id BIGINT PRIMARY KEY,
+                sold INTEGER NOT NULL DEFAULT 0
             )
+            """
+        )
 
-            await connection.execute(
-                "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS on_market BOOLEAN NOT NULL DEFAULT FALSE"
-            )
-            # FIX: Speed up market lookups by indexing the on_market flag.
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_pets_on_market ON user_pets(on_market)"
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS market_listings (
-                    id SERIAL PRIMARY KEY,
-                    seller_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    buyer_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
-                    user_pet_id INTEGER NOT NULL REFERENCES user_pets(id) ON DELETE CASCADE,
-                    price BIGINT NOT NULL CHECK (price >= 0),
-                    status VARCHAR(20) NOT NULL DEFAULT 'active',
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    completed_at TIMESTAMPTZ
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_market_listings_status ON market_listings(status)"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_market_listings_seller ON market_listings(seller_id)"
-            )
-            await connection.execute(
-                """
-                CREATE UNIQUE INDEX IF NOT EXISTS idx_market_listings_pet_active
-                ON market_listings(user_pet_id)
-                WHERE status = 'active'
-                """
+        await connection.execute(
+            "ALTER TABLE user_pets ADD COLUMN IF NOT EXISTS on_market BOOLEAN NOT NULL DEFAULT FALSE"
+        )
+        # FIX: Speed up market lookups by indexing the on_market flag.
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_pets_on_market ON user_pets(on_market)"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS market_listings (
+                id SERIAL PRIMARY KEY,
+                seller_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                buyer_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
+                user_pet_id INTEGER NOT NULL REFERENCES user_pets(id) ON DELETE CASCADE,
+                price BIGINT NOT NULL CHECK (price >= 0),
+                status VARCHAR(20) NOT NULL DEFAULT 'active',
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                completed_at TIMESTAMPTZ
             )
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_market_listings_status ON market_listings(status)"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_market_listings_seller ON market_listings(seller_id)"
+        )
+        await connection.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_market_listings_pet_active
+            ON market_listings(user_pet_id)
+            WHERE status = 'active'
+            """
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS pet_trade_history (
-                    id SERIAL PRIMARY KEY,
-                    pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
-                    is_gold BOOLEAN NOT NULL DEFAULT FALSE,
-                    is_rainbow BOOLEAN NOT NULL DEFAULT FALSE,
-                    is_galaxy BOOLEAN NOT NULL DEFAULT FALSE,
-                    is_shiny BOOLEAN NOT NULL DEFAULT FALSE,
-                    price BIGINT NOT NULL CHECK (price >= 0),
-                    source TEXT NOT NULL CHECK (source IN ('stand', 'trade')),
-                    recorded_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
-            )
-            await connection.execute(
-                "ALTER TABLE pet_trade_history ADD COLUMN IF NOT EXISTS is_galaxy BOOLEAN NOT NULL DEFAULT FALSE"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_pet_trade_history_pet ON pet_trade_history(pet_id)"
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pet_trade_history (
+                id SERIAL PRIMARY KEY,
+                pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
+                is_gold BOOLEAN NOT NULL DEFAULT FALSE,
+                is_rainbow BOOLEAN NOT NULL DEFAULT FALSE,
+                is_galaxy BOOLEAN NOT NULL DEFAULT FALSE,
+                is_shiny BOOLEAN NOT NULL DEFAULT FALSE,
+                price BIGINT NOT NULL CHECK (price >= 0),
+                source TEXT NOT NULL CHECK (source IN ('stand', 'trade')),
+                recorded_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS pet_market_values (
-                    pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
-                    variant_code TEXT NOT NULL,
-                    value_in_gems BIGINT NOT NULL CHECK (value_in_gems >= 0),
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    PRIMARY KEY (pet_id, variant_code)
-                )
-                """
+            """
+        )
+        await connection.execute(
+            "ALTER TABLE pet_trade_history ADD COLUMN IF NOT EXISTS is_galaxy BOOLEAN NOT NULL DEFAULT FALSE"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pet_trade_history_pet ON pet_trade_history(pet_id)"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pet_market_values (
+                pet_id INTEGER NOT NULL REFERENCES pets(pet_id) ON DELETE CASCADE,
+                variant_code TEXT NOT NULL,
+                value_in_gems BIGINT NOT NULL CHECK (value_in_gems >= 0),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (pet_id, variant_code)
             )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS config_flags (
-                    flag_name TEXT PRIMARY KEY,
-                    value BOOLEAN NOT NULL DEFAULT FALSE,
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-                """
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_rap_totals (
+                user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+                rap_total BIGINT NOT NULL DEFAULT 0 CHECK (rap_total >= 0),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_config_flags_name ON config_flags(flag_name)"
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_rap_totals_rank "
+            "ON user_rap_totals(rap_total DESC, user_id) WHERE rap_total > 0"
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS config_flags (
+                flag_name TEXT PRIMARY KEY,
+                value BOOLEAN NOT NULL DEFAULT FALSE,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_config_flags_name ON config_flags(flag_name)"
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS koth_states (
-                    guild_id BIGINT PRIMARY KEY,
-                    king_user_id BIGINT,
-                    channel_id BIGINT,
-                    claimed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    last_roll_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS koth_states (
+                guild_id BIGINT PRIMARY KEY,
+                king_user_id BIGINT,
+                channel_id BIGINT,
+                claimed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                last_roll_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
+            """
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS plaza_consumable_listings (
-                    id SERIAL PRIMARY KEY,
-                    seller_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    buyer_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
-                    item_type TEXT NOT NULL CHECK (item_type IN ('ticket', 'potion', 'role')),
-                    item_slug TEXT,
-                    item_power SMALLINT,
-                    quantity INTEGER NOT NULL CHECK (quantity > 0),
-                    price BIGINT NOT NULL CHECK (price >= 0),
-                    status VARCHAR(20) NOT NULL DEFAULT 'active',
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    completed_at TIMESTAMPTZ
-                )
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE plaza_consumable_listings
-                DROP CONSTRAINT IF EXISTS plaza_consumable_listings_item_type_check
-                """
-            )
-            await connection.execute(
-                "ALTER TABLE plaza_consumable_listings ADD COLUMN IF NOT EXISTS item_power SMALLINT"
-            )
-            await connection.execute(
-                """
-                ALTER TABLE plaza_consumable_listings
-                ADD CONSTRAINT plaza_consumable_listings_item_type_check
-                CHECK (item_type IN ('ticket', 'potion', 'role', 'enchantment'))
-                """
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_plaza_consumable_status ON plaza_consumable_listings(status)"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_plaza_consumable_seller ON plaza_consumable_listings(seller_id)"
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plaza_consumable_listings (
+                id SERIAL PRIMARY KEY,
+                seller_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                buyer_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
+                item_type TEXT NOT NULL CHECK (item_type IN ('ticket', 'potion', 'role')),
+                item_slug TEXT,
+                item_power SMALLINT,
+                quantity INTEGER NOT NULL CHECK (quantity > 0),
+                price BIGINT NOT NULL CHECK (price >= 0),
+                status VARCHAR(20) NOT NULL DEFAULT 'active',
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                completed_at TIMESTAMPTZ
             )
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE plaza_consumable_listings
+            DROP CONSTRAINT IF EXISTS plaza_consumable_listings_item_type_check
+            """
+        )
+        await connection.execute(
+            "ALTER TABLE plaza_consumable_listings ADD COLUMN IF NOT EXISTS item_power SMALLINT"
+        )
+        await connection.execute(
+            """
+            ALTER TABLE plaza_consumable_listings
+            ADD CONSTRAINT plaza_consumable_listings_item_type_check
+            CHECK (item_type IN ('ticket', 'potion', 'role', 'enchantment'))
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_plaza_consumable_status ON plaza_consumable_listings(status)"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_plaza_consumable_seller ON plaza_consumable_listings(seller_id)"
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS plaza_auctions (
-                    id SERIAL PRIMARY KEY,
-                    seller_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    buyer_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
-                    item_type TEXT NOT NULL CHECK (item_type IN ('pet', 'ticket', 'potion', 'enchantment')),
-                    item_slug TEXT,
-                    item_power SMALLINT,
-                    quantity INTEGER NOT NULL DEFAULT 1 CHECK (quantity > 0),
-                    user_pet_id BIGINT REFERENCES user_pets(id) ON DELETE SET NULL,
-                    starting_bid BIGINT NOT NULL CHECK (starting_bid > 0),
-                    min_increment BIGINT NOT NULL CHECK (min_increment > 0),
-                    current_bid BIGINT NOT NULL DEFAULT 0 CHECK (current_bid >= 0),
-                    current_bidder_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
-                    buyout_price BIGINT,
-                    status VARCHAR(20) NOT NULL DEFAULT 'active',
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    ends_at TIMESTAMPTZ NOT NULL,
-                    completed_at TIMESTAMPTZ
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_plaza_auction_status ON plaza_auctions(status)"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_plaza_auction_ends ON plaza_auctions(ends_at)"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_plaza_auction_seller ON plaza_auctions(seller_id)"
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plaza_auctions (
+                id SERIAL PRIMARY KEY,
+                seller_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                buyer_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
+                item_type TEXT NOT NULL CHECK (item_type IN ('pet', 'ticket', 'potion', 'enchantment')),
+                item_slug TEXT,
+                item_power SMALLINT,
+                quantity INTEGER NOT NULL DEFAULT 1 CHECK (quantity > 0),
+                user_pet_id BIGINT REFERENCES user_pets(id) ON DELETE SET NULL,
+                starting_bid BIGINT NOT NULL CHECK (starting_bid > 0),
+                min_increment BIGINT NOT NULL CHECK (min_increment > 0),
+                current_bid BIGINT NOT NULL DEFAULT 0 CHECK (current_bid >= 0),
+                current_bidder_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
+                buyout_price BIGINT,
+                status VARCHAR(20) NOT NULL DEFAULT 'active',
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                ends_at TIMESTAMPTZ NOT NULL,
+                completed_at TIMESTAMPTZ
             )
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_plaza_auction_status ON plaza_auctions(status)"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_plaza_auction_ends ON plaza_auctions(ends_at)"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_plaza_auction_seller ON plaza_auctions(seller_id)"
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS clans (
-                    clan_id SERIAL PRIMARY KEY,
-                    name TEXT UNIQUE NOT NULL,
-                    owner_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    capacity_level INTEGER NOT NULL DEFAULT 0 CHECK (capacity_level >= 0),
-                    boost_level INTEGER NOT NULL DEFAULT 0 CHECK (boost_level >= 0),
-                    clan_level INTEGER NOT NULL DEFAULT 1 CHECK (clan_level >= 1),
-                    total_investment BIGINT NOT NULL DEFAULT 0 CHECK (total_investment >= 0),
-                    pb_boost_multiplier DOUBLE PRECISION NOT NULL DEFAULT 1 CHECK (pb_boost_multiplier >= 1),
-                    banner_emoji TEXT NOT NULL DEFAULT '⚔️'
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE UNIQUE INDEX IF NOT EXISTS idx_clans_lower_name ON clans (LOWER(name))"
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clans ADD COLUMN IF NOT EXISTS capacity_level INTEGER NOT NULL DEFAULT 0
-                    CHECK (capacity_level >= 0)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clans ADD COLUMN IF NOT EXISTS boost_level INTEGER NOT NULL DEFAULT 0
-                    CHECK (boost_level >= 0)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clans ADD COLUMN IF NOT EXISTS clan_level INTEGER NOT NULL DEFAULT 1
-                    CHECK (clan_level >= 1)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clans ADD COLUMN IF NOT EXISTS total_investment BIGINT NOT NULL DEFAULT 0
-                    CHECK (total_investment >= 0)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clans ADD COLUMN IF NOT EXISTS pb_boost_multiplier DOUBLE PRECISION NOT NULL DEFAULT 1
-                    CHECK (pb_boost_multiplier >= 1)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clans ADD COLUMN IF NOT EXISTS shiny_luck_multiplier DOUBLE PRECISION NOT NULL DEFAULT 1
-                    CHECK (shiny_luck_multiplier >= 1)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clans ADD COLUMN IF NOT EXISTS banner_emoji TEXT NOT NULL DEFAULT '⚔️'
-                """
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clans (
+                clan_id SERIAL PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL,
+                owner_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                capacity_level INTEGER NOT NULL DEFAULT 0 CHECK (capacity_level >= 0),
+                boost_level INTEGER NOT NULL DEFAULT 0 CHECK (boost_level >= 0),
+                clan_level INTEGER NOT NULL DEFAULT 1 CHECK (clan_level >= 1),
+                total_investment BIGINT NOT NULL DEFAULT 0 CHECK (total_investment >= 0),
+                pb_boost_multiplier DOUBLE PRECISION NOT NULL DEFAULT 1 CHECK (pb_boost_multiplier >= 1),
+                banner_emoji TEXT NOT NULL DEFAULT '⚔️'
             )
+            """
+        )
+        await connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_clans_lower_name ON clans (LOWER(name))"
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clans ADD COLUMN IF NOT EXISTS capacity_level INTEGER NOT NULL DEFAULT 0
+                CHECK (capacity_level >= 0)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clans ADD COLUMN IF NOT EXISTS boost_level INTEGER NOT NULL DEFAULT 0
+                CHECK (boost_level >= 0)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clans ADD COLUMN IF NOT EXISTS clan_level INTEGER NOT NULL DEFAULT 1
+                CHECK (clan_level >= 1)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clans ADD COLUMN IF NOT EXISTS total_investment BIGINT NOT NULL DEFAULT 0
+                CHECK (total_investment >= 0)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clans ADD COLUMN IF NOT EXISTS pb_boost_multiplier DOUBLE PRECISION NOT NULL DEFAULT 1
+                CHECK (pb_boost_multiplier >= 1)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clans ADD COLUMN IF NOT EXISTS shiny_luck_multiplier DOUBLE PRECISION NOT NULL DEFAULT 1
+                CHECK (shiny_luck_multiplier >= 1)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clans ADD COLUMN IF NOT EXISTS banner_emoji TEXT NOT NULL DEFAULT '⚔️'
+            """
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS clan_members (
-                    clan_id INTEGER NOT NULL REFERENCES clans(clan_id) ON DELETE CASCADE,
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    role TEXT NOT NULL DEFAULT 'member',
-                    joined_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    contribution BIGINT NOT NULL DEFAULT 0 CHECK (contribution >= 0),
-                    last_activity TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    PRIMARY KEY (clan_id, user_id)
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE UNIQUE INDEX IF NOT EXISTS idx_clan_members_user ON clan_members(user_id)"
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clan_members ADD COLUMN IF NOT EXISTS contribution BIGINT NOT NULL DEFAULT 0
-                    CHECK (contribution >= 0)
-                """
-            )
-            await connection.execute(
-                """
-                ALTER TABLE clan_members ADD COLUMN IF NOT EXISTS last_activity TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                """
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clan_members (
+                clan_id INTEGER NOT NULL REFERENCES clans(clan_id) ON DELETE CASCADE,
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                role TEXT NOT NULL DEFAULT 'member',
+                joined_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                contribution BIGINT NOT NULL DEFAULT 0 CHECK (contribution >= 0),
+                last_activity TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (clan_id, user_id)
             )
+            """
+        )
+        await connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_clan_members_user ON clan_members(user_id)"
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clan_members ADD COLUMN IF NOT EXISTS contribution BIGINT NOT NULL DEFAULT 0
+                CHECK (contribution >= 0)
+            """
+        )
+        await connection.execute(
+            """
+            ALTER TABLE clan_members ADD COLUMN IF NOT EXISTS last_activity TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            """
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_activity (
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    message_count BIGINT NOT NULL DEFAULT 0 CHECK (message_count >= 0),
-                    last_message_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    PRIMARY KEY (guild_id, user_id)
-                )
-                """
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_activity_guild_count ON user_activity(guild_id, message_count DESC)"
-            )
-            await connection.execute(
-                "CREATE INDEX IF NOT EXISTS idx_user_activity_last_message ON user_activity(guild_id, last_message_at DESC)"
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_activity (
+                guild_id BIGINT NOT NULL,
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                message_count BIGINT NOT NULL DEFAULT 0 CHECK (message_count >= 0),
+                last_message_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (guild_id, user_id)
             )
+            """
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_activity_guild_count ON user_activity(guild_id, message_count DESC)"
+        )
+        await connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_activity_last_message ON user_activity(guild_id, last_message_at DESC)"
+        )
 
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_potions (
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    potion_slug TEXT NOT NULL,
-                    quantity INTEGER NOT NULL DEFAULT 0 CHECK (quantity >= 0),
-                    PRIMARY KEY (user_id, potion_slug)
-                )
-                """
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_enchantments (
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    slug TEXT NOT NULL,
-                    power SMALLINT NOT NULL CHECK (power BETWEEN 1 AND 10),
-                    quantity INTEGER NOT NULL DEFAULT 0 CHECK (quantity >= 0),
-                    PRIMARY KEY (user_id, slug, power)
-                )
-                """
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS user_equipped_enchantments (
-                    user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                    slug TEXT NOT NULL,
-                    power SMALLINT NOT NULL CHECK (power BETWEEN 1 AND 10),
-                    equipped_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    PRIMARY KEY (user_id, slug)
-                )
-                """
-            )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS raffle_tickets (
-                    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
-                    quantity BIGINT NOT NULL DEFAULT 0 CHECK (quantity >= 0),
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_potions (
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                potion_slug TEXT NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0 CHECK (quantity >= 0),
+                PRIMARY KEY (user_id, potion_slug)
             )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS raffle_entries (
-                    user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
-                    quantity BIGINT NOT NULL DEFAULT 0 CHECK (quantity >= 0),
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_enchantments (
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                slug TEXT NOT NULL,
+                power SMALLINT NOT NULL CHECK (power BETWEEN 1 AND 10),
+                quantity INTEGER NOT NULL DEFAULT 0 CHECK (quantity >= 0),
+                PRIMARY KEY (user_id, slug, power)
             )
-            await connection.execute(
-                """
-                CREATE TABLE IF NOT EXISTS raffle_draws (
-                    id SERIAL PRIMARY KEY,
-                    winner_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
-                    drawn_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    total_tickets BIGINT NOT NULL CHECK (total_tickets >= 0),
-                    winning_ticket BIGINT NOT NULL CHECK (winning_ticket >= 1)
-                )
-                """
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_equipped_enchantments (
+                user_id BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                slug TEXT NOT NULL,
+                power SMALLINT NOT NULL CHECK (power BETWEEN 1 AND 10),
+                equipped_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (user_id, slug)
             )
-            await connection.execute(
-                "ALTER TABLE raffle_tickets ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS raffle_tickets (
+                user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+                quantity BIGINT NOT NULL DEFAULT 0 CHECK (quantity >= 0),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
             )
-            await connection.execute(
-                "ALTER TABLE raffle_entries ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS raffle_entries (
+                user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+                quantity BIGINT NOT NULL DEFAULT 0 CHECK (quantity >= 0),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+        await connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS raffle_draws (
+                id SERIAL PRIMARY KEY,
+                winner_id BIGINT REFERENCES users(user_id) ON DELETE SET NULL,
+                drawn_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                total_tickets BIGINT NOT NULL CHECK (total_tickets >= 0),
+                winning_ticket BIGINT NOT NULL CHECK (winning_ticket >= 1)
             )
+            """
+        )
+        await connection.execute(
+            "ALTER TABLE raffle_tickets ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+        )
+        await connection.execute(
+            "ALTER TABLE raffle_entries ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+        )
+
+    async def _cached_read(
+        self,
+        cache: LruTTLCache[object],
+        key: Tuple[object, ...],
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Lecture mise en cache avec un seul chargement en vol par clé.
+
+        Une entrée expirée mais encore dans son délai de grâce est servie
+        immédiatement pendant qu'une tâche de fond la recharge.
+        """
+
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = cache.generation()
+
+        async def load() -> Any:
+            value = await loader()
+            cache.set(key, value, generation=generation)
+            return value
 
-            await self._apply_economy_migrations(connection)
+        # La tâche partagée copie le contexte : elle hérite de l'étiquette
+        # ``query_label`` posée par la méthode appelante.
+        stale = cache.get_stale(key)
+        if stale is not None:
+            self._single_flight.refresh(key, load)
+            return stale
+        return await self._single_flight.run(key, load)
 
     # ------------------------------------------------------------------
     # Utilitaires généraux
     # ------------------------------------------------------------------
     async def ensure_user(self, user_id: int) -> None:
+        if self._known_users.get(user_id):
+            return
         await self.pool.execute(
             """
-            INSERT INTO users (user_id)
-            VALUES ($1)
-            ON CONFLICT (user_id) DO NOTHING
-            """,
-            user_id,
-        )
-        await self.pool.execute(
-            """
+            WITH new_user AS (
+                INSERT INTO users (user_id)
+                VALUES ($1)
+                ON CONFLICT (user_id) DO NOTHING
+            )
             INSERT INTO user_grades (user_id)
             VALUES ($1)
             ON CONFLICT (user_id) DO NOTHING
             """,
             user_id,
         )
+        self._known_users.set(user_id, True)
+
+    def forget_user(self, user_id: int) -> None:
+        """Retire un joueur du registre local après une réinitialisation."""
+
+        self._known_users.invalidate(user_id)
 
     async def get_user_language(self, user_id: int) -> str:
         await self.ensure_user(user_id)
@@ -1560,10 +2227,6 @@ class Database:
 
     async def get_mastermind_winstreak_leaderboard(self, limit: int) -> Sequence[asyncpg.Record]:
         clamped_limit = max(0, int(limit))
-        cache_key = ("leaderboard_mastermind_winstreak", clamped_limit)
-        cached = self._leaderboard_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
         query = """
             SELECT user_id, mastermind_best_winstreak, mastermind_winstreak, mastermind_wins
             FROM users
@@ -1571,15 +2234,21 @@ class Database:
             ORDER BY mastermind_best_winstreak DESC, mastermind_wins DESC, mastermind_winstreak DESC, user_id ASC
             LIMIT $1
         """
-        rows = await self._fetch(query, clamped_limit)
-        self._leaderboard_cache.set(cache_key, rows)
-        return rows
+        return await self._cached_read(
+            self._leaderboard_cache,
+            ("leaderboard_mastermind_winstreak", clamped_limit),
+            lambda: self._fetch(query, clamped_limit),
+        )
 
     async def get_transaction_count(
         self, user_id: int, *, transaction_type: str
     ) -> int:
-        _ = (user_id, transaction_type)
-        return 0
+        value = await self._fetchval(
+            "SELECT COUNT(*) FROM transactions WHERE user_id = $1 AND transaction_type = $2",
+            user_id,
+            transaction_type,
+        )
+        return int(value or 0)
 
     async def add_raffle_tickets(
         self,
@@ -1613,6 +2282,7 @@ class Database:
         )
         if row is None:
             raise DatabaseError("Impossible de mettre à jour les tickets de tombola")
+        self._publish_invalidation((user_id,), invalidation.TICKETS, connection=connection)
         return int(row.get("quantity", 0) or 0)
 
     async def get_user_raffle_tickets(self, user_id: int) -> int:
@@ -1684,6 +2354,7 @@ class Database:
                 user_id,
             )
 
+        self._publish_invalidation((user_id,), invalidation.TICKETS, connection=connection)
         return new_quantity
 
     async def stake_raffle_tickets(
@@ -1697,6 +2368,7 @@ class Database:
 
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.TICKETS, connection=connection)
             row = await connection.fetchrow(
                 "SELECT quantity FROM raffle_tickets WHERE user_id = $1 FOR UPDATE",
                 user_id,
@@ -1753,6 +2425,7 @@ class Database:
     ) -> tuple[int, int]:
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.TICKETS, connection=connection)
             entry_row = await connection.fetchrow(
                 "SELECT quantity FROM raffle_entries WHERE user_id = $1 FOR UPDATE",
                 user_id,
@@ -1806,6 +2479,7 @@ class Database:
 
     async def draw_raffle_winner(self) -> tuple[int, int, int] | None:
         async with self.transaction() as connection:
+            self._publish_invalidation(None, invalidation.TICKETS, connection=connection)
             rows = await connection.fetch(
                 """
                 SELECT user_id, quantity
@@ -1913,6 +2587,7 @@ class Database:
             potion_slug,
             quantity,
         )
+        self._publish_invalidation((user_id,), invalidation.POTIONS, connection=connection)
 
     async def get_user_potions(self, user_id: int) -> Sequence[asyncpg.Record]:
         await self.ensure_user(user_id)
@@ -1978,6 +2653,7 @@ class Database:
                 potion_slug,
             )
 
+        self._publish_invalidation((user_id,), invalidation.POTIONS, connection=connection)
         return True
 
     async def add_user_enchantment(
@@ -2010,6 +2686,7 @@ class Database:
             power,
             quantity,
         )
+        self._publish_invalidation((user_id,), invalidation.ENCHANTMENTS, connection=connection)
 
     async def consume_user_enchantment(
         self,
@@ -2076,6 +2753,7 @@ class Database:
                 slug,
                 power,
             )
+        self._publish_invalidation((user_id,), invalidation.ENCHANTMENTS, connection=connection)
         return True
 
     async def sell_enchantment_for_gems(
@@ -2097,6 +2775,7 @@ class Database:
         await self.ensure_user(user_id)
 
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.ENCHANTMENTS, connection=connection)
             owned_row = await connection.fetchrow(
                 """
                 SELECT quantity
@@ -2222,6 +2901,7 @@ class Database:
 
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.ENCHANTMENTS, connection=connection)
             owned_row = await connection.fetchrow(
                 """
                 SELECT quantity
@@ -2292,6 +2972,7 @@ class Database:
             user_id,
             slug,
         )
+        self._publish_invalidation((user_id,), invalidation.ENCHANTMENTS)
         return bool(result and result.endswith("DELETE 1"))
 
     async def get_enchantment_powers(self, user_id: int) -> Dict[str, int]:
@@ -2370,6 +3051,7 @@ class Database:
             potion_slug,
             expires_at,
         )
+        self._publish_invalidation((user_id,), invalidation.POTIONS, connection=connection)
 
     async def clear_active_potion(
         self, user_id: int, *, connection: asyncpg.Connection | None = None
@@ -2390,6 +3072,7 @@ class Database:
             """,
             user_id,
         )
+        self._publish_invalidation((user_id,), invalidation.POTIONS, connection=connection)
 
     async def grant_pet_booster(
         self,
@@ -2411,6 +3094,7 @@ class Database:
         expires_at = now + timedelta(seconds=duration_seconds)
 
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.POTIONS, connection=connection)
             row = await connection.fetchrow(
                 """
                 SELECT
@@ -2476,18 +3160,36 @@ class Database:
         related_user_id: int | None = None,
         connection: asyncpg.Connection | None = None,
     ) -> None:
-        _ = (
-            user_id,
-            transaction_type,
-            currency,
-            amount,
-            balance_before,
-            balance_after,
-            description,
-            related_user_id,
-            connection,
+        """Ajoute une ligne au journal des transactions sans requête SQL.
+
+        La ligne est mise en file et écrite par lots en arrière-plan. Avec
+        ``connection``, elle n'est publiée qu'après le COMMIT et disparaît en cas
+        de ROLLBACK ; la connexion doit donc provenir de :meth:`transaction`.
+        """
+
+        entry = LedgerEntry(
+            user_id=int(user_id),
+            transaction_type=str(transaction_type)[:50],
+            currency=str(currency),
+            amount=int(amount),
+            balance_before=int(balance_before),
+            balance_after=int(balance_after),
+            description=description,
+            related_user_id=int(related_user_id) if related_user_id is not None else None,
+            created_at=datetime.now(timezone.utc),
+        )
+        if connection is not None:
+            pending = self._ledger_pending.get(id(connection))
+            if pending is None:
+                raise DatabaseError("La connexion doit provenir de Database.transaction()")
+            pending.append(entry)
+        self._publish_invalidation(
+            (entry.user_id,),
+            invalidation.GEMS if entry.currency == "gem" else invalidation.BALANCE,
+            connection=connection,
         )
-        return
+        if connection is None:
+            await self._ledger.put((entry,))
 
     # ------------------------------------------------------------------
     # Statistiques d'activité
@@ -2519,6 +3221,113 @@ class Database:
             now,
         )
 
+    async def apply_message_batch(
+        self,
+        activity: Mapping[tuple[int, int], tuple[int, datetime]],
+        rewards: Mapping[tuple[int, int], int],
+    ) -> None:
+        """Applique en une transaction un lot de messages agrégés.
+
+        ``activity`` associe ``(guild_id, user_id)`` au nombre de messages et à
+        l'horodatage du dernier ; ``rewards`` associe ``(user_id, montant brut
+        d'un message)`` au nombre de messages récompensés. Le bonus de rebirth
+        est appliqué à chaque message, comme pour un crédit individuel.
+        """
+
+        if not activity and not rewards:
+            return
+
+        reward_counts: defaultdict[int, list[tuple[int, int]]] = defaultdict(list)
+        for (user_id, amount), count in rewards.items():
+            if amount > 0 and count > 0:
+                reward_counts[int(user_id)].append((int(amount), int(count)))
+        user_ids = sorted({user_id for _guild_id, user_id in activity} | set(reward_counts))
+
+        async with self.transaction() as connection:
+            await connection.execute(
+                """
+                WITH new_users AS (
+                    INSERT INTO users (user_id)
+                    SELECT unnest($1::BIGINT[])
+                    ON CONFLICT (user_id) DO NOTHING
+                )
+                INSERT INTO user_grades (user_id)
+                SELECT unnest($1::BIGINT[])
+                ON CONFLICT (user_id) DO NOTHING
+                """,
+                user_ids,
+            )
+
+            if activity:
+                keys = sorted(activity)
+                await connection.execute(
+                    """
+                    INSERT INTO user_activity (guild_id, user_id, message_count, last_message_at)
+                    SELECT * FROM unnest($1::BIGINT[], $2::BIGINT[], $3::BIGINT[], $4::TIMESTAMPTZ[])
+                    ON CONFLICT (guild_id, user_id)
+                    DO UPDATE SET
+                        message_count = user_activity.message_count + EXCLUDED.message_count,
+                        last_message_at = GREATEST(user_activity.last_message_at, EXCLUDED.last_message_at)
+                    """,
+                    [guild_id for guild_id, _user_id in keys],
+                    [user_id for _guild_id, user_id in keys],
+                    [int(activity[key][0]) for key in keys],
+                    [activity[key][1] for key in keys],
+                )
+
+            reward_ids = sorted(reward_counts)
+            if reward_ids:
+                locked = await connection.fetch(
+                    """
+                    SELECT user_id, rebirth_count
+                    FROM users
+                    WHERE user_id = ANY($1::BIGINT[])
+                    ORDER BY user_id
+                    FOR UPDATE
+                    """,
+                    reward_ids,
+                )
+                credits: list[int] = []
+                credited_ids: list[int] = []
+                for row in locked:
+                    user_id = int(row["user_id"])
+                    rebirth_count = int(row.get("rebirth_count") or 0)
+                    credits.append(
+                        sum(
+                            self._apply_rebirth_multiplier(amount, rebirth_count)[0] * count
+                            for amount, count in reward_counts[user_id]
+                        )
+                    )
+                    credited_ids.append(user_id)
+                rows = await connection.fetch(
+                    """
+                    UPDATE users AS u
+                    SET balance = u.balance + c.amount
+                    FROM unnest($1::BIGINT[], $2::BIGINT[]) AS c(user_id, amount)
+                    WHERE u.user_id = c.user_id
+                    RETURNING u.user_id, u.balance - c.amount AS balance_before, u.balance AS balance_after
+                    """,
+                    credited_ids,
+                    credits,
+                )
+                for row in rows:
+                    before = int(row["balance_before"])
+                    after = int(row["balance_after"])
+                    await self.record_transaction(
+                        connection=connection,
+                        user_id=int(row["user_id"]),
+                        transaction_type="message_reward",
+                        currency="pb",
+                        amount=after - before,
+                        balance_before=before,
+                        balance_after=after,
+                        description="Récompenses de messages groupées",
+                    )
+
+        for user_id in user_ids:
+            self._known_users.set(user_id, True)
+
+    @replica_read
     async def get_guild_activity_overview(
         self,
         guild_id: int,
@@ -2722,6 +3531,7 @@ class Database:
         streak_window_seconds = max(cooldown_seconds, float(streak_window_seconds))
 
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.DAILY, connection=connection)
             row = await connection.fetchrow(
                 """
                 SELECT balance, gems, last_daily, daily_streak, rebirth_count
@@ -3515,80 +4325,78 @@ class Database:
             when,
             user_id,
         )
+        self._publish_invalidation((user_id,), invalidation.DAILY)
 
     async def get_balance_leaderboard(self, limit: int) -> Sequence[asyncpg.Record]:
         clamped_limit = max(0, int(limit))
-        cache_key = ("leaderboard_balance", clamped_limit)
-        cached = self._leaderboard_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
         query = "SELECT user_id, balance FROM users ORDER BY balance DESC LIMIT $1"
-        rows = await self._fetch(query, clamped_limit)
-        self._leaderboard_cache.set(cache_key, rows)
-        return rows
+        return await self._cached_read(
+            self._leaderboard_cache,
+            ("leaderboard_balance", clamped_limit),
+            lambda: self._fetch(query, clamped_limit),
+        )
 
     async def get_gem_leaderboard(self, limit: int) -> Sequence[asyncpg.Record]:
         clamped_limit = max(0, int(limit))
-        cache_key = ("leaderboard_gems", clamped_limit)
-        cached = self._leaderboard_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
         query = "SELECT user_id, gems FROM users ORDER BY gems DESC LIMIT $1"
-        rows = await self._fetch(query, clamped_limit)
-        self._leaderboard_cache.set(cache_key, rows)
-        return rows
+        return await self._cached_read(
+            self._leaderboard_cache,
+            ("leaderboard_gems", clamped_limit),
+            lambda: self._fetch(query, clamped_limit),
+        )
 
+    @replica_read
     async def get_balance_leaderboard_page(
         self, limit: int, offset: int
     ) -> tuple[Sequence[asyncpg.Record], int]:
         clamped_limit = max(0, int(limit))
         clamped_offset = max(0, int(offset))
-        cache_key = ("leaderboard_balance_page", clamped_limit, clamped_offset)
-        cached = self._leaderboard_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
-        total_row = await self._fetchrow("SELECT COUNT(*) AS total FROM users")
-        total = int(total_row["total"]) if total_row else 0
-        if clamped_limit == 0 or total <= 0:
-            result = ([], total)
-            self._leaderboard_cache.set(cache_key, result)
-            return result
-        query = """
-            SELECT user_id, balance
-            FROM users
-            ORDER BY balance DESC
-            LIMIT $1 OFFSET $2
-        """
-        rows = await self._fetch(query, clamped_limit, clamped_offset)
-        result = (rows, total)
-        self._leaderboard_cache.set(cache_key, result)
-        return result
+
+        async def load() -> tuple[Sequence[asyncpg.Record], int]:
+            total_row = await self._fetchrow("SELECT COUNT(*) AS total FROM users")
+            total = int(total_row["total"]) if total_row else 0
+            if clamped_limit == 0 or total <= 0:
+                return ([], total)
+            query = """
+                SELECT user_id, balance
+                FROM users
+                ORDER BY balance DESC
+                LIMIT $1 OFFSET $2
+            """
+            rows = await self._fetch(query, clamped_limit, clamped_offset)
+            return (rows, total)
+
+        return await self._cached_read(
+            self._leaderboard_cache,
+            ("leaderboard_balance_page", clamped_limit, clamped_offset),
+            load,
+        )
 
     async def get_gem_leaderboard_page(
         self, limit: int, offset: int
     ) -> tuple[Sequence[asyncpg.Record], int]:
         clamped_limit = max(0, int(limit))
         clamped_offset = max(0, int(offset))
-        cache_key = ("leaderboard_gems_page", clamped_limit, clamped_offset)
-        cached = self._leaderboard_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
-        total_row = await self._fetchrow("SELECT COUNT(*) AS total FROM users")
-        total = int(total_row["total"]) if total_row else 0
-        if clamped_limit == 0 or total <= 0:
-            result = ([], total)
-            self._leaderboard_cache.set(cache_key, result)
-            return result
-        query = """
-            SELECT user_id, gems
-            FROM users
-            ORDER BY gems DESC
-            LIMIT $1 OFFSET $2
-        """
-        rows = await self._fetch(query, clamped_limit, clamped_offset)
-        result = (rows, total)
-        self._leaderboard_cache.set(cache_key, result)
-        return result
+
+        async def load() -> tuple[Sequence[asyncpg.Record], int]:
+            total_row = await self._fetchrow("SELECT COUNT(*) AS total FROM users")
+            total = int(total_row["total"]) if total_row else 0
+            if clamped_limit == 0 or total <= 0:
+                return ([], total)
+            query = """
+                SELECT user_id, gems
+                FROM users
+                ORDER BY gems DESC
+                LIMIT $1 OFFSET $2
+            """
+            rows = await self._fetch(query, clamped_limit, clamped_offset)
+            return (rows, total)
+
+        return await self._cached_read(
+            self._leaderboard_cache,
+            ("leaderboard_gems_page", clamped_limit, clamped_offset),
+            load,
+        )
 
     async def get_mastery_leaderboard(
         self, mastery_slug: str, limit: int
@@ -3648,6 +4456,7 @@ class Database:
 
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.GRADE, connection=connection)
             row = await connection.fetchrow(
                 """
                 SELECT grade_level, mastermind_progress, egg_progress, sale_progress, potion_progress
@@ -3717,6 +4526,7 @@ class Database:
     ) -> tuple[bool, asyncpg.Record]:
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.GRADE, connection=connection)
             row = await connection.fetchrow(
                 "SELECT * FROM user_grades WHERE user_id = $1 FOR UPDATE",
                 user_id,
@@ -3770,215 +4580,301 @@ class Database:
         """
         return await self.pool.fetch(query, limit)
 
-    @staticmethod
-    def _rap_values_cte() -> str:
-        base_code = """
-            CASE
-                WHEN up.is_galaxy THEN 'galaxy'
-                WHEN up.is_rainbow THEN 'rainbow'
-                WHEN up.is_gold THEN 'gold'
-                ELSE 'normal'
-            END
-        """
-        return f"""
-            WITH pet_values AS (
-                SELECT
-                    up.user_id,
-                    COALESCE(
-                        mv_primary.value_in_gems,
-                        mv_shiny_base.value_in_gems,
-                        mv_demote.value_in_gems,
-                        mv_normal_shiny.value_in_gems,
-                        mv_normal.value_in_gems,
-                        0
-                    ) AS market_value
-                FROM user_pets AS up
-                LEFT JOIN pet_market_values AS mv_primary
-                    ON mv_primary.pet_id = up.pet_id
-                    AND mv_primary.variant_code = (
-                        CASE
-                            WHEN up.is_shiny THEN {base_code} || '+shiny'
-                            ELSE {base_code}
-                        END
-                    )
-                LEFT JOIN pet_market_values AS mv_shiny_base
-                    ON up.is_shiny
-                    AND mv_shiny_base.pet_id = up.pet_id
-                    AND mv_shiny_base.variant_code = {base_code}
-                LEFT JOIN pet_market_values AS mv_demote
-                    ON up.is_galaxy
-                    AND mv_demote.pet_id = up.pet_id
-                    AND mv_demote.variant_code = (
-                        CASE
-                            WHEN up.is_shiny THEN 'rainbow+shiny'
-                            ELSE 'rainbow'
-                        END
-                    )
-                LEFT JOIN pet_market_values AS mv_normal_shiny
-                    ON (up.is_rainbow OR up.is_gold OR up.is_galaxy)
-                    AND up.is_shiny
-                    AND mv_normal_shiny.pet_id = up.pet_id
-                    AND mv_normal_shiny.variant_code = 'normal+shiny'
-                LEFT JOIN pet_market_values AS mv_normal
-                    ON mv_normal.pet_id = up.pet_id
-                    AND mv_normal.variant_code = 'normal'
-            ),
-            rap_values AS (
-                SELECT
-                    user_id,
-                    CASE
-                        WHEN {PET_VALUE_SCALE} <= 1 THEN market_value
-                        WHEN market_value <= 0 THEN 0
-                        ELSE GREATEST(
-                            1,
-                            CAST(FLOOR(market_value::numeric / {PET_VALUE_SCALE}) AS BIGINT)
-                        )
-                    END AS rap_value
-                FROM pet_values
-            )
-        """
+    _RAP_PET_ROWS_QUERY = """
+        SELECT
+            up.user_id,
+            up.pet_id,
+            up.is_gold,
+            up.is_huge,
+            up.is_rainbow,
+            up.is_galaxy,
+            up.is_shiny,
+            p.base_income_per_hour,
+            p.name,
+            p.rarity
+        FROM user_pets AS up
+        JOIN pets AS p ON p.pet_id = up.pet_id
+    """
+
+    async def _rebuild_user_rap_totals(
+        self,
+        connection: asyncpg.Connection,
+        market_values: Mapping[Tuple[int, str], int] | None = None,
+    ) -> None:
+        """Recalcule la table ``user_rap_totals`` pour tous les joueurs.
 
-    async def _compute_pet_rap_totals_map(self) -> defaultdict[int, int]:
-        market_values = await self.get_pet_market_values()
-        query = """
-            SELECT
-                up.user_id,
-                up.pet_id,
-                up.is_gold,
-                up.is_huge,
-                up.is_rainbow,
-                up.is_galaxy,
-                up.is_shiny,
-                up.huge_level,
-                p.base_income_per_hour,
-                p.name,
-                p.rarity
-            FROM user_pets AS up
-            JOIN pets AS p ON p.pet_id = up.pet_id
+        Les valeurs passent par la même matrice de prix que
+        :meth:`get_user_pet_rap`. ``market_values`` permet de valoriser avec des
+        prix écrits dans la transaction courante mais pas encore publiés.
         """
 
-        rap_totals: defaultdict[int, int] = defaultdict(int)
-        async with self.pool.acquire() as connection:
-            async with connection.transaction():
-                async for row in connection.cursor(query):
-                    user_id = int(row["user_id"])
-                    pet_id = int(row["pet_id"])
-                    base_income = int(row["base_income_per_hour"])
-                    name = str(row.get("name", ""))
-                    rarity = str(row.get("rarity", ""))
-                    value = self._resolve_market_price(
-                        pet_id,
-                        is_gold=bool(row.get("is_gold")),
-                        is_rainbow=bool(row.get("is_rainbow")),
-                        is_galaxy=bool(row.get("is_galaxy")),
-                        is_shiny=bool(row.get("is_shiny")),
-                        market_values=market_values,
-                    )
-                    if value <= 0:
-                        zone_slug = _PET_ZONE_BY_NAME.get(name.lower(), "exclusif")
-                        value = self._fallback_market_value(
-                            name=name,
-                            rarity=rarity,
-                            base_income_per_hour=base_income,
-                            is_huge=bool(row.get("is_huge")),
-                            zone_slug=zone_slug,
-                            is_gold=bool(row.get("is_gold")),
-                            is_rainbow=bool(row.get("is_rainbow")),
-                            is_galaxy=bool(row.get("is_galaxy")),
-                            is_shiny=bool(row.get("is_shiny")),
-                        )
-                    rap_totals[user_id] += max(0, scale_pet_value(value))
+        if market_values is None:
+            market_values = await self.get_pet_market_values()
+        # Catalogue relu dans la transaction : un ``sync_pets`` en cours y a
+        # déjà écrit ses modifications.
+        matrix = await self._compile_price_matrix(market_values, connection=connection)
+        # Bloque les mises à jour ciblées jusqu'au COMMIT sans gêner les lectures.
+        await connection.execute("LOCK TABLE user_rap_totals IN EXCLUSIVE MODE")
+        totals: defaultdict[int, int] = defaultdict(int)
+        async for row in connection.cursor(self._RAP_PET_ROWS_QUERY):
+            totals[int(row["user_id"])] += self._price_pet_row(row, matrix)
+        await connection.execute(
+            """
+            INSERT INTO user_rap_totals (user_id, rap_total, updated_at)
+            SELECT u.user_id, COALESCE(t.rap_total, 0), NOW()
+            FROM users AS u
+            LEFT JOIN unnest($1::BIGINT[], $2::BIGINT[]) AS t(user_id, rap_total)
+                ON t.user_id = u.user_id
+            ON CONFLICT (user_id)
+            DO UPDATE SET rap_total = EXCLUDED.rap_total, updated_at = NOW()
+            """,
+            list(totals.keys()),
+            list(totals.values()),
+        )
+
+    async def refresh_user_rap_totals(
+        self,
+        user_ids: Iterable[int],
+        *,
+        connection: asyncpg.Connection | None = None,
+    ) -> None:
+        """Met à jour le RAP stocké des joueurs dont l'inventaire vient de changer.
+
+        Doit être appelé dans la même transaction que la mutation des pets afin
+        que ``user_rap_totals`` reste cohérent avec ``user_pets``. Les lignes de
+        RAP sont verrouillées avant la relecture des pets : deux mutations
+        concurrentes d'un même joueur se sérialisent au lieu d'écrire un total
+        calculé sur un état déjà dépassé.
+        """
 
-        return rap_totals
+        unique_ids = sorted({int(user_id) for user_id in user_ids if int(user_id) > 0})
+        if not unique_ids:
+            return
+        if connection is None:
+            async with self.transaction() as txn_connection:
+                await self.refresh_user_rap_totals(unique_ids, connection=txn_connection)
+            return
 
-    async def _compute_pet_rap_totals(self) -> list[tuple[int, int]]:
-        rap_totals = await self._compute_pet_rap_totals_map()
-        return sorted(rap_totals.items(), key=lambda item: item[1], reverse=True)
+        # ON CONFLICT DO UPDATE verrouille les lignes existantes (ordre croissant
+        # des identifiants pour éviter les interblocages) ; la requête suivante
+        # prend un nouvel instantané et voit donc les mutations déjà validées.
+        await connection.execute(
+            """
+            INSERT INTO user_rap_totals (user_id)
+            SELECT user_id FROM unnest($1::BIGINT[]) AS ids(user_id) ORDER BY user_id
+            ON CONFLICT (user_id) DO UPDATE SET updated_at = NOW()
+            """,
+            unique_ids,
+        )
+        matrix = await self._get_price_matrix()
+        rows = await connection.fetch(
+            f"{self._RAP_PET_ROWS_QUERY} WHERE up.user_id = ANY($1::BIGINT[])",
+            unique_ids,
+        )
+        totals = dict.fromkeys(unique_ids, 0)
+        for row in rows:
+            totals[int(row["user_id"])] += self._price_pet_row(row, matrix)
+        await connection.execute(
+            """
+            UPDATE user_rap_totals AS r
+            SET rap_total = t.rap_total, updated_at = NOW()
+            FROM unnest($1::BIGINT[], $2::BIGINT[]) AS t(user_id, rap_total)
+            WHERE r.user_id = t.user_id
+            """,
+            unique_ids,
+            [totals[user_id] for user_id in unique_ids],
+        )
+        self._publish_invalidation(unique_ids, invalidation.PETS, connection=connection)
 
     async def get_pet_rap_leaderboard(self, limit: int) -> list[tuple[int, int]]:
         clamped_limit = max(0, int(limit))
         if clamped_limit == 0:
             return []
 
-        cache_key = ("leaderboard_rap", clamped_limit)
-        cached = self._leaderboard_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
+        async def load() -> list[tuple[int, int]]:
+            await self._ensure_market_values_ready()
+            query = """
+                SELECT user_id, rap_total
+                FROM user_rap_totals
+                WHERE rap_total > 0
+                ORDER BY rap_total DESC, user_id
+                LIMIT $1
+            """
+            rows = await self._fetch(query, clamped_limit)
+            return [(int(row["user_id"]), int(row["rap_total"])) for row in rows]
+
+        return await self._cached_read(
+            self._leaderboard_cache, ("leaderboard_rap", clamped_limit), load
+        )
+
+    async def get_pet_rap_leaderboard_page(
+        self, limit: int, offset: int
+    ) -> tuple[list[tuple[int, int]], int]:
+        clamped_limit = max(0, int(limit))
+        clamped_offset = max(0, int(offset))
+
+        async def load() -> tuple[list[tuple[int, int]], int]:
+            await self._ensure_market_values_ready()
+            total_row = await self._fetchrow(
+                "SELECT COUNT(*) AS total FROM user_rap_totals WHERE rap_total > 0"
+            )
+            total = int(total_row["total"]) if total_row else 0
+            if clamped_limit == 0 or total == 0:
+                return ([], total)
+
+            page_query = """
+                SELECT user_id, rap_total
+                FROM user_rap_totals
+                WHERE rap_total > 0
+                ORDER BY rap_total DESC, user_id
+                LIMIT $1 OFFSET $2
+            """
+            rows = await self._fetch(page_query, clamped_limit, clamped_offset)
+            return ([(int(row["user_id"]), int(row["rap_total"])) for row in rows], total)
+
+        return await self._cached_read(
+            self._leaderboard_cache,
+            ("leaderboard_rap_page", clamped_limit, clamped_offset),
+            load,
+        )
+
+    async def get_user_pet_rap_rank(self, user_id: int) -> Mapping[str, int]:
+        """Retourne le RAP, le rang et le nombre de joueurs classés.
+
+        Le rang se déduit de ``user_rap_totals`` : on compte les joueurs dont le
+        RAP est strictement supérieur, ce qui reste un parcours d'index borné
+        quelle que soit la taille des inventaires.
+        """
+
+        await self.ensure_user(user_id)
+        row = await self._fetchrow(
+            """
+            WITH me AS (
+                SELECT COALESCE(
+                    (SELECT rap_total FROM user_rap_totals WHERE user_id = $1),
+                    0
+                ) AS rap_total
+            )
+            SELECT
+                me.rap_total,
+                1 + (
+                    SELECT COUNT(*)
+                    FROM user_rap_totals AS r
+                    WHERE r.rap_total > 0 AND r.rap_total > me.rap_total
+                ) AS rank,
+                (SELECT COUNT(*) FROM users) AS total
+            FROM me
+            """,
+            user_id,
+        )
+        if row is None:
+            return {"rap_total": 0, "rank": 0, "total": 0}
+        return {
+            "rap_total": int(row["rap_total"] or 0),
+            "rank": int(row["rank"] or 0),
+            "total": int(row["total"] or 0),
+        }
+
+    @classmethod
+    def _compute_pet_row_value(
+        cls,
+        *,
+        pet_id: int,
+        name: str,
+        rarity: str,
+        base_income_per_hour: int,
+        flags: int,
+        market_values: Mapping[tuple[int, str], int],
+    ) -> int:
+        is_gold = bool(flags & _VARIANT_FLAG_GOLD)
+        is_rainbow = bool(flags & _VARIANT_FLAG_RAINBOW)
+        is_galaxy = bool(flags & _VARIANT_FLAG_GALAXY)
+        is_shiny = bool(flags & _VARIANT_FLAG_SHINY)
+        value = cls._resolve_market_price(
+            pet_id,
+            is_gold=is_gold,
+            is_rainbow=is_rainbow,
+            is_galaxy=is_galaxy,
+            is_shiny=is_shiny,
+            market_values=market_values,
+        )
+        if value <= 0:
+            zone_slug = _PET_ZONE_BY_NAME.get(name.lower(), "exclusif")
+            value = cls._fallback_market_value(
+                name=name,
+                rarity=rarity,
+                base_income_per_hour=base_income_per_hour,
+                is_huge=bool(flags & _VARIANT_FLAG_HUGE),
+                zone_slug=zone_slug,
+                is_gold=is_gold,
+                is_rainbow=is_rainbow,
+                is_galaxy=is_galaxy,
+                is_shiny=is_shiny,
+            )
+        return max(0, scale_pet_value(value))
+
+    async def _get_price_matrix(self) -> _PriceMatrix:
+        """Compile la matrice de prix pour l'instantané marché courant."""
 
-        await self._ensure_market_values_ready()
-        query = f"""
-            {self._rap_values_cte()}
-            SELECT user_id, SUM(rap_value) AS rap_total
-            FROM rap_values
-            GROUP BY user_id
-            HAVING SUM(rap_value) > 0
-            ORDER BY rap_total DESC
-            LIMIT $1
-        """
-        rows = await self._fetch(query, clamped_limit)
-        result = [(int(row["user_id"]), int(row["rap_total"])) for row in rows]
-        self._leaderboard_cache.set(cache_key, result)
-        return result
+        market_values = await self.get_pet_market_values()
+        matrix = self._price_matrix
+        if matrix is not None and matrix.source is market_values:
+            return matrix
 
-    async def get_pet_rap_leaderboard_page(
-        self, limit: int, offset: int
-    ) -> tuple[list[tuple[int, int]], int]:
-        clamped_limit = max(0, int(limit))
-        clamped_offset = max(0, int(offset))
-        cache_key = ("leaderboard_rap_page", clamped_limit, clamped_offset)
-        cached = self._leaderboard_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
+        matrix = await self._compile_price_matrix(market_values)
+        snapshot = self._market_snapshot
+        if snapshot is not None and snapshot.values is market_values:
+            self._price_matrix = matrix
+        return matrix
 
-        await self._ensure_market_values_ready()
-        total_query = f"""
-            {self._rap_values_cte()}
-            SELECT COUNT(*) AS total
-            FROM (
-                SELECT user_id
-                FROM rap_values
-                GROUP BY user_id
-                HAVING SUM(rap_value) > 0
-            ) AS totals
-        """
-        total_row = await self._fetchrow(total_query)
-        total = int(total_row["total"]) if total_row else 0
-        if clamped_limit == 0 or total == 0:
-            result = ([], total)
-            self._leaderboard_cache.set(cache_key, result)
-            return result
-
-        page_query = f"""
-            {self._rap_values_cte()}
-            SELECT user_id, SUM(rap_value) AS rap_total
-            FROM rap_values
-            GROUP BY user_id
-            HAVING SUM(rap_value) > 0
-            ORDER BY rap_total DESC
-            LIMIT $1 OFFSET $2
-        """
-        rows = await self._fetch(page_query, clamped_limit, clamped_offset)
-        result = ([(int(row["user_id"]), int(row["rap_total"])) for row in rows], total)
-        self._leaderboard_cache.set(cache_key, result)
-        return result
+    async def _compile_price_matrix(
+        self,
+        market_values: Mapping[Tuple[int, str], int],
+        *,
+        connection: asyncpg.Connection | None = None,
+    ) -> _PriceMatrix:
+        executor = connection or self.pool
+        pets = await executor.fetch(
+            "SELECT pet_id, name, rarity, base_income_per_hour FROM pets"
+        )
+        max_pet_id = max((int(row["pet_id"]) for row in pets), default=-1)
+        values = array("q", [-1]) * ((max_pet_id + 1) * _VARIANT_FLAG_SLOTS)
+        for row in pets:
+            pet_id = int(row["pet_id"])
+            name = str(row["name"])
+            rarity = str(row["rarity"])
+            base_income = int(row["base_income_per_hour"] or 0)
+            offset = pet_id * _VARIANT_FLAG_SLOTS
+            for flags in range(_VARIANT_FLAG_SLOTS):
+                values[offset + flags] = self._compute_pet_row_value(
+                    pet_id=pet_id,
+                    name=name,
+                    rarity=rarity,
+                    base_income_per_hour=base_income,
+                    flags=flags,
+                    market_values=market_values,
+                )
 
-    async def get_user_pet_rap_rank(self, user_id: int) -> Mapping[str, int]:
-        await self.ensure_user(user_id)
-        sorted_totals = await self._compute_pet_rap_totals()
-        rap_total = 0
-        rank = 0
-        for idx, (entry_user_id, value) in enumerate(sorted_totals, start=1):
-            if int(entry_user_id) == user_id:
-                rap_total = int(value)
-                rank = idx
-                break
-        if rank == 0:
-            rap_total = await self.get_user_pet_rap(user_id)
-            rank = 1 + sum(1 for _user_id, value in sorted_totals if value > rap_total)
+        return _PriceMatrix(market_values, values)
 
-        total_row = await self.pool.fetchrow("SELECT COUNT(*) AS total FROM users")
-        total = int(total_row["total"]) if total_row else 0
-        return {"rap_total": int(rap_total), "rank": int(rank), "total": int(total)}
+    def _price_pet_row(
+        self,
+        row: Mapping[str, Any],
+        matrix: _PriceMatrix,
+    ) -> int:
+        pet_id = int(row["pet_id"])
+        flags = _variant_flags(row)
+        value = matrix.lookup(pet_id, flags)
+        if value is not None:
+            return value
+        return self._compute_pet_row_value(
+            pet_id=pet_id,
+            name=str(row.get("name", "")),
+            rarity=str(row.get("rarity", "")),
+            base_income_per_hour=int(row["base_income_per_hour"]),
+            flags=flags,
+            market_values=matrix.source,
+        )
 
     async def get_user_pet_rap(
         self,
@@ -3986,7 +4882,7 @@ class Database:
         *,
         connection: asyncpg.Connection | None = None,
     ) -> int:
-        market_values = await self.get_pet_market_values()
+        matrix = await self._get_price_matrix()
         query = """
             SELECT
                 up.pet_id,
@@ -3995,7 +4891,6 @@ class Database:
                 up.is_rainbow,
                 up.is_galaxy,
                 up.is_shiny,
-                up.huge_level,
                 p.base_income_per_hour,
                 p.name,
                 p.rarity
@@ -4005,36 +4900,7 @@ class Database:
         """
         fetcher = connection.fetch if connection is not None else self.pool.fetch
         rows = await fetcher(query, user_id)
-
-        rap_total = 0
-        for row in rows:
-            pet_id = int(row["pet_id"])
-            base_income = int(row["base_income_per_hour"])
-            name = str(row.get("name", ""))
-            rarity = str(row.get("rarity", ""))
-            value = self._resolve_market_price(
-                pet_id,
-                is_gold=bool(row.get("is_gold")),
-                is_rainbow=bool(row.get("is_rainbow")),
-                is_galaxy=bool(row.get("is_galaxy")),
-                is_shiny=bool(row.get("is_shiny")),
-                market_values=market_values,
-            )
-            if value <= 0:
-                zone_slug = _PET_ZONE_BY_NAME.get(name.lower(), "exclusif")
-                value = self._fallback_market_value(
-                    name=name,
-                    rarity=rarity,
-                    base_income_per_hour=base_income,
-                    is_huge=bool(row.get("is_huge")),
-                    zone_slug=zone_slug,
-                    is_gold=bool(row.get("is_gold")),
-                    is_rainbow=bool(row.get("is_rainbow")),
-                    is_galaxy=bool(row.get("is_galaxy")),
-                    is_shiny=bool(row.get("is_shiny")),
-                )
-            rap_total += max(0, scale_pet_value(value))
-        return rap_total
+        return sum(self._price_pet_row(row, matrix) for row in rows)
 
     async def get_user_best_pet_value(
         self,
@@ -4042,7 +4908,7 @@ class Database:
         *,
         connection: asyncpg.Connection | None = None,
     ) -> tuple[str | None, int]:
-        market_values = await self.get_pet_market_values()
+        matrix = await self._get_price_matrix()
         query = """
             SELECT
                 up.pet_id,
@@ -4051,7 +4917,6 @@ class Database:
                 up.is_rainbow,
                 up.is_galaxy,
                 up.is_shiny,
-                up.huge_level,
                 p.base_income_per_hour,
                 p.name,
                 p.rarity
@@ -4065,38 +4930,14 @@ class Database:
         best_value = 0
         best_name: str | None = None
         for row in rows:
-            pet_id = int(row["pet_id"])
-            base_income = int(row["base_income_per_hour"])
-            name = str(row.get("name", ""))
-            rarity = str(row.get("rarity", ""))
-            value = self._resolve_market_price(
-                pet_id,
-                is_gold=bool(row.get("is_gold")),
-                is_rainbow=bool(row.get("is_rainbow")),
-                is_galaxy=bool(row.get("is_galaxy")),
-                is_shiny=bool(row.get("is_shiny")),
-                market_values=market_values,
-            )
-            if value <= 0:
-                zone_slug = _PET_ZONE_BY_NAME.get(name.lower(), "exclusif")
-                value = self._fallback_market_value(
-                    name=name,
-                    rarity=rarity,
-                    base_income_per_hour=base_income,
-                    is_huge=bool(row.get("is_huge")),
-                    zone_slug=zone_slug,
-                    is_gold=bool(row.get("is_gold")),
-                    is_rainbow=bool(row.get("is_rainbow")),
-                    is_galaxy=bool(row.get("is_galaxy")),
-                    is_shiny=bool(row.get("is_shiny")),
-                )
-            value = max(0, scale_pet_value(value))
+            value = self._price_pet_row(row, matrix)
             if value > best_value:
                 best_value = value
-                best_name = name
+                best_name = str(row.get("name", ""))
 
         return best_name, best_value
 
+    @replica_read
     async def get_hourly_income_leaderboard(self, limit: int) -> list[tuple[int, int]]:
         clamped_limit = max(0, int(limit))
         if clamped_limit == 0:
@@ -4173,6 +5014,7 @@ class Database:
         return sorted_totals[:clamped_limit]
 
     async def reset_user_grade(self, user_id: int) -> None:
+        self.forget_user(user_id)
         await self.ensure_user(user_id)
         await self.pool.execute(
             """
@@ -4187,6 +5029,7 @@ class Database:
             """,
             user_id,
         )
+        self._publish_invalidation((user_id,), invalidation.GRADE)
 
     async def get_grade_level(self, user_id: int) -> int:
         await self.ensure_user(user_id)
@@ -4207,6 +5050,7 @@ class Database:
     async def perform_rebirth(self, user_id: int) -> int:
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.GRADE, *invalidation.INVENTORY, connection=connection)
             user_row = await connection.fetchrow(
                 "SELECT balance, rebirth_count FROM users WHERE user_id = $1 FOR UPDATE",
                 user_id,
@@ -4249,6 +5093,8 @@ class Database:
                 "DELETE FROM user_pets WHERE user_id = $1 AND NOT is_huge",
                 user_id,
             )
+            await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._sync_pet_index(connection, [user_id], replace=True)
             await connection.execute(
                 """
                 UPDATE user_grades
@@ -4306,47 +5152,111 @@ class Database:
     # ------------------------------------------------------------------
     # Gestion des pets
     # ------------------------------------------------------------------
-    async def sync_pets(self, pets: Iterable[Any]) -> dict[str, int]:
+    @staticmethod
+    def _pet_catalog_rows(pets: Iterable[Any]) -> list[tuple[str, str, str, int, float]]:
+        rows: dict[str, tuple[str, str, str, int, float]] = {}
+        for pet in pets:
+            if hasattr(pet, "name"):
+                name = getattr(pet, "name")  # type: ignore[attr-defined]
+                rarity = getattr(pet, "rarity")  # type: ignore[attr-defined]
+                image_url = getattr(pet, "image_url")  # type: ignore[attr-defined]
+                base_income = getattr(pet, "base_income_per_hour")  # type: ignore[attr-defined]
+                drop_rate = getattr(pet, "drop_rate")  # type: ignore[attr-defined]
+            else:
+                name = pet["name"]  # type: ignore[index]
+                rarity = pet["rarity"]  # type: ignore[index]
+                image_url = pet["image_url"]  # type: ignore[index]
+                base_income = pet["base_income_per_hour"]  # type: ignore[index]
+                drop_rate = pet["drop_rate"]  # type: ignore[index]
+            # Une définition répétée écrase la précédente, comme l'upsert ligne à ligne.
+            rows[str(name)] = (str(name), str(rarity), image_url, int(base_income), float(drop_rate))
+        return list(rows.values())
+
+    @staticmethod
+    def _pet_catalog_digest(rows: Sequence[tuple[str, str, str, int, float]]) -> str:
+        """Empreinte stable du catalogue, indépendante de l'ordre des définitions."""
+
+        payload = json.dumps(sorted(rows), separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def sync_pets(
+        self, pets: Iterable[Any], *, full_catalog: bool = True
+    ) -> dict[str, int]:
         """Synchronise les définitions de pets dans la base.
 
         Retourne un mapping {nom: pet_id} afin de faciliter les références.
+        Si l'empreinte du catalogue n'a pas changé depuis la dernière
+        synchronisation, seule la table des identifiants est relue.
+        L'empreinte ne concerne que le catalogue complet : avec
+        ``full_catalog=False`` (enregistrement de quelques pets), elle n'est
+        ni consultée ni réécrite.
         """
 
-        pet_ids: dict[str, int] = {}
+        rows = self._pet_catalog_rows(pets)
+        if not rows:
+            return {}
+        digest = self._pet_catalog_digest(rows)
+        names = [row[0] for row in rows]
+
+        stored_digest = None
+        if full_catalog:
+            stored_digest = await self.pool.fetchval(
+                "SELECT digest FROM catalog_fingerprints WHERE catalog = 'pets'"
+            )
+        if stored_digest == digest:
+            records = await self.pool.fetch(
+                "SELECT name, pet_id FROM pets WHERE name = ANY($1::TEXT[])",
+                names,
+            )
+            pet_ids = {str(record["name"]): int(record["pet_id"]) for record in records}
+            if len(pet_ids) == len(names):
+                return pet_ids
+
         async with self.transaction() as connection:
-            for pet in pets:
-                if hasattr(pet, "name"):
-                    name = getattr(pet, "name")  # type: ignore[attr-defined]
-                    rarity = getattr(pet, "rarity")  # type: ignore[attr-defined]
-                    image_url = getattr(pet, "image_url")  # type: ignore[attr-defined]
-                    base_income = getattr(pet, "base_income_per_hour")  # type: ignore[attr-defined]
-                    drop_rate = getattr(pet, "drop_rate")  # type: ignore[attr-defined]
-                else:
-                    name = pet["name"]  # type: ignore[index]
-                    rarity = pet["rarity"]  # type: ignore[index]
-                    image_url = pet["image_url"]  # type: ignore[index]
-                    base_income = pet["base_income_per_hour"]  # type: ignore[index]
-                    drop_rate = pet["drop_rate"]  # type: ignore[index]
-                row = await connection.fetchrow(
+            # Seules les lignes réellement insérées ou modifiées reviennent :
+            # elles décident du recalcul des RAP stockés.
+            changed = await connection.fetch(
+                """
+                INSERT INTO pets (name, rarity, image_url, base_income_per_hour, drop_rate)
+                SELECT * FROM unnest($1::TEXT[], $2::TEXT[], $3::TEXT[], $4::BIGINT[], $5::DOUBLE PRECISION[])
+                ON CONFLICT (name) DO UPDATE
+                SET rarity = EXCLUDED.rarity,
+                    image_url = EXCLUDED.image_url,
+                    base_income_per_hour = EXCLUDED.base_income_per_hour,
+                    drop_rate = EXCLUDED.drop_rate
+                WHERE (pets.rarity, pets.image_url, pets.base_income_per_hour, pets.drop_rate)
+                    IS DISTINCT FROM
+                    (EXCLUDED.rarity, EXCLUDED.image_url, EXCLUDED.base_income_per_hour, EXCLUDED.drop_rate)
+                RETURNING pet_id
+                """,
+                names,
+                [row[1] for row in rows],
+                [row[2] for row in rows],
+                [row[3] for row in rows],
+                [row[4] for row in rows],
+            )
+            records = await connection.fetch(
+                "SELECT name, pet_id FROM pets WHERE name = ANY($1::TEXT[])",
+                names,
+            )
+            if changed:
+                # Les valeurs de repli dépendent du revenu et de la rareté.
+                await self._rebuild_user_rap_totals(connection)
+            if full_catalog:
+                await connection.execute(
                     """
-                    INSERT INTO pets (name, rarity, image_url, base_income_per_hour, drop_rate)
-                    VALUES ($1, $2, $3, $4, $5)
-                    ON CONFLICT (name) DO UPDATE
-                    SET rarity = EXCLUDED.rarity,
-                        image_url = EXCLUDED.image_url,
-                        base_income_per_hour = EXCLUDED.base_income_per_hour,
-                        drop_rate = EXCLUDED.drop_rate
-                    RETURNING pet_id
+                    INSERT INTO catalog_fingerprints (catalog, digest, updated_at)
+                    VALUES ('pets', $1, NOW())
+                    ON CONFLICT (catalog)
+                    DO UPDATE SET digest = EXCLUDED.digest, updated_at = EXCLUDED.updated_at
                     """,
-                    name,
-                    rarity,
-                    image_url,
-                    base_income,
-                    drop_rate,
+                    digest,
                 )
-                if row is None:
-                    raise DatabaseError(f"Échec de l'insertion du pet {name}")
-                pet_ids[str(name)] = int(row["pet_id"])
+        pet_ids = {str(record["name"]): int(record["pet_id"]) for record in records}
+        missing = set(names) - set(pet_ids)
+        if missing:
+            raise DatabaseError(f"Échec de l'insertion du pet {sorted(missing)[0]}")
+        self._invalidate_market_snapshot()
         return pet_ids
 
     async def get_pet_auto_settings(self, user_id: int) -> Dict[str, bool]:
@@ -4440,22 +5350,25 @@ class Database:
             is_rainbow = False
         elif is_rainbow:
             is_gold = False
-        row = await self.pool.fetchrow(
-            """
-            INSERT INTO user_pets (user_id, pet_id, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-            RETURNING id, user_id, pet_id, is_active, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny, acquired_at
-            """,
-            user_id,
-            pet_id,
-            is_huge,
-            is_gold,
-            is_rainbow,
-            is_galaxy,
-            is_shiny,
-        )
-        if row is None:
-            raise DatabaseError("Impossible de créer l'entrée user_pet")
+        async with self.transaction() as connection:
+            row = await connection.fetchrow(
+                """
+                INSERT INTO user_pets (user_id, pet_id, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                RETURNING id, user_id, pet_id, is_active, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny, acquired_at
+                """,
+                user_id,
+                pet_id,
+                is_huge,
+                is_gold,
+                is_rainbow,
+                is_galaxy,
+                is_shiny,
+            )
+            if row is None:
+                raise DatabaseError("Impossible de créer l'entrée user_pet")
+            await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._record_pet_index(connection, user_id, (row,))
         return row
 
     async def upgrade_pet_to_gold(
@@ -4550,7 +5463,7 @@ class Database:
                 INSERT INTO user_pets (user_id, pet_id, is_huge, is_gold, is_shiny)
                 SELECT $1, $2, $3, TRUE, shiny_flag
                 FROM unnest($4::bool[]) AS shiny_flag
-                RETURNING id
+                RETURNING id, pet_id, is_gold, is_rainbow, is_galaxy, is_shiny
                 """,
                 user_id,
                 pet_id,
@@ -4561,6 +5474,8 @@ class Database:
                 raise DatabaseError("Impossible de créer le pet doré")
 
             inserted_ids = [int(row["id"]) for row in inserted_rows]
+            await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._record_pet_index(connection, user_id, inserted_rows)
             new_records = await connection.fetch(
                 """
                 SELECT
@@ -4681,7 +5596,7 @@ class Database:
                 INSERT INTO user_pets (user_id, pet_id, is_huge, is_rainbow, is_shiny)
                 SELECT $1, $2, $3, TRUE, shiny_flag
                 FROM unnest($4::bool[]) AS shiny_flag
-                RETURNING id
+                RETURNING id, pet_id, is_gold, is_rainbow, is_galaxy, is_shiny
                 """,
                 user_id,
                 pet_id,
@@ -4693,6 +5608,8 @@ class Database:
                 raise DatabaseError("Impossible de créer le pet rainbow")
 
             inserted_ids = [int(row["id"]) for row in inserted_rows]
+            await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._record_pet_index(connection, user_id, inserted_rows)
             new_records = await connection.fetch(
                 """
                 SELECT
@@ -4812,7 +5729,7 @@ class Database:
                 INSERT INTO user_pets (user_id, pet_id, is_huge, is_galaxy, is_shiny)
                 SELECT $1, $2, $3, TRUE, shiny_flag
                 FROM unnest($4::bool[]) AS shiny_flag
-                RETURNING id
+                RETURNING id, pet_id, is_gold, is_rainbow, is_galaxy, is_shiny
                 """,
                 user_id,
                 pet_id,
@@ -4824,6 +5741,8 @@ class Database:
                 raise DatabaseError("Impossible de créer le pet galaxy")
 
             inserted_ids = [int(row["id"]) for row in inserted_rows]
+            await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._record_pet_index(connection, user_id, inserted_rows)
             new_records = await connection.fetch(
                 """
                 SELECT
@@ -4945,7 +5864,7 @@ class Database:
                 """
                 INSERT INTO user_pets (user_id, pet_id, is_huge, is_shiny)
                 VALUES ($1, $2, $3, $4)
-                RETURNING id
+                RETURNING id, pet_id, is_gold, is_rainbow, is_galaxy, is_shiny
                 """,
                 user_id,
                 result_pet_id,
@@ -4954,6 +5873,8 @@ class Database:
             )
             if inserted is None:
                 raise DatabaseError("Impossible de créer le pet fusionné.")
+            await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._record_pet_index(connection, user_id, (inserted,))
 
             new_record = await connection.fetchrow(
                 """
@@ -5119,6 +6040,7 @@ class Database:
             raise DatabaseError("Aucun pet valide à déposer.")
 
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.PETS, connection=connection)
             existing_count = await self.get_daycare_pet_count(user_id, connection=connection)
             if existing_count >= DAYCARE_MAX_PETS:
                 raise DatabaseError("Ta garderie est déjà pleine.")
@@ -5185,6 +6107,7 @@ class Database:
         await self.ensure_user(user_id)
         ids = [int(pet_id) for pet_id in (user_pet_ids or []) if pet_id]
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.PETS, connection=connection)
             if not ids:
                 deleted = await connection.execute(
                     "DELETE FROM user_daycare WHERE user_id = $1",
@@ -5308,6 +6231,7 @@ class Database:
                 user_id,
                 after_balance,
             )
+            await self.refresh_user_rap_totals([user_id], connection=connection)
             await self.record_transaction(
                 user_id=user_id,
                 transaction_type="pet_sell",
@@ -5394,6 +6318,10 @@ class Database:
                 int(target_user_id),
                 user_pet_id,
             )
+            await self.refresh_user_rap_totals(
+                [source_user_id, target_user_id], connection=connection
+            )
+            await self._record_pet_index(connection, target_user_id, (pet_row,))
 
             updated = await connection.fetchrow(
                 """
@@ -5584,6 +6512,7 @@ class Database:
     ) -> tuple[Optional[asyncpg.Record], int, int]:
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.PETS, connection=connection)
             pet_row = await connection.fetchrow(
                 "SELECT id, is_active, on_market FROM user_pets WHERE user_id = $1 AND id = $2 FOR UPDATE",
                 user_id,
@@ -5661,6 +6590,7 @@ class Database:
     ) -> tuple[Optional[asyncpg.Record], int, int]:
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.PETS, connection=connection)
             pet_row = await connection.fetchrow(
                 "SELECT id, is_active FROM user_pets WHERE user_id = $1 AND id = $2 FOR UPDATE",
                 user_id,
@@ -5724,6 +6654,7 @@ class Database:
 
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.PETS, connection=connection)
             out_row = await connection.fetchrow(
                 "SELECT id, is_active, on_market FROM user_pets WHERE user_id = $1 AND id = $2 FOR UPDATE",
                 user_id,
@@ -5809,6 +6740,7 @@ class Database:
 
         await self.ensure_user(user_id)
         async with self.transaction() as connection:
+            self._publish_invalidation((user_id,), invalidation.PETS, connection=connection)
             pet_row = await connection.fetchrow(
                 "SELECT id, is_active, on_market FROM user_pets WHERE user_id = $1 AND id = $2 FOR UPDATE",
                 user_id,
@@ -5889,10 +6821,9 @@ class Database:
         dict[str, object],
         dict[str, float | int],
     ]:
-        await self.ensure_user(user_id)
-        enchantments = await self.get_enchantment_powers(user_id)
-        # FIX: Fetch best non-huge income outside of the critical transaction to limit lock duration.
-        best_non_huge_income = await self.get_best_non_huge_income(user_id)
+        # Une seule lecture (pets actifs, joueur, clan, meilleur revenu non Huge et
+        # enchantement prissbucks) puis une seule écriture groupée : le coût d'un
+        # claim ne dépend plus du nombre de pets.
         async with self.transaction() as connection:
             rows = await connection.fetch(
                 """
@@ -5928,7 +6859,35 @@ class Database:
                     c.pb_boost_multiplier,
                     c.boost_level AS clan_boost_level,
                     c.banner_emoji AS clan_banner,
-                    c.shiny_luck_multiplier
+                    c.shiny_luck_multiplier,
+                    (
+                        SELECT MAX(
+                            LEAST(
+                                CAST(bp.base_income_per_hour AS NUMERIC)
+                                * CASE
+                                    WHEN bup.is_rainbow THEN $3::NUMERIC
+                                    WHEN bup.is_gold THEN $2::NUMERIC
+                                    ELSE 1
+                                END
+                                * CASE WHEN bup.is_galaxy THEN $4::NUMERIC ELSE 1 END
+                                * CASE WHEN bup.is_shiny THEN $5::NUMERIC ELSE 1 END,
+                                9223372036854775807
+                            )
+                        )
+                        FROM user_pets AS bup
+                        JOIN pets AS bp ON bp.pet_id = bup.pet_id
+                        WHERE bup.user_id = $1 AND NOT bup.is_huge
+                    ) AS best_non_huge_income,
+                    (
+                        SELECT MAX(equipped.power)
+                        FROM user_equipped_enchantments AS equipped
+                        JOIN user_enchantments AS inventory
+                            ON inventory.user_id = equipped.user_id
+                            AND inventory.slug = equipped.slug
+                            AND inventory.power = equipped.power
+                            AND inventory.quantity > 0
+                        WHERE equipped.user_id = $1 AND equipped.slug = 'prissbucks'
+                    ) AS prissbucks_power
                 FROM user_pets AS up
                 JOIN pets AS p ON p.pet_id = up.pet_id
                 JOIN users AS u ON u.user_id = up.user_id
@@ -5939,6 +6898,10 @@ class Database:
                 FOR UPDATE OF up, u
                 """,
                 user_id,
+                GOLD_PET_MULTIPLIER,
+                RAINBOW_PET_MULTIPLIER,
+                GALAXY_PET_MULTIPLIER,
+                SHINY_PET_MULTIPLIER,
             )
 
             if not rows:
@@ -5971,6 +6934,7 @@ class Database:
                 )
             )
 
+            best_non_huge_income = int(first_row.get("best_non_huge_income") or 0)
             effective_incomes = [
                 self._compute_pet_income(row, best_non_huge_income) for row in rows
             ]
@@ -5993,7 +6957,7 @@ class Database:
             if raw_income <= 0:
                 return self._build_empty_claim_result(rows, elapsed_seconds)
 
-            priss_power = int(enchantments.get("prissbucks", 0))
+            priss_power = int(first_row.get("prissbucks_power") or 0)
             priss_multiplier = compute_prissbucks_multiplier(priss_power)
             enchantment_info: dict[str, object] = {}
             if priss_multiplier > 1.0:
@@ -6055,12 +7019,6 @@ class Database:
             before_balance = int(first_row["balance"])
             after_balance = before_balance + income
 
-            await connection.execute(
-                "UPDATE users SET pet_last_claim = $1, balance = $2 WHERE user_id = $3",
-                new_claim_time,
-                after_balance,
-                user_id,
-            )
             description = f"Revenus passifs ({len(rows)} pets)"
             if clan_bonus > 0:
                 description += " + boost clan"
@@ -6094,11 +7052,6 @@ class Database:
                 variance = max(1, int(round(pet_count * PET_FARM_GEM_VARIANCE_PER_PET)))
                 gem_reward = random.randint(max(0, gem_reward - variance), gem_reward + variance)
                 gems_after = gems_before + gem_reward
-                await connection.execute(
-                    "UPDATE users SET gems = $1 WHERE user_id = $2",
-                    gems_after,
-                    user_id,
-                )
                 await self.record_transaction(
                     connection=connection,
                     user_id=user_id,
@@ -6117,73 +7070,106 @@ class Database:
                 (PET_FARM_TICKET_BASE + PET_FARM_TICKET_PER_PET * pet_count)
                 * min(PET_FARM_TIME_FACTOR_MAX, elapsed_hours or 1.0),
             )
+            ticket_reward = 0
             if random.random() < ticket_chance:
-                await self.add_raffle_tickets(user_id, amount=1, connection=connection)
-                farm_rewards["tickets"] = 1
+                ticket_reward = 1
+                farm_rewards["tickets"] = ticket_reward
 
             potion_chance = min(
                 PET_FARM_POTION_MAX_CHANCE,
                 (PET_FARM_POTION_BASE + PET_FARM_POTION_PER_PET * pet_count)
                 * min(PET_FARM_TIME_FACTOR_MAX, elapsed_hours or 1.0),
             )
+            potion_reward_slug: str | None = None
             if random.random() < potion_chance:
                 available_potions = list(POTION_DEFINITION_MAP.values())
                 if available_potions:
-                    potion = random.choice(available_potions)
-                    await self.add_user_potion(
-                        user_id,
-                        potion.slug,
-                        quantity=1,
-                        connection=connection,
-                    )
-                    farm_rewards["potions"] = {potion.slug: 1}
+                    potion_reward_slug = random.choice(available_potions).slug
+                    farm_rewards["potions"] = {potion_reward_slug: 1}
 
             enchant_chance = min(
                 PET_FARM_ENCHANT_MAX_CHANCE,
                 PET_FARM_ENCHANT_BASE + PET_FARM_ENCHANT_PER_PET * pet_count,
             )
+            enchant_reward_slug: str | None = None
+            enchant_reward_power: int | None = None
             if random.random() < enchant_chance:
-                definition = pick_random_enchantment()
-                power = roll_enchantment_power()
-                await self.add_user_enchantment(
-                    user_id,
-                    definition.slug,
-                    power=power,
-                    quantity=1,
-                    connection=connection,
-                )
+                enchant_reward_slug = pick_random_enchantment().slug
+                enchant_reward_power = roll_enchantment_power()
                 farm_rewards["enchantments"] = [
-                    {"slug": definition.slug, "power": power}
+                    {"slug": enchant_reward_slug, "power": enchant_reward_power}
                 ]
 
             booster_expires = first_row.get("pet_booster_expires_at")
-            if (
+            reset_booster = (
                 booster_multiplier > 1
                 and isinstance(booster_expires, datetime)
                 and booster_expires <= now
-            ):
-                await connection.execute(
-                    """
-                    UPDATE users
-                    SET
-                        pet_booster_multiplier = 1,
-                        pet_booster_activated_at = NULL,
-                        pet_booster_expires_at = NULL
-                    WHERE user_id = $1
-                    """,
-                    user_id,
-                )
+            )
 
             progress_updates = self._calculate_huge_progress(
                 rows, income, effective_incomes, hourly_income, elapsed_hours
             )
-            for pet_id, (new_level, new_xp) in progress_updates.items():
-                await connection.execute(
-                    "UPDATE user_pets SET huge_level = $2, huge_xp = $3 WHERE id = $1",
-                    pet_id,
-                    new_level,
-                    new_xp,
-                )
+            progress_ids = list(progress_updates)
+
+            self._publish_invalidation((user_id,), *invalidation.INVENTORY, connection=connection)
+            await connection.execute(
+                """
+                WITH user_update AS (
+                    UPDATE users
+                    SET
+                        pet_last_claim = $2,
+                        balance = $3,
+                        gems = $4,
+                        pet_booster_multiplier = CASE WHEN $5 THEN 1 ELSE pet_booster_multiplier END,
+                        pet_booster_activated_at = CASE WHEN $5 THEN NULL ELSE pet_booster_activated_at END,
+                        pet_booster_expires_at = CASE WHEN $5 THEN NULL ELSE pet_booster_expires_at END,
+                        active_potion_slug = CASE WHEN $6 THEN NULL ELSE active_potion_slug END,
+                        active_potion_expires_at = CASE WHEN $6 THEN NULL ELSE active_potion_expires_at END
+                    WHERE user_id = $1
+                ),
+                huge_progress AS (
+                    UPDATE user_pets AS up
+                    SET huge_level = progress.level, huge_xp = progress.xp
+                    FROM unnest($7::INT[], $8::INT[], $9::BIGINT[]) AS progress(id, level, xp)
+                    WHERE up.id = progress.id
+                ),
+                ticket_reward AS (
+                    INSERT INTO raffle_tickets (user_id, quantity, updated_at)
+                    SELECT $1, $10::INT, NOW()
+                    WHERE $10::INT > 0
+                    ON CONFLICT (user_id)
+                    DO UPDATE SET
+                        quantity = raffle_tickets.quantity + EXCLUDED.quantity,
+                        updated_at = NOW()
+                ),
+                potion_reward AS (
+                    INSERT INTO user_potions (user_id, potion_slug, quantity)
+                    SELECT $1, $11::TEXT, 1
+                    WHERE $11::TEXT IS NOT NULL
+                    ON CONFLICT (user_id, potion_slug)
+                    DO UPDATE SET quantity = user_potions.quantity + EXCLUDED.quantity
+                )
+                INSERT INTO user_enchantments (user_id, slug, power, quantity)
+                SELECT $1, $12::TEXT, $13::SMALLINT, 1
+                WHERE $12::TEXT IS NOT NULL
+                ON CONFLICT (user_id, slug, power)
+                DO UPDATE SET quantity = user_enchantments.quantity + EXCLUDED.quantity
+                """,
+                user_id,
+                new_claim_time,
+                after_balance,
+                gems_before,
+                reset_booster,
+                potion_should_clear,
+                progress_ids,
+                [progress_updates[pet_id][0] for pet_id in progress_ids],
+                [progress_updates[pet_id][1] for pet_id in progress_ids],
+                ticket_reward,
+                potion_reward_slug,
+                enchant_reward_slug,
+                enchant_reward_power,
+            )
 
             booster_info: dict[str, float] = {}
             if booster_multiplier > 1:
@@ -6203,10 +7189,6 @@ class Database:
                     "remaining_seconds": float(max(0.0, potion_remaining)),
                 }
 
-            if potion_should_clear:
-                # FIX: Clear expired potions within the active transaction for consistency.
-                await self.clear_active_potion(user_id, connection=connection)
-
             rebirth_info = self._build_rebirth_info(rebirth_count, rebirth_bonus)
 
             return (
@@ -6230,6 +7212,355 @@ class Database:
             pet_id,
         )
 
+    async def hatch_eggs_bulk(
+        self,
+        user_id: int,
+        pets: Sequence[Mapping[str, Any]],
+        *,
+        currency: str,
+        cost: int,
+        mastery_slug: str,
+        description: str | None = None,
+    ) -> Dict[str, Any]:
+        """Enregistre l'ouverture de plusieurs œufs en une seule transaction.
+
+        ``pets`` contient les tirages déjà effectués (``pet_id`` et drapeaux
+        de variante). Le coût total est débité une fois, les pets sont
+        insérés par un seul ``unnest``, les ouvertures comptées d'un bloc et
+        l'expérience de maîtrise accordée en une fois (un point par pet).
+        Lève :class:`InsufficientBalanceError` sans rien écrire si le solde
+        ne couvre pas ``cost``.
+        """
+
+        if currency not in {"pb", "gem"}:
+            raise DatabaseError("Devise d'œuf inconnue.")
+        if not pets:
+            raise DatabaseError("Aucun pet à enregistrer.")
+        cost = max(0, int(cost))
+
+        pet_ids: list[int] = []
+        huge_flags: list[bool] = []
+        gold_flags: list[bool] = []
+        rainbow_flags: list[bool] = []
+        galaxy_flags: list[bool] = []
+        shiny_flags: list[bool] = []
+        for pet in pets:
+            is_galaxy = bool(pet.get("is_galaxy"))
+            is_rainbow = bool(pet.get("is_rainbow")) and not is_galaxy
+            pet_ids.append(int(pet["pet_id"]))
+            huge_flags.append(bool(pet.get("is_huge")))
+            gold_flags.append(bool(pet.get("is_gold")) and not (is_galaxy or is_rainbow))
+            rainbow_flags.append(is_rainbow)
+            galaxy_flags.append(is_galaxy)
+            shiny_flags.append(bool(pet.get("is_shiny")))
+
+        column = "gems" if currency == "gem" else "balance"
+        await self.ensure_user(user_id)
+        async with self.transaction() as connection:
+            row = await connection.fetchrow(
+                f"SELECT {column} FROM users WHERE user_id = $1 FOR UPDATE",
+                user_id,
+            )
+            if row is None:
+                raise DatabaseError("Utilisateur introuvable lors de l'ouverture d'œufs.")
+            before = int(row[column])
+            if before < cost:
+                raise InsufficientBalanceError("Solde insuffisant pour ouvrir ces œufs.")
+            after = before - cost
+            if cost:
+                await connection.execute(
+                    f"UPDATE users SET {column} = $1 WHERE user_id = $2",
+                    after,
+                    user_id,
+                )
+                await self.record_transaction(
+                    connection=connection,
+                    user_id=user_id,
+                    transaction_type="pet_purchase",
+                    currency=currency,
+                    amount=-cost,
+                    balance_before=before,
+                    balance_after=after,
+                    description=description,
+                )
+
+            # L'ORDER BY fixe l'ordre d'attribution des identifiants : trier
+            # le RETURNING par ``id`` restitue l'ordre des tirages.
+            rows = await connection.fetch(
+                """
+                INSERT INTO user_pets (user_id, pet_id, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny)
+                SELECT $1::BIGINT, p.pet_id, p.is_huge, p.is_gold, p.is_rainbow, p.is_galaxy, p.is_shiny
+                FROM unnest(
+                    $2::INTEGER[], $3::BOOLEAN[], $4::BOOLEAN[], $5::BOOLEAN[], $6::BOOLEAN[], $7::BOOLEAN[]
+                ) WITH ORDINALITY AS p(pet_id, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny, position)
+                ORDER BY p.position
+                RETURNING id, user_id, pet_id, is_active, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny, acquired_at
+                """,
+                user_id,
+                pet_ids,
+                huge_flags,
+                gold_flags,
+                rainbow_flags,
+                galaxy_flags,
+                shiny_flags,
+            )
+            if len(rows) != len(pet_ids):
+                raise DatabaseError("Impossible de créer les entrées user_pet")
+            await connection.execute(
+                """
+                INSERT INTO pet_openings (user_id, pet_id)
+                SELECT $1::BIGINT, pet_id FROM unnest($2::INTEGER[]) AS o(pet_id)
+                """,
+                user_id,
+                pet_ids,
+            )
+            await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._record_pet_index(connection, user_id, rows)
+            mastery = await self.add_mastery_experience(
+                user_id, mastery_slug, len(pet_ids), connection=connection
+            )
+
+        return {
+            "before": before,
+            "after": after,
+            "pets": sorted(rows, key=lambda record: int(record["id"])),
+            "mastery": mastery,
+        }
+
+    async def hatch_egg(
+        self,
+        user_id: int,
+        pet_id: int,
+        *,
+        is_huge: bool = False,
+        is_gold: bool = False,
+        is_rainbow: bool = False,
+        is_galaxy: bool = False,
+        is_shiny: bool = False,
+        currency: str,
+        cost: int,
+        mastery_slug: str,
+        description: str | None = None,
+    ) -> Dict[str, Any]:
+        """Enregistre l'ouverture d'un œuf déjà tiré en une seule requête.
+
+        Le débit (qui retire au passage une potion expirée), l'insertion du
+        pet, le compteur d'ouverture, l'expérience de maîtrise (potion d'XP
+        comprise) et l'ajout de la valeur du pet au RAP stocké forment une
+        chaîne de CTE : le débit conditionne tout le reste, si bien qu'un
+        solde insuffisant n'écrit rien et lève
+        :class:`InsufficientBalanceError`. La valeur du pet vient de la
+        matrice de prix ; seul un pet absent de la matrice (catalogue modifié
+        depuis sa compilation) retombe sur un recalcul complet du RAP.
+        """
+
+        if currency not in {"pb", "gem"}:
+            raise DatabaseError("Devise d'œuf inconnue.")
+        if is_galaxy:
+            is_gold = False
+            is_rainbow = False
+        elif is_rainbow:
+            is_gold = False
+        cost = max(0, int(cost))
+        definition = get_mastery_definition(mastery_slug)
+        floors = list(_mastery_xp_floors(definition.slug))
+        potion_slugs, potion_bonuses = _mastery_xp_potions()
+        column = "gems" if currency == "gem" else "balance"
+        matrix = await self._get_price_matrix()
+        rap_value = matrix.lookup(
+            pet_id,
+            _variant_flags(
+                {
+                    "is_gold": is_gold,
+                    "is_rainbow": is_rainbow,
+                    "is_galaxy": is_galaxy,
+                    "is_shiny": is_shiny,
+                    "is_huge": is_huge,
+                }
+            ),
+        )
+
+        await self.ensure_user(user_id)
+        async with self.transaction() as connection:
+            row = await connection.fetchrow(
+                f"""
+                WITH previous AS (
+                    SELECT active_potion_slug, active_potion_expires_at
+                    FROM users
+                    WHERE user_id = $1
+                ),
+                debit AS (
+                    UPDATE users
+                    SET {column} = {column} - $8,
+                        active_potion_slug = CASE
+                            WHEN active_potion_expires_at > NOW() THEN active_potion_slug
+                        END,
+                        active_potion_expires_at = CASE
+                            WHEN active_potion_expires_at > NOW() THEN active_potion_expires_at
+                        END
+                    WHERE user_id = $1 AND {column} >= $8
+                    RETURNING {column} + $8 AS before, {column} AS after,
+                        active_potion_slug, active_potion_expires_at
+                ),
+                pet AS (
+                    INSERT INTO user_pets (user_id, pet_id, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny)
+                    SELECT $1, $2::INTEGER, $3::BOOLEAN, $4::BOOLEAN, $5::BOOLEAN, $6::BOOLEAN, $7::BOOLEAN
+                    FROM debit
+                    RETURNING id, user_id, pet_id, is_active, is_huge, is_gold, is_rainbow, is_galaxy, is_shiny, acquired_at
+                ),
+                opening AS (
+                    INSERT INTO pet_openings (user_id, pet_id)
+                    SELECT user_id, pet_id FROM pet
+                ),
+                current_mastery AS (
+                    SELECT level, experience
+                    FROM user_masteries
+                    WHERE user_id = $1 AND mastery_slug = $9
+                    FOR UPDATE
+                ),
+                progress AS (
+                    SELECT
+                        COALESCE(cm.level, 1) AS previous_level,
+                        ($13::BIGINT[])[COALESCE(cm.level, 1)]
+                            + COALESCE(cm.experience, 0)
+                            + ROUND(
+                                $10::DOUBLE PRECISION * COALESCE(
+                                    (
+                                        SELECT 1 + potion.bonus
+                                        FROM unnest($11::TEXT[], $12::DOUBLE PRECISION[])
+                                            AS potion(slug, bonus)
+                                        WHERE potion.slug = d.active_potion_slug
+                                          AND d.active_potion_expires_at > NOW()
+                                    ),
+                                    1
+                                )
+                            )::BIGINT AS total
+                    FROM debit AS d
+                    LEFT JOIN current_mastery AS cm ON TRUE
+                ),
+                leveled AS (
+                    SELECT
+                        p.previous_level,
+                        p.total,
+                        (
+                            SELECT COUNT(*)::INTEGER
+                            FROM unnest($13::BIGINT[]) AS f(xp_floor)
+                            WHERE f.xp_floor <= p.total
+                        ) AS level
+                    FROM progress AS p
+                ),
+                mastery AS (
+                    INSERT INTO user_masteries (user_id, mastery_slug, level, experience)
+                    SELECT
+                        $1,
+                        $9,
+                        l.level,
+                        CASE
+                            WHEN l.level >= cardinality($13::BIGINT[]) THEN 0
+                            ELSE l.total - ($13::BIGINT[])[l.level]
+                        END
+                    FROM leveled AS l
+                    ON CONFLICT (user_id, mastery_slug) DO UPDATE
+                    SET level = EXCLUDED.level, experience = EXCLUDED.experience
+                    RETURNING level, experience
+                ),
+                rap AS (
+                    INSERT INTO user_rap_totals (user_id, rap_total, updated_at)
+                    SELECT user_id, $14::BIGINT, NOW()
+                    FROM pet
+                    WHERE $14::BIGINT IS NOT NULL
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET rap_total = user_rap_totals.rap_total + EXCLUDED.rap_total,
+                        updated_at = NOW()
+                )
+                SELECT
+                    d.before,
+                    d.after,
+                    pet.id,
+                    pet.pet_id,
+                    pet.is_active,
+                    pet.is_huge,
+                    pet.is_gold,
+                    pet.is_rainbow,
+                    pet.is_galaxy,
+                    pet.is_shiny,
+                    pet.acquired_at,
+                    l.previous_level,
+                    m.level,
+                    m.experience,
+                    p.active_potion_slug IS NOT NULL
+                        AND NOT COALESCE(p.active_potion_expires_at > NOW(), FALSE)
+                        AS potion_expired
+                FROM debit AS d, pet, leveled AS l, mastery AS m, previous AS p
+                """,
+                user_id,
+                pet_id,
+                is_huge,
+                is_gold,
+                is_rainbow,
+                is_galaxy,
+                is_shiny,
+                cost,
+                definition.slug,
+                1,
+                potion_slugs,
+                potion_bonuses,
+                floors,
+                rap_value,
+            )
+            if row is None:
+                raise InsufficientBalanceError("Solde insuffisant pour ouvrir cet œuf.")
+            if row["potion_expired"]:
+                # Comme ``_apply_mastery_experience`` : une potion expirée est
+                # retirée dès que l'expérience de maîtrise est accordée.
+                self._publish_invalidation((user_id,), invalidation.POTIONS, connection=connection)
+            if cost:
+                await self.record_transaction(
+                    connection=connection,
+                    user_id=user_id,
+                    transaction_type="pet_purchase",
+                    currency=currency,
+                    amount=-cost,
+                    balance_before=int(row["before"]),
+                    balance_after=int(row["after"]),
+                    description=description,
+                )
+            if rap_value is None:
+                await self.refresh_user_rap_totals([user_id], connection=connection)
+            await self._record_pet_index(connection, user_id, (row,))
+
+        level = int(row["level"])
+        previous_level = int(row["previous_level"])
+        return {
+            "before": int(row["before"]),
+            "after": int(row["after"]),
+            "pet": {
+                key: row[key]
+                for key in (
+                    "id",
+                    "pet_id",
+                    "is_active",
+                    "is_huge",
+                    "is_gold",
+                    "is_rainbow",
+                    "is_galaxy",
+                    "is_shiny",
+                    "acquired_at",
+                )
+            },
+            "mastery": {
+                "level": level,
+                "experience": int(row["experience"]),
+                "max_level": definition.max_level,
+                "xp_to_next_level": (
+                    definition.required_xp(level) if level < definition.max_level else 0
+                ),
+                "previous_level": previous_level,
+                "levels_gained": level - previous_level,
+                "new_levels": list(range(previous_level + 1, level + 1)),
+            },
+        }
+
     async def get_mastery_progress(self, user_id: int, mastery_slug: str) -> Dict[str, int]:
         definition = get_mastery_definition(mastery_slug)
         await self.ensure_user(user_id)
@@ -6263,9 +7594,13 @@ class Database:
         }
 
     async def add_mastery_experience(
-        self, user_id: int, mastery_slug: str, amount: int
+        self,
+        user_id: int,
+        mastery_slug: str,
+        amount: int,
+        *,
+        connection: asyncpg.Connection | None = None,
     ) -> Dict[str, object]:
-        definition = get_mastery_definition(mastery_slug)
         if amount <= 0:
             progress = await self.get_mastery_progress(user_id, mastery_slug)
             progress.update(
@@ -6275,93 +7610,109 @@ class Database:
             )
             return progress
 
+        if connection is not None:
+            return await self._apply_mastery_experience(
+                connection, user_id, mastery_slug, amount
+            )
         await self.ensure_user(user_id)
-        async with self.transaction() as connection:
-            now = datetime.now(timezone.utc)
-            user_row = await connection.fetchrow(
-                """
-                SELECT active_potion_slug, active_potion_expires_at
-                FROM users
-                WHERE user_id = $1
-                FOR UPDATE
-                """,
-                user_id,
+        async with self.transaction() as txn_connection:
+            return await self._apply_mastery_experience(
+                txn_connection, user_id, mastery_slug, amount
             )
 
-            potion_multiplier = 1.0
-            potion_slug = str(user_row.get("active_potion_slug") or "") if user_row else ""
-            potion_expires_at = user_row.get("active_potion_expires_at") if user_row else None
-            if potion_slug and isinstance(potion_expires_at, datetime):
-                if potion_expires_at > now:
-                    potion_definition = POTION_DEFINITION_MAP.get(potion_slug)
-                    if potion_definition and potion_definition.effect_type == "mastery_xp":
-                        potion_multiplier += float(potion_definition.effect_value)
-                else:
-                    await self.clear_active_potion(user_id, connection=connection)
-            elif potion_slug:
-                await self.clear_active_potion(user_id, connection=connection)
-
-            adjusted_amount = int(round(amount * potion_multiplier))
+    async def _apply_mastery_experience(
+        self,
+        connection: asyncpg.Connection,
+        user_id: int,
+        mastery_slug: str,
+        amount: int,
+    ) -> Dict[str, object]:
+        definition = get_mastery_definition(mastery_slug)
+        now = datetime.now(timezone.utc)
+        user_row = await connection.fetchrow(
+            """
+            SELECT active_potion_slug, active_potion_expires_at
+            FROM users
+            WHERE user_id = $1
+            FOR UPDATE
+            """,
+            user_id,
+        )
 
-            row = await connection.fetchrow(
-                """
-                SELECT level, experience
-                FROM user_masteries
-                WHERE user_id = $1 AND mastery_slug = $2
-                FOR UPDATE
-                """,
-                user_id,
-                mastery_slug,
-            )
-            if row is None:
-                level = 1
-                experience = 0
-                await connection.execute(
-                    """
-                    INSERT INTO user_masteries (user_id, mastery_slug, level, experience)
-                    VALUES ($1, $2, $3, $4)
-                    ON CONFLICT (user_id, mastery_slug) DO UPDATE
-                    SET level = EXCLUDED.level, experience = EXCLUDED.experience
-                    """,
-                    user_id,
-                    mastery_slug,
-                    level,
-                    experience,
-                )
+        potion_multiplier = 1.0
+        potion_slug = str(user_row.get("active_potion_slug") or "") if user_row else ""
+        potion_expires_at = user_row.get("active_potion_expires_at") if user_row else None
+        if potion_slug and isinstance(potion_expires_at, datetime):
+            if potion_expires_at > now:
+                potion_definition = POTION_DEFINITION_MAP.get(potion_slug)
+                if potion_definition and potion_definition.effect_type == "mastery_xp":
+                    potion_multiplier += float(potion_definition.effect_value)
             else:
-                level = int(row["level"])
-                experience = int(row["experience"])
-
-            previous_level = level
-            experience += int(adjusted_amount)
-            experience = max(0, min(experience, sys.maxsize))
-            levels_gained = 0
-            new_levels: List[int] = []
-
-            while level < definition.max_level:
-                required = definition.required_xp(level)
-                if required <= 0 or experience < required:
-                    break
-                experience -= required
-                level += 1
-                levels_gained += 1
-                new_levels.append(level)
+                await self.clear_active_potion(user_id, connection=connection)
+        elif potion_slug:
+            await self.clear_active_potion(user_id, connection=connection)
 
-            if level >= definition.max_level:
-                level = definition.max_level
-                experience = 0
+        adjusted_amount = int(round(amount * potion_multiplier))
 
+        row = await connection.fetchrow(
+            """
+            SELECT level, experience
+            FROM user_masteries
+            WHERE user_id = $1 AND mastery_slug = $2
+            FOR UPDATE
+            """,
+            user_id,
+            mastery_slug,
+        )
+        if row is None:
+            level = 1
+            experience = 0
             await connection.execute(
                 """
-                UPDATE user_masteries
-                SET level = $3, experience = $4
-                WHERE user_id = $1 AND mastery_slug = $2
+                INSERT INTO user_masteries (user_id, mastery_slug, level, experience)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (user_id, mastery_slug) DO UPDATE
+                SET level = EXCLUDED.level, experience = EXCLUDED.experience
                 """,
                 user_id,
                 mastery_slug,
                 level,
                 experience,
             )
+        else:
+            level = int(row["level"])
+            experience = int(row["experience"])
+
+        previous_level = level
+        experience += int(adjusted_amount)
+        experience = max(0, min(experience, sys.maxsize))
+        levels_gained = 0
+        new_levels: List[int] = []
+
+        while level < definition.max_level:
+            required = definition.required_xp(level)
+            if required <= 0 or experience < required:
+                break
+            experience -= required
+            level += 1
+            levels_gained += 1
+            new_levels.append(level)
+
+        if level >= definition.max_level:
+            level = definition.max_level
+            experience = 0
+
+        await connection.execute(
+            """
+            UPDATE user_masteries
+            SET level = $3, experience = $4
+            WHERE user_id = $1 AND mastery_slug = $2
+            """,
+            user_id,
+            mastery_slug,
+            level,
+            experience,
+        )
 
         xp_to_next = definition.required_xp(level) if level < definition.max_level else 0
         return {
@@ -6401,11 +7752,174 @@ class Database:
     async def get_unique_pet_count(self, user_id: int) -> int:
         """Compte le nombre de pets distincts déjà découverts par un joueur."""
 
-        value = await self.pool.fetchval(
-            "SELECT COUNT(DISTINCT pet_id) FROM user_pets WHERE user_id = $1",
-            int(user_id),
+        return (await self.get_pet_index(user_id)).unique_count
+
+    # ------------------------------------------------------------------
+    # Index des pets découverts
+    # ------------------------------------------------------------------
+    _PET_INDEX_SOURCE_QUERY = """
+        SELECT
+            user_id,
+            pet_id,
+            bool_or(is_gold) AS is_gold,
+            bool_or(is_rainbow) AS is_rainbow,
+            bool_or(is_galaxy) AS is_galaxy,
+            bool_or(is_shiny) AS is_shiny
+        FROM user_pets
+        {filter}
+        GROUP BY user_id, pet_id
+    """
+
+    @staticmethod
+    def _pet_index_by_user(rows: Iterable[Mapping[str, Any]]) -> Dict[int, PetIndex]:
+        grouped: Dict[int, list[Mapping[str, Any]]] = defaultdict(list)
+        for row in rows:
+            grouped[int(row["user_id"])].append(row)
+        return {user_id: PetIndex.from_pets(pets) for user_id, pets in grouped.items()}
+
+    async def get_pet_index(self, user_id: int) -> PetIndex:
+        """Retourne l'index des pets découverts, lu dans ``user_pet_index``.
+
+        Le résultat reste en cache jusqu'à la prochaine espèce ou variante
+        obtenue : les ouvertures d'œufs n'y touchent pas tant que rien de
+        nouveau ne sort.
+        """
+
+        key = int(user_id)
+        cached = self._pet_index_cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self._pet_index_cache.generation()
+
+        async def load() -> PetIndex:
+            row = await self._fetchrow(
+                f"SELECT {', '.join(PET_INDEX_COLUMNS)} FROM user_pet_index WHERE user_id = $1",
+                key,
+            )
+            index = PetIndex.from_row(row)
+            self._pet_index_cache.set(key, index, generation=generation)
+            return index
+
+        return await self._single_flight.run(("pet_index", key), load)
+
+    async def reset_pet_index(self, user_id: int, *, connection: asyncpg.Connection) -> None:
+        """Ramène l'index de ``user_id`` au contenu actuel de sa collection.
+
+        À appeler dans la transaction qui supprime ses pets (réinitialisation
+        d'un joueur) : l'index ne fait sinon que grandir.
+        """
+
+        await self._sync_pet_index(connection, [user_id], replace=True)
+
+    async def _record_pet_index(
+        self,
+        connection: asyncpg.Connection,
+        user_id: int,
+        pets: Iterable[Mapping[str, Any]],
+    ) -> None:
+        """Ajoute à l'index les pets que ``user_id`` vient d'obtenir.
+
+        Si le cache couvre déjà ces espèces et variantes, aucune requête n'est
+        émise ; c'est le cas de la grande majorité des ouvertures.
+        """
+
+        acquired = PetIndex.from_pets(pets)
+        if not acquired.owned:
+            return
+        cached = self._pet_index_cache.get(int(user_id))
+        if cached is not None and cached.covers(acquired):
+            return
+        await self._store_pet_index(connection, {int(user_id): acquired})
+
+    async def _sync_pet_index(
+        self,
+        connection: asyncpg.Connection,
+        user_ids: Iterable[int],
+        *,
+        replace: bool = False,
+    ) -> None:
+        """Reconstruit l'index des joueurs donnés depuis ``user_pets``.
+
+        Avec ``replace``, l'index est ramené au contenu actuel de la
+        collection (renaissance) au lieu d'y être fusionné.
+        """
+
+        unique_ids = sorted({int(user_id) for user_id in user_ids if int(user_id) > 0})
+        if not unique_ids:
+            return
+        rows = await connection.fetch(
+            self._PET_INDEX_SOURCE_QUERY.format(filter="WHERE user_id = ANY($1::BIGINT[])"),
+            unique_ids,
         )
-        return int(value or 0)
+        indexes = self._pet_index_by_user(rows)
+        if replace:
+            for user_id in unique_ids:
+                indexes.setdefault(user_id, PetIndex())
+        await self._store_pet_index(connection, indexes, replace=replace)
+
+    async def _store_pet_index(
+        self,
+        connection: asyncpg.Connection,
+        indexes: Mapping[int, PetIndex],
+        *,
+        replace: bool = False,
+    ) -> None:
+        user_ids = sorted(indexes)
+        if not user_ids:
+            return
+        columns = ", ".join(PET_INDEX_COLUMNS)
+        if not replace:
+            # La ligne est créée d'abord pour que le FOR UPDATE sérialise
+            # aussi deux premières découvertes concurrentes.
+            await connection.execute(
+                """
+                INSERT INTO user_pet_index (user_id)
+                SELECT unnest($1::BIGINT[])
+                ON CONFLICT (user_id) DO NOTHING
+                """,
+                user_ids,
+            )
+            rows = await connection.fetch(
+                f"""
+                SELECT user_id, {columns}
+                FROM user_pet_index
+                WHERE user_id = ANY($1::BIGINT[])
+                ORDER BY user_id
+                FOR UPDATE
+                """,
+                user_ids,
+            )
+            current = {int(row["user_id"]): PetIndex.from_row(row) for row in rows}
+            merged: Dict[int, PetIndex] = {}
+            for user_id in user_ids:
+                existing = current.get(user_id, PetIndex())
+                if not existing.covers(indexes[user_id]):
+                    merged[user_id] = existing | indexes[user_id]
+            indexes = merged
+            user_ids = sorted(merged)
+            if not user_ids:
+                return
+        encoded = [indexes[user_id].encoded() for user_id in user_ids]
+        await connection.execute(
+            f"""
+            INSERT INTO user_pet_index (user_id, {columns}, updated_at)
+            SELECT data.*, NOW()
+            FROM unnest(
+                $1::BIGINT[], $2::BYTEA[], $3::BYTEA[], $4::BYTEA[], $5::BYTEA[], $6::BYTEA[]
+            ) AS data(user_id, {columns})
+            ON CONFLICT (user_id) DO UPDATE SET
+                owned = EXCLUDED.owned,
+                gold = EXCLUDED.gold,
+                rainbow = EXCLUDED.rainbow,
+                galaxy = EXCLUDED.galaxy,
+                shiny = EXCLUDED.shiny,
+                updated_at = NOW()
+            """,
+            user_ids,
+            *([values[position] for values in encoded] for position in range(len(PET_INDEX_COLUMNS))),
+        )
+        self._publish_invalidation(user_ids, invalidation.PET_INDEX, connection=connection)
 
     @staticmethod
     def _build_variant_code(is_gold: bool, is_rainbow: bool, is_galaxy: bool, is_shiny: bool) -> str:
@@ -6497,10 +8011,22 @@ class Database:
 
         if connection is not None:
             await connection.execute(query, *params)
-            return
+            self._invalidate_market_snapshot(connection=connection)
+        else:
+            async with self.transaction() as txn_connection:
+                await txn_connection.execute(query, *params)
+                self._invalidate_market_snapshot(connection=txn_connection)
 
-        async with self.transaction() as txn_connection:
-            await txn_connection.execute(query, *params)
+        async def refresh_owner_rap() -> None:
+            # L'historique ne fixe les prix que si ``pet_market_values`` est vide.
+            if await self._fetchval("SELECT EXISTS (SELECT 1 FROM pet_market_values)"):
+                return
+            owners = await self._fetch(
+                "SELECT DISTINCT user_id FROM user_pets WHERE pet_id = $1", pet_id
+            )
+            await self.refresh_user_rap_totals(int(row["user_id"]) for row in owners)
+
+        await self._after_commit(connection, refresh_owner_rap)
 
     async def _get_trade_history_market_values(self) -> Dict[Tuple[int, str], int]:
         query = """
@@ -6602,9 +8128,35 @@ class Database:
 
         return market_values
 
-    async def get_pet_market_values(self) -> Dict[Tuple[int, str], int]:
-        """Retourne la dernière valeur marché enregistrée pour chaque variante."""
+    def _invalidate_market_snapshot(self, *, connection: asyncpg.Connection | None = None) -> None:
+        self._publish_invalidation(None, invalidation.MARKET, connection=connection)
+
+    def _bump_market_version(self, _user_ids: object, _kinds: object) -> None:
+        self._market_version += 1
+
+    async def get_pet_market_values(self) -> Mapping[Tuple[int, str], int]:
+        """Retourne la dernière valeur marché enregistrée pour chaque variante.
+
+        Le résultat est un instantané en lecture seule conservé en mémoire tant
+        que ni ``sync_pet_market_values`` ni ``record_pet_trade_value`` n'ont
+        changé les prix (et au plus ``CACHE_TTL_MARKET_VALUES`` secondes).
+        Les appels concurrents pendant un rechargement partagent la même requête.
+        """
+
+        snapshot = self._market_snapshot
+        if (
+            snapshot is not None
+            and snapshot.version == self._market_version
+            and time.monotonic() - snapshot.loaded_at < CACHE_TTL_MARKET_VALUES
+        ):
+            return snapshot.values
+
+        version = self._market_version
+        return await self._single_flight.run(
+            ("market_values", version), lambda: self._load_market_snapshot(version)
+        )
 
+    async def _load_market_snapshot(self, version: int) -> Mapping[Tuple[int, str], int]:
         rows = await self.pool.fetch(
             """
             SELECT pet_id, variant_code, value_in_gems
@@ -6612,14 +8164,23 @@ class Database:
             """
         )
         if rows:
-            return {
+            values = {
                 (int(row["pet_id"]), str(row["variant_code"])): max(
                     0, int(row["value_in_gems"])
                 )
                 for row in rows
             }
+        else:
+            values = await self._get_trade_history_market_values()
 
-        return await self._get_trade_history_market_values()
+        snapshot = _MarketSnapshot(
+            version=version,
+            values=MappingProxyType(values),
+            loaded_at=time.monotonic(),
+        )
+        if version == self._market_version:
+            self._market_snapshot = snapshot
+        return snapshot.values
 
     @staticmethod
     def _market_rarity_key(*, name: str, rarity: str, is_huge: bool) -> str:
@@ -6842,15 +8403,22 @@ class Database:
         if not values_to_store:
             return 0
 
-        await self.pool.executemany(
-            """
-            INSERT INTO pet_market_values (pet_id, variant_code, value_in_gems)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (pet_id, variant_code)
-            DO UPDATE SET value_in_gems = $3, updated_at = CURRENT_TIMESTAMP
-            """,
-            values_to_store,
-        )
+        async with self.transaction() as connection:
+            await connection.executemany(
+                """
+                INSERT INTO pet_market_values (pet_id, variant_code, value_in_gems)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (pet_id, variant_code)
+                DO UPDATE SET value_in_gems = $3, updated_at = CURRENT_TIMESTAMP
+                """,
+                values_to_store,
+            )
+            # Les prix ont changé : le RAP stocké de chaque joueur doit suivre.
+            await self._rebuild_user_rap_totals(
+                connection,
+                {(pet_id, code): value for pet_id, code, value in values_to_store},
+            )
+        self._invalidate_market_snapshot()
         return len(values_to_store)
 
     async def reset_rich_users_gems(
@@ -6886,6 +8454,9 @@ class Database:
 
             total_removed = sum(row["gems"] - new_amount for row in rows_before)
             await conn.execute(query_update, new_amount, threshold)
+        self._publish_invalidation(
+            [int(row["user_id"]) for row in rows_before], invalidation.GEMS
+        )
 
         users_details = [
             {
@@ -6982,8 +8553,17 @@ class Database:
     # Historique financier
     # ------------------------------------------------------------------
     async def get_recent_transactions(self, user_id: int, limit: int = 20) -> Sequence[asyncpg.Record]:
-        _ = (user_id, limit)
-        return []
+        return await self._fetch(
+            """
+            SELECT *
+            FROM transactions
+            WHERE user_id = $1
+            ORDER BY created_at DESC, id DESC
+            LIMIT $2
+            """,
+            user_id,
+            max(0, int(limit)),
+        )
 
     # ------------------------------------------------------------------
     # Stand de la plaza (listings)
@@ -6997,9 +8577,10 @@ class Database:
         await self.ensure_user(seller_id)
 
         async with self.transaction() as connection:
+            self._publish_invalidation((seller_id,), invalidation.PETS, connection=connection)
             pet_row = await connection.fetchrow(
                 """
-                SELECT id, user_id, pet_id, is_active, on_market, is_gold, is_rainbow, is_shiny
+                SELECT id, user_id, pet_id, is_active, on_market, is_gold, is_rainbow, is_galaxy, is_shiny
                 FROM user_pets
                 WHERE id = $1
                 FOR UPDATE
@@ -7064,7 +8645,7 @@ class Database:
                     price = int(max(0, int(entry.get("price", 0))))
                     row = await connection.fetchrow(
                         """
-                        SELECT id, user_id, pet_id, is_active, on_market, is_gold, is_rainbow, is_shiny
+                        SELECT id, user_id, pet_id, is_active, on_market, is_gold, is_rainbow, is_galaxy, is_shiny
                         FROM user_pets
                         WHERE id = $1
                         FOR UPDATE
@@ -7217,6 +8798,12 @@ class Database:
 
             initiator_transferred = await _transfer(partner_id, initiator_pets)
             partner_transferred = await _transfer(initiator_id, partner_pets)
+            if initiator_transferred or partner_transferred:
+                await self.refresh_user_rap_totals(
+                    [initiator_id, partner_id], connection=connection
+                )
+                await self._record_pet_index(connection, partner_id, initiator_transferred)
+                await self._record_pet_index(connection, initiator_id, partner_transferred)
 
         return {
             "initiator_before": initiator_before,
@@ -7231,6 +8818,7 @@ class Database:
 
     async def cancel_market_listing(self, listing_id: int, seller_id: int) -> asyncpg.Record:
         async with self.transaction() as connection:
+            self._publish_invalidation((seller_id,), invalidation.PETS, connection=connection)
             listing = await connection.fetchrow(
                 "SELECT * FROM market_listings WHERE id = $1 FOR UPDATE",
                 listing_id,
@@ -7287,7 +8875,7 @@ class Database:
             user_pet_id = int(listing["user_pet_id"])
             pet_row = await connection.fetchrow(
                 """
-                SELECT id, user_id, pet_id, is_active, on_market, is_gold, is_rainbow, is_shiny
+                SELECT id, user_id, pet_id, is_active, on_market, is_gold, is_rainbow, is_galaxy, is_shiny
                 FROM user_pets
                 WHERE id = $1
                 FOR UPDATE
@@ -7343,6 +8931,8 @@ class Database:
                 buyer_id,
                 user_pet_id,
             )
+            await self.refresh_user_rap_totals([buyer_id, seller_id], connection=connection)
+            await self._record_pet_index(connection, buyer_id, (pet_row,))
 
             completed = await connection.fetchrow(
                 """
@@ -7511,6 +9101,7 @@ class Database:
         await self.ensure_user(seller_id)
 
         async with self.transaction() as connection:
+            self._publish_invalidation((seller_id,), *invalidation.INVENTORY, connection=connection)
             slug = item_slug
             if item_type == "ticket":
                 slug = "raffle_ticket"
@@ -7579,6 +9170,7 @@ class Database:
         self, listing_id: int, seller_id: int
     ) -> asyncpg.Record:
         async with self.transaction() as connection:
+            self._publish_invalidation((seller_id,), *invalidation.INVENTORY, connection=connection)
             listing = await connection.fetchrow(
                 "SELECT * FROM plaza_consumable_listings WHERE id = $1 FOR UPDATE",
                 listing_id,
@@ -7639,6 +9231,7 @@ class Database:
         await self.ensure_user(buyer_id)
 
         async with self.transaction() as connection:
+            self._publish_invalidation((buyer_id,), *invalidation.INVENTORY, connection=connection)
             listing = await connection.fetchrow(
                 "SELECT * FROM plaza_consumable_listings WHERE id = $1 FOR UPDATE",
                 listing_id,
@@ -7815,15 +9408,21 @@ class Database:
             user_pet_id = int(auction.get("user_pet_id") or 0)
             if user_pet_id <= 0:
                 raise DatabaseError("Pet introuvable pour cette enchère.")
-            await connection.execute(
+            granted = await connection.fetch(
                 """
                 UPDATE user_pets
                 SET user_id = $1, is_active = FALSE, on_market = FALSE
                 WHERE id = $2
+                RETURNING pet_id, is_gold, is_rainbow, is_galaxy, is_shiny
                 """,
                 winner_id,
                 user_pet_id,
             )
+            await self.refresh_user_rap_totals(
+                [winner_id, int(auction.get("seller_id") or 0)],
+                connection=connection,
+            )
+            await self._record_pet_index(connection, winner_id, granted)
         elif item_type == "ticket":
             await self.add_raffle_tickets(
                 winner_id, amount=quantity, connection=connection
@@ -8037,6 +9636,7 @@ class Database:
         ends_at = datetime.now(timezone.utc) + timedelta(minutes=duration_minutes)
 
         async with self.transaction() as connection:
+            self._publish_invalidation((seller_id,), invalidation.PETS, connection=connection)
             pet_row = await connection.fetchrow(
                 """
                 SELECT id, user_id, is_active, on_market
@@ -8115,6 +9715,7 @@ class Database:
         ends_at = datetime.now(timezone.utc) + timedelta(minutes=duration_minutes)
 
         async with self.transaction() as connection:
+            self._publish_invalidation((seller_id,), *invalidation.INVENTORY, connection=connection)
             if item_type == "ticket":
                 removed = await self.remove_raffle_tickets(
                     seller_id, amount=quantity, connection=connection
@@ -8174,6 +9775,7 @@ class Database:
 
     async def cancel_auction(self, auction_id: int, seller_id: int) -> asyncpg.Record:
         async with self.transaction() as connection:
+            self._publish_invalidation((seller_id,), *invalidation.INVENTORY, connection=connection)
             auction = await connection.fetchrow(
                 "SELECT * FROM plaza_auctions WHERE id = $1 FOR UPDATE",
                 auction_id,
@@ -8338,100 +9940,89 @@ class Database:
     async def get_analytics_snapshot(
         self,
     ) -> tuple[Mapping[str, int], Sequence[Mapping[str, int | str]]]:
-        cache_key = ("analytics_global",)
-        cached = self._analytics_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
-        totals = await self.get_server_economy_totals()
-        pet_values = await self.get_pet_value_overview()
-        snapshot = (totals, pet_values)
-        self._analytics_cache.set(cache_key, snapshot)
-        return snapshot
+        async def load() -> tuple[Mapping[str, int], Sequence[Mapping[str, int | str]]]:
+            totals = await self.get_server_economy_totals()
+            pet_values = await self.get_pet_value_overview()
+            return (totals, pet_values)
+
+        return await self._cached_read(self._analytics_cache, ("analytics_global",), load)
 
+    @replica_read
     async def get_server_economy_totals(self) -> Mapping[str, int]:
-        cache_key = ("analytics_totals",)
-        cached = self._analytics_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
-        row = await self._fetchrow(
-            """
-            SELECT
-                COALESCE(SUM(balance), 0) AS total_pb,
-                COALESCE(SUM(gems), 0) AS total_gems
-            FROM users
-            """
-        )
-        if row is None:
-            raise DatabaseError("Impossible de récupérer les statistiques économiques")
-        total_rap = await self.get_total_pet_rap()
-        result = {
-            "total_pb": int(row["total_pb"]),
-            "total_gems": int(row["total_gems"]),
-            "total_rap": int(total_rap),
-        }
-        self._analytics_cache.set(cache_key, result)
-        return result
+        async def load() -> Mapping[str, int]:
+            row = await self._fetchrow(
+                """
+                SELECT
+                    COALESCE(SUM(balance), 0) AS total_pb,
+                    COALESCE(SUM(gems), 0) AS total_gems
+                FROM users
+                """
+            )
+            if row is None:
+                raise DatabaseError("Impossible de récupérer les statistiques économiques")
+            total_rap = await self.get_total_pet_rap()
+            return {
+                "total_pb": int(row["total_pb"]),
+                "total_gems": int(row["total_gems"]),
+                "total_rap": int(total_rap),
+            }
+
+        return await self._cached_read(self._analytics_cache, ("analytics_totals",), load)
 
     async def get_total_pet_rap(self) -> int:
         await self._ensure_market_values_ready()
-        query = f"""
-            {self._rap_values_cte()}
-            SELECT COALESCE(SUM(rap_total), 0) AS total_rap
-            FROM (
-                SELECT user_id, SUM(rap_value) AS rap_total
-                FROM rap_values
-                GROUP BY user_id
-            ) AS totals
-        """
-        value = await self._fetchval(query)
+        value = await self._fetchval(
+            "SELECT COALESCE(SUM(rap_total), 0) AS total_rap FROM user_rap_totals"
+        )
         return int(value or 0)
 
+    @replica_read
     async def get_pet_value_overview(self) -> Sequence[Mapping[str, int | str]]:
-        cache_key = ("analytics_pet_values",)
-        cached = self._analytics_cache.get(cache_key)
-        if cached is not None:
-            return cached  # type: ignore[return-value]
-        rows = await self._fetch(
-            """
-            SELECT
-                p.pet_id,
-                p.name,
-                p.rarity,
-                p.base_income_per_hour,
-                COALESCE(m.value_in_gems, 0) AS market_value
-            FROM pets AS p
-            LEFT JOIN pet_market_values AS m
-                ON m.pet_id = p.pet_id
-                AND m.variant_code = 'normal'
-            ORDER BY p.pet_id
-            """
-        )
-        results: list[dict[str, int | str]] = []
-        for row in rows:
-            pet_id = int(row["pet_id"])
-            base_income = int(row["base_income_per_hour"])
-            value = int(row["market_value"] or 0)
-            if value <= 0:
-                name = str(row.get("name", ""))
-                rarity = str(row.get("rarity", ""))
-                zone_slug = _PET_ZONE_BY_NAME.get(name.lower(), "exclusif")
-                value = self._fallback_market_value(
-                    name=name,
-                    rarity=rarity,
-                    base_income_per_hour=base_income,
-                    is_huge=name.lower() in _HUGE_PET_NAME_LOOKUP,
-                    zone_slug=zone_slug,
-                    is_gold=False,
-                    is_rainbow=False,
-                    is_galaxy=False,
-                    is_shiny=False,
-                )
-            results.append(
-                {
-                    "pet_id": pet_id,
-                    "name": str(row["name"]),
-                    "value": int(value),
-                }
+        async def load() -> Sequence[Mapping[str, int | str]]:
+            rows = await self._fetch(
+                """
+                SELECT
+                    p.pet_id,
+                    p.name,
+                    p.rarity,
+                    p.base_income_per_hour,
+                    COALESCE(m.value_in_gems, 0) AS market_value
+                FROM pets AS p
+                LEFT JOIN pet_market_values AS m
+                    ON m.pet_id = p.pet_id
+                    AND m.variant_code = 'normal'
+                ORDER BY p.pet_id
+                """
             )
-        self._analytics_cache.set(cache_key, results)
-        return results
+            results: list[dict[str, int | str]] = []
+            for row in rows:
+                pet_id = int(row["pet_id"])
+                base_income = int(row["base_income_per_hour"])
+                value = int(row["market_value"] or 0)
+                if value <= 0:
+                    name = str(row.get("name", ""))
+                    rarity = str(row.get("rarity", ""))
+                    zone_slug = _PET_ZONE_BY_NAME.get(name.lower(), "exclusif")
+                    value = self._fallback_market_value(
+                        name=name,
+                        rarity=rarity,
+                        base_income_per_hour=base_income,
+                        is_huge=name.lower() in _HUGE_PET_NAME_LOOKUP,
+                        zone_slug=zone_slug,
+                        is_gold=False,
+                        is_rainbow=False,
+                        is_galaxy=False,
+                        is_shiny=False,
+                    )
+                results.append(
+                    {
+                        "pet_id": pet_id,
+                        "name": str(row["name"]),
+                        "value": int(value),
+                    }
+                )
+            return results
+
+        return await self._cached_read(
+            self._analytics_cache, ("analytics_pet_values",), load
+        )
@@ -0,0 +1,454 @@
+"""Mesure de chaque requête SQL : latences, lignes, erreurs et requêtes lentes."""
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import sys
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, TypeVar
+
+import asyncpg
+
+from utils.telemetry import current_trace
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("database.slow_queries")
+
+_DB_MODULE_SUFFIXES = ("database/db.py", "database\\db.py")
+_SKIPPED_MODULE_PARTS = ("/asyncpg/", "\\asyncpg\\", "database/instrumentation.py", "database\\instrumentation.py")
+# Aides génériques de ``Database`` : on remonte jusqu'à la méthode métier appelante.
+_HELPER_NAMES = frozenset({"_fetch", "_fetchrow", "_fetchval", "fetch_value", "_cached_read"})
+_EXPLAINABLE_PREFIXES = ("select", "with", "update", "insert", "delete")
+# Étiquette des EXPLAIN eux-mêmes, jamais échantillonnés à leur tour.
+EXPLAIN_LABEL = "_explain_query"
+
+# Méthode ``Database`` en cours, posée par :func:`label_queries` et héritée par
+# les tâches de fond (single-flight) qu'elle lance.
+query_label: ContextVar[Optional[str]] = ContextVar("query_label", default=None)
+# Vrai pendant ``Connection.reset()`` : le nettoyage fait par le pool à la
+# libération n'est pas une requête de la commande.
+_uninstrumented: ContextVar[bool] = ContextVar("_uninstrumented", default=False)
+
+C = TypeVar("C", bound=type)
+
+
+def _percentile(ordered: Sequence[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+@dataclass
+class QueryStats:
+    """Compteurs cumulés et fenêtre glissante de latences pour une étiquette."""
+
+    window: int
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    latencies: Deque[float] = field(default_factory=deque)
+
+    def __post_init__(self) -> None:
+        self.latencies = deque(maxlen=max(1, self.window))
+
+    def observe(self, elapsed: float, rows: int, failed: bool) -> None:
+        self.calls += 1
+        self.rows += rows
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        if failed:
+            self.errors += 1
+        self.latencies.append(elapsed)
+
+    def percentiles(self) -> tuple[float, float, float]:
+        ordered = sorted(self.latencies)
+        return (
+            _percentile(ordered, 0.50),
+            _percentile(ordered, 0.95),
+            _percentile(ordered, 0.99),
+        )
+
+
+class QueryMetrics:
+    """Registre des statistiques SQL, indexé par méthode appelante."""
+
+    def __init__(
+        self,
+        *,
+        window: int,
+        slow_threshold_seconds: float,
+        explain_sample_rate: float,
+        log_every_query: bool = False,
+        explain_cooldown_seconds: float = 300.0,
+    ) -> None:
+        self._window = max(1, int(window))
+        self.slow_threshold_seconds = max(0.0, float(slow_threshold_seconds))
+        self._explain_sample_rate = min(1.0, max(0.0, float(explain_sample_rate)))
+        self._log_every_query = log_every_query
+        self._explain_cooldown = max(0.0, float(explain_cooldown_seconds))
+        self._last_explain: Dict[str, float] = {}
+        self._explain_runner: Optional[Callable[[str, Sequence[Any]], Awaitable[str]]] = None
+        self.stats: Dict[str, QueryStats] = {}
+        self.slow_queries = 0
+
+    def set_explain_runner(
+        self, runner: Optional[Callable[[str, Sequence[Any]], Awaitable[str]]]
+    ) -> None:
+        self._explain_runner = runner
+
+    def observe(
+        self,
+        label: str,
+        query: str,
+        args: Sequence[Any],
+        elapsed: float,
+        *,
+        rows: int = 0,
+        failed: bool = False,
+    ) -> None:
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = QueryStats(self._window)
+        stats.observe(elapsed, rows, failed)
+        if self._log_every_query:
+            logger.info("SQL %s en %.3fs (%d lignes)", label, elapsed, rows)
+        if elapsed >= self.slow_threshold_seconds and label != EXPLAIN_LABEL:
+            self.slow_queries += 1
+            slow_query_logger.warning(
+                "Requête lente %s : %.0f ms, %d lignes\n%s",
+                label,
+                elapsed * 1000,
+                rows,
+                " ".join(query.split())[:2000],
+            )
+            self._maybe_explain(label, query, args)
+
+    def _maybe_explain(self, label: str, query: str, args: Sequence[Any]) -> None:
+        runner = self._explain_runner
+        if runner is None or self._explain_sample_rate <= 0:
+            return
+        if not query.lstrip().lower().startswith(_EXPLAINABLE_PREFIXES):
+            return
+        now = time.monotonic()
+        if now - self._last_explain.get(label, float("-inf")) < self._explain_cooldown:
+            return
+        if random.random() >= self._explain_sample_rate:
+            return
+        self._last_explain[label] = now
+
+        async def explain() -> None:
+            try:
+                plan = await runner(query, args)
+            except Exception as exc:
+                slow_query_logger.info("EXPLAIN impossible pour %s : %s", label, exc)
+                return
+            slow_query_logger.warning("Plan de %s :\n%s", label, plan)
+
+        try:
+            asyncio.get_running_loop().create_task(explain())
+        except RuntimeError:  # pragma: no cover - hors boucle asyncio
+            return
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Résumé trié par temps total décroissant (les plus coûteuses d'abord)."""
+
+        summary: List[Dict[str, Any]] = []
+        for label, stats in self.stats.items():
+            p50, p95, p99 = stats.percentiles()
+            summary.append(
+                {
+                    "label": label,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "total_seconds": stats.total_seconds,
+                    "max_seconds": stats.max_seconds,
+                    "p50": p50,
+                    "p95": p95,
+                    "p99": p99,
+                }
+            )
+        summary.sort(key=lambda entry: entry["total_seconds"], reverse=True)
+        return summary
+
+
+def _method_name(code: Any) -> str:
+    # ``Database.get_x.<locals>.load`` -> ``get_x`` : les fonctions internes
+    # sont rattachées à la méthode qui les définit.
+    qualname = getattr(code, "co_qualname", code.co_name)
+    return qualname.split(".<locals>.", 1)[0].rsplit(".", 1)[-1]
+
+
+def label_queries(cls: C) -> C:
+    """Étiquette les requêtes de chaque méthode coroutine de ``cls`` par son nom.
+
+    L'étiquette est posée une fois par appel de méthode au lieu de remonter la
+    pile à chaque requête ; la méthode la plus interne l'emporte.
+    """
+
+    for name, attribute in list(vars(cls).items()):
+        if name in _HELPER_NAMES or not inspect.iscoroutinefunction(attribute):
+            continue
+        setattr(cls, name, _labelled(name, attribute))
+    return cls
+
+
+def _labelled(name: str, method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = query_label.set(name)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            query_label.reset(token)
+
+    return wrapper
+
+
+def caller_label() -> str:
+    """Nom de la méthode ``Database`` (ou du module externe) à l'origine de la requête.
+
+    Repli coûteux (parcours de la pile) pour les requêtes émises hors d'une
+    méthode étiquetée par :func:`label_queries`.
+    """
+
+    frame = sys._getframe(1)
+    fallback: Optional[str] = None
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.endswith(_DB_MODULE_SUFFIXES):
+            name = _method_name(code)
+            if name not in _HELPER_NAMES:
+                return name
+        elif fallback is None and not any(part in filename for part in _SKIPPED_MODULE_PARTS):
+            module = frame.f_globals.get("__name__", "?")
+            fallback = f"{module}.{_method_name(code)}"
+        frame = frame.f_back
+    return query_label.get() or fallback or "unknown"
+
+
+def _status_rows(status: object) -> int:
+    if isinstance(status, str):
+        tail = status.rsplit(" ", 1)[-1]
+        if tail.isdigit():
+            return int(tail)
+    return 0
+
+
+class InstrumentedConnection(asyncpg.Connection):
+    """Connexion asyncpg qui rapporte chaque requête à :class:`QueryMetrics`.
+
+    Les méthodes du pool (``pool.fetch``…) délèguent à la connexion : toutes
+    les requêtes de ``Database`` passent donc par ici, qu'elles utilisent les
+    aides ``_fetch*`` ou le pool directement.
+    """
+
+    query_metrics: Optional[QueryMetrics] = None
+
+    async def _instrumented(
+        self,
+        call: Awaitable[Any],
+        query: str,
+        args: Sequence[Any],
+        count_rows: Callable[[Any], int],
+    ) -> Any:
+        metrics = self.query_metrics
+        trace = current_trace.get()
+        if (metrics is None and trace is None) or _uninstrumented.get():
+            return await call
+        label = (query_label.get() or caller_label()) if metrics is not None else ""
+        start = time.monotonic()
+        try:
+            result = await call
+        except Exception:
+            elapsed = time.monotonic() - start
+            if metrics is not None:
+                metrics.observe(label, query, args, elapsed, failed=True)
+            if trace is not None:
+                trace.record_statement(elapsed, 0)
+            raise
+        elapsed = time.monotonic() - start
+        rows = count_rows(result)
+        if metrics is not None:
+            metrics.observe(label, query, args, elapsed, rows=rows)
+        if trace is not None:
+            trace.record_statement(elapsed, rows)
+        return result
+
+    async def reset(self, *, timeout=None):  # type: ignore[override]
+        # ``Pool.release`` appelle ``reset()`` (RESET ALL / ROLLBACK) à chaque
+        # libération ; le compter fausserait les statistiques et les traces.
+        token = _uninstrumented.set(True)
+        try:
+            await super().reset(timeout=timeout)
+        finally:
+            _uninstrumented.reset(token)
+
+    async def fetch(self, query, *args, timeout=None, record_class=None):  # type: ignore[override]
+        return await self._instrumented(
+            super().fetch(query, *args, timeout=timeout, record_class=record_class),
+            query,
+            args,
+            len,
+        )
+
+    async def fetchrow(self, query, *args, timeout=None, record_class=None):  # type: ignore[override]
+        return await self._instrumented(
+            super().fetchrow(query, *args, timeout=timeout, record_class=record_class),
+            query,
+            args,
+            lambda row: 0 if row is None else 1,
+        )
+
+    async def fetchval(self, query, *args, column=0, timeout=None):  # type: ignore[override]
+        return await self._instrumented(
+            super().fetchval(query, *args, column=column, timeout=timeout),
+            query,
+            args,
+            lambda value: 0 if value is None else 1,
+        )
+
+    async def execute(self, query, *args, timeout=None):  # type: ignore[override]
+        return await self._instrumented(
+            super().execute(query, *args, timeout=timeout), query, args, _status_rows
+        )
+
+    async def executemany(self, command, args, *, timeout=None):  # type: ignore[override]
+        rows = list(args)
+        return await self._instrumented(
+            super().executemany(command, rows, timeout=timeout),
+            command,
+            (),
+            lambda _result: len(rows),
+        )
+
+    async def copy_records_to_table(self, table_name, **kwargs):  # type: ignore[override]
+        return await self._instrumented(
+            super().copy_records_to_table(table_name, **kwargs),
+            f"COPY {table_name}",
+            (),
+            _status_rows,
+        )
+
+
+@dataclass
+class PoolWaitStats:
+    """Attente cumulée pour obtenir une connexion d'un pool."""
+
+    window: int
+    acquires: int = 0
+    timeouts: int = 0
+    waiting: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    latencies: Deque[float] = field(default_factory=deque)
+
+    def __post_init__(self) -> None:
+        self.latencies = deque(maxlen=max(1, self.window))
+
+    def observe(self, elapsed: float) -> None:
+        self.acquires += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        self.latencies.append(elapsed)
+
+    def p95(self) -> float:
+        return _percentile(sorted(self.latencies), 0.95)
+
+
+class _TimedAcquire:
+    """Résultat de :meth:`InstrumentedPool.acquire`, à attendre ou en ``async with``."""
+
+    __slots__ = ("_pool", "_timeout", "_connection")
+
+    def __init__(self, pool: "InstrumentedPool", timeout: Optional[float]) -> None:
+        self._pool = pool
+        self._timeout = timeout
+        self._connection: Optional[asyncpg.Connection] = None
+
+    def __await__(self):  # type: ignore[no-untyped-def]
+        return self._pool._timed_acquire(self._timeout).__await__()
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self._connection = await self._pool._timed_acquire(self._timeout)
+        return self._connection
+
+    async def __aexit__(self, *_exc: object) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await self._pool.release(connection)
+
+
+class InstrumentedPool:
+    """Pool asyncpg (créé par ``asyncpg.create_pool``) qui mesure l'attente d'une connexion.
+
+    ``acquire()`` et les raccourcis ``fetch``… passent tous par
+    :meth:`acquire` : l'attente y est chronométrée, cumulée par pool
+    (``wait_stats``) et imputée à la commande tracée. Le reste de l'API
+    publique du pool (``close``, ``get_size``…) est délégué tel quel.
+    """
+
+    def __init__(
+        self, pool: asyncpg.Pool, *, lane: str = "interactive", wait_window: int = 512
+    ) -> None:
+        self._pool = pool
+        self.lane = lane
+        self.wait_stats = PoolWaitStats(wait_window)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool, name)
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _TimedAcquire:
+        return _TimedAcquire(self, timeout)
+
+    async def _timed_acquire(self, timeout: Optional[float]) -> asyncpg.Connection:
+        stats = self.wait_stats
+        stats.waiting += 1
+        start = time.monotonic()
+        try:
+            return await self._pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            stats.waiting -= 1
+            stats.observe(elapsed)
+            trace = current_trace.get()
+            if trace is not None:
+                trace.acquire_seconds += elapsed
+
+    async def release(self, connection: asyncpg.Connection, *, timeout=None) -> None:
+        await self._pool.release(connection, timeout=timeout)
+
+    async def fetch(self, query, *args, timeout=None, record_class=None):
+        async with self.acquire() as connection:
+            return await connection.fetch(query, *args, timeout=timeout, record_class=record_class)
+
+    async def fetchrow(self, query, *args, timeout=None, record_class=None):
+        async with self.acquire() as connection:
+            return await connection.fetchrow(
+                query, *args, timeout=timeout, record_class=record_class
+            )
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        async with self.acquire() as connection:
+            return await connection.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def execute(self, query, *args, timeout=None):
+        async with self.acquire() as connection:
+            return await connection.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command, args, *, timeout=None):
+        async with self.acquire() as connection:
+            return await connection.executemany(command, args, timeout=timeout)
@@ -0,0 +1,108 @@
+"""Bus d'invalidation des caches alimenté par les mutations de ``Database``."""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from utils.cache import LruTTLCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Familles de données qu'une mutation peut rendre obsolètes.
+BALANCE = "balance"
+GEMS = "gems"
+PETS = "pets"
+POTIONS = "potions"
+ENCHANTMENTS = "enchantments"
+TICKETS = "tickets"
+GRADE = "grade"
+DAILY = "daily"
+MARKET = "market"
+# Index des pets découverts : ne change qu'à l'obtention d'une nouvelle espèce.
+PET_INDEX = "pet_index"
+
+# Objets échangeables (annonces, enchères, renaissance).
+INVENTORY = (PETS, POTIONS, ENCHANTMENTS, TICKETS)
+
+# ``None`` à la place d'une liste de joueurs : la mutation concerne tout le monde
+# (ex. nouvelle cote du marché).
+UserIds = Optional[FrozenSet[int]]
+Listener = Callable[[UserIds, FrozenSet[str]], None]
+
+
+class InvalidationBus:
+    """Diffuse synchronement ``(joueurs, familles)`` aux abonnés concernés."""
+
+    def __init__(self) -> None:
+        self._subscriptions: List[Tuple[FrozenSet[str], Listener]] = []
+        self.published = 0
+
+    def subscribe(self, listener: Listener, kinds: Iterable[str]) -> Callable[[], None]:
+        """Abonne ``listener`` ; retourne la fonction de désabonnement."""
+
+        subscription = (frozenset(kinds), listener)
+        self._subscriptions.append(subscription)
+
+        def unsubscribe() -> None:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+        return unsubscribe
+
+    def subscribe_cache(
+        self, cache: "TTLCache[object] | LruTTLCache[object]", kinds: Iterable[str]
+    ) -> Callable[[], None]:
+        """Abonne un cache indexé par ``user_id``."""
+
+        def listener(user_ids: UserIds, _kinds: FrozenSet[str]) -> None:
+            if user_ids is None:
+                cache.clear()
+                return
+            for user_id in user_ids:
+                cache.invalidate(user_id)
+
+        return self.subscribe(listener, kinds)
+
+    def publish(self, user_ids: Iterable[int] | None, kinds: Iterable[str]) -> None:
+        targets: UserIds = None if user_ids is None else frozenset(int(uid) for uid in user_ids)
+        if targets is not None and not targets:
+            return
+        kind_set = frozenset(kinds)
+        self.published += 1
+        for subscribed, listener in list(self._subscriptions):
+            matched = subscribed & kind_set
+            if not matched:
+                continue
+            try:
+                listener(targets, matched)
+            except Exception:
+                logger.exception("Abonné d'invalidation en échec")
+
+
+class InvalidationBatch:
+    """Invalidations accumulées pendant une transaction, publiées après COMMIT."""
+
+    def __init__(self) -> None:
+        self._by_user: Dict[int, Set[str]] = defaultdict(set)
+        self._global: Set[str] = set()
+
+    def __bool__(self) -> bool:
+        return bool(self._by_user or self._global)
+
+    def add(self, user_ids: Iterable[int] | None, kinds: Iterable[str]) -> None:
+        if user_ids is None:
+            self._global.update(kinds)
+            return
+        kind_list = tuple(kinds)
+        for user_id in user_ids:
+            self._by_user[int(user_id)].update(kind_list)
+
+    def publish_to(self, bus: InvalidationBus) -> None:
+        if self._global:
+            bus.publish(None, self._global)
+        grouped: Dict[FrozenSet[str], Set[int]] = defaultdict(set)
+        for user_id, kinds in self._by_user.items():
+            grouped[frozenset(kinds)].add(user_id)
+        for kinds, user_ids in grouped.items():
+            bus.publish(user_ids, kinds)
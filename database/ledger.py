@@ -0,0 +1,155 @@
+"""Écriture différée et groupée du journal des transactions."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerEntry(NamedTuple):
+    """Ligne de la table ``transactions``, dans l'ordre des colonnes copiées."""
+
+    user_id: int
+    transaction_type: str
+    currency: str
+    amount: int
+    balance_before: int
+    balance_after: int
+    description: Optional[str]
+    related_user_id: Optional[int]
+    created_at: datetime
+
+
+LEDGER_COLUMNS: tuple[str, ...] = LedgerEntry._fields
+
+LedgerWriter = Callable[[Sequence[LedgerEntry]], Awaitable[None]]
+
+
+class TransactionLedger:
+    """File bornée alimentée par ``record_transaction`` et vidée par lots.
+
+    Quand la file est pleine, :meth:`put` attend au plus ``put_timeout``
+    secondes qu'un lot soit écrit, puis abandonne les lignes restantes (comptées
+    dans :attr:`dropped`). Les appelants ont déjà validé leur transaction : une
+    panne prolongée de l'écriture ne doit pas bloquer toutes les commandes.
+
+    Un lot en échec est retenté tel quel ; après ``max_attempts`` échecs, ses
+    lignes sont écrites une à une et celles qui échouent encore sont
+    journalisées puis abandonnées (comptées dans :attr:`rejected`), pour
+    qu'une seule ligne invalide ne bloque pas tout le journal.
+    """
+
+    def __init__(
+        self,
+        writer: LedgerWriter,
+        *,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        put_timeout: float,
+        max_attempts: int = 5,
+    ) -> None:
+        self._writer = writer
+        self._queue: asyncio.Queue[LedgerEntry] = asyncio.Queue(maxsize=max(1, int(max_queue)))
+        self._batch_size = max(1, int(batch_size))
+        self._flush_interval = max(0.1, float(flush_interval))
+        self._put_timeout = max(0.0, float(put_timeout))
+        self._task: asyncio.Task[None] | None = None
+        self._max_attempts = max(1, int(max_attempts))
+        self._retry: list[LedgerEntry] = []
+        self._attempts = 0
+        self.written = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retry)
+
+    async def put(self, entries: Sequence[LedgerEntry]) -> None:
+        for index, entry in enumerate(entries):
+            try:
+                self._queue.put_nowait(entry)
+                continue
+            except asyncio.QueueFull:
+                pass
+            try:
+                await asyncio.wait_for(self._queue.put(entry), timeout=self._put_timeout)
+            except asyncio.TimeoutError:
+                lost = len(entries) - index
+                self.dropped += lost
+                logger.error(
+                    "Journal des transactions saturé : %d lignes abandonnées (%d au total)",
+                    lost,
+                    self.dropped,
+                )
+                return
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        try:
+            while self.pending:
+                await self._flush_once()
+        except Exception:
+            logger.exception(
+                "Journal des transactions : %d lignes perdues à l'arrêt", self.pending
+            )
+
+    async def _run(self) -> None:
+        while True:
+            if not self._retry:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    first = await asyncio.wait_for(self._queue.get(), timeout=self._flush_interval)
+                    self._retry.append(first)
+            try:
+                await self._flush_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed_batches += 1
+                logger.exception("Écriture du journal des transactions échouée, nouvel essai")
+                await asyncio.sleep(self._flush_interval)
+
+    async def _flush_once(self) -> None:
+        batch = self._retry
+        while len(batch) < self._batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if not batch:
+            return
+        try:
+            await self._writer(batch)
+        except Exception:
+            self._attempts += 1
+            if self._attempts < self._max_attempts:
+                raise
+            logger.exception(
+                "Lot du journal en échec %d fois : écriture ligne par ligne", self._attempts
+            )
+            await self._write_one_by_one(batch)
+        else:
+            self.written += len(batch)
+        self._retry = []
+        self._attempts = 0
+
+    async def _write_one_by_one(self, batch: Sequence[LedgerEntry]) -> None:
+        for entry in batch:
+            try:
+                await self._writer((entry,))
+            except Exception:
+                self.rejected += 1
+                logger.exception("Ligne du journal abandonnée : %r", entry)
+            else:
+                self.written += 1
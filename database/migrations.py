@@ -0,0 +1,68 @@
+"""Registre ordonné des migrations de schéma."""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, NamedTuple, Sequence
+
+import asyncpg
+
+MigrationStep = Callable[[asyncpg.Connection], Awaitable[None]]
+
+MIGRATIONS_DIRECTORY = Path(__file__).resolve().parent.parent / "migrations"
+
+_SQL_FILENAME = re.compile(r"^(?P<version>\d{4})_(?P<name>[a-z0-9_]+)\.sql$")
+
+
+class Migration(NamedTuple):
+    """Étape de schéma appliquée une seule fois puis tracée dans ``schema_version``."""
+
+    version: int
+    name: str
+    apply: MigrationStep
+
+
+def _sql_step(sql: str) -> MigrationStep:
+    async def apply(connection: asyncpg.Connection) -> None:
+        await connection.execute(sql)
+
+    return apply
+
+
+def load_sql_migrations(directory: Path = MIGRATIONS_DIRECTORY) -> list[Migration]:
+    """Charge les fichiers ``NNNN_nom.sql`` du dossier ``migrations/``."""
+
+    if not directory.is_dir():
+        return []
+    migrations: list[Migration] = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _SQL_FILENAME.match(path.name)
+        if match is None:
+            raise ValueError(f"Nom de migration invalide : {path.name} (attendu NNNN_nom.sql)")
+        sql = path.read_text(encoding="utf-8")
+        migrations.append(Migration(int(match["version"]), match["name"], _sql_step(sql)))
+    return migrations
+
+
+def build_registry(*groups: Iterable[Migration]) -> tuple[Migration, ...]:
+    """Fusionne les migrations Python et SQL en vérifiant l'unicité des versions."""
+
+    registry: dict[int, Migration] = {}
+    for group in groups:
+        for migration in group:
+            if migration.version <= 0:
+                raise ValueError(f"Version de migration invalide : {migration.version}")
+            existing = registry.get(migration.version)
+            if existing is not None:
+                raise ValueError(
+                    f"Version de migration dupliquée {migration.version} : "
+                    f"{existing.name} / {migration.name}"
+                )
+            registry[migration.version] = migration
+    return tuple(registry[version] for version in sorted(registry))
+
+
+def pending_migrations(
+    registry: Sequence[Migration], current_version: int
+) -> list[Migration]:
+    return [migration for migration in registry if migration.version > current_version]
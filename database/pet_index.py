@@ -0,0 +1,87 @@
+"""Index des pets découverts par joueur, stocké sous forme de bitsets."""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Any, FrozenSet, Iterable, Mapping, Optional
+
+# Colonnes de ``user_pet_index`` : ``owned`` couvre toutes les formes, les
+# autres ne retiennent que la variante correspondante.
+PET_INDEX_COLUMNS: tuple[str, ...] = ("owned", "gold", "rainbow", "galaxy", "shiny")
+
+
+def encode_bits(bits: int) -> bytes:
+    """Sérialise un bitset (bit ``n`` = ``pet_id`` ``n``) en octets petit-boutistes."""
+
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def decode_bits(raw: Optional[bytes]) -> int:
+    return int.from_bytes(raw, "little") if raw else 0
+
+
+@dataclass(frozen=True)
+class PetIndex:
+    """Espèces déjà obtenues par un joueur, une forme par bitset.
+
+    L'index ne fait que croître : revendre ou échanger son dernier exemplaire
+    ne retire pas une espèce découverte. Quelques dizaines d'octets suffisent
+    là où il fallait relire toute la collection du joueur.
+    """
+
+    owned: int = 0
+    gold: int = 0
+    rainbow: int = 0
+    galaxy: int = 0
+    shiny: int = 0
+
+    @classmethod
+    def from_pets(cls, pets: Iterable[Mapping[str, Any]]) -> "PetIndex":
+        masks = dict.fromkeys(PET_INDEX_COLUMNS, 0)
+        for pet in pets:
+            pet_id = int(pet.get("pet_id") or 0)
+            if pet_id <= 0:
+                continue
+            bit = 1 << pet_id
+            masks["owned"] |= bit
+            for column in PET_INDEX_COLUMNS[1:]:
+                if pet.get(f"is_{column}"):
+                    masks[column] |= bit
+        return cls(**masks)
+
+    @classmethod
+    def from_row(cls, row: Optional[Mapping[str, Any]]) -> "PetIndex":
+        if row is None:
+            return cls()
+        return cls(**{column: decode_bits(row[column]) for column in PET_INDEX_COLUMNS})
+
+    def __or__(self, other: "PetIndex") -> "PetIndex":
+        return PetIndex(
+            **{
+                field.name: getattr(self, field.name) | getattr(other, field.name)
+                for field in fields(self)
+            }
+        )
+
+    def covers(self, other: "PetIndex") -> bool:
+        """Vrai si ``other`` n'apporte aucune espèce ni variante nouvelle."""
+
+        return (self | other) == self
+
+    def encoded(self) -> tuple[bytes, ...]:
+        return tuple(encode_bits(getattr(self, column)) for column in PET_INDEX_COLUMNS)
+
+    @property
+    def unique_count(self) -> int:
+        return self.owned.bit_count()
+
+    def pet_ids(self, variant: str = "owned") -> FrozenSet[int]:
+        bits = getattr(self, variant)
+        found: set[int] = set()
+        while bits:
+            lowest = bits & -bits
+            found.add(lowest.bit_length() - 1)
+            bits ^= lowest
+        return frozenset(found)
+
+    def has(self, pet_id: int, variant: str = "owned") -> bool:
+        return pet_id > 0 and bool(getattr(self, variant) >> pet_id & 1)
@@ -0,0 +1,110 @@
+"""Suivi de santé et de retard du réplica en lecture."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Retard de rejeu en secondes ; 0 quand le réplica a rejoué tout le WAL reçu
+# (sinon ``now() - pg_last_xact_replay_timestamp()`` grandit sur un primaire
+# inactif) ou quand le serveur n'est pas en recovery.
+REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# Erreurs qui désignent le réplica lui-même plutôt que la requête.
+REPLICA_FAILURES: tuple[type[BaseException], ...] = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+)
+
+LagProbe = Callable[[], Awaitable[float]]
+
+
+class ReplicaMonitor:
+    """Sonde périodiquement le réplica et décide s'il peut servir les lectures.
+
+    Le réplica est écarté dès qu'une sonde échoue, qu'une lecture routée
+    lève une erreur de connexion (:meth:`mark_failed`) ou que son retard
+    dépasse ``max_lag_seconds`` ; la sonde suivante réussie le réintègre.
+    """
+
+    def __init__(
+        self,
+        probe: LagProbe,
+        *,
+        max_lag_seconds: float,
+        interval: float,
+    ) -> None:
+        self._probe = probe
+        self._max_lag = max(0.0, float(max_lag_seconds))
+        self._interval = max(1.0, float(interval))
+        self._task: asyncio.Task[None] | None = None
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.failures = 0
+        self.fallbacks = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self.healthy = False
+
+    def mark_failed(self, exc: BaseException) -> None:
+        self.fallbacks += 1
+        if self.healthy:
+            logger.warning("Réplica écarté après une erreur de lecture : %s", exc)
+        self.healthy = False
+
+    async def check(self) -> bool:
+        self.checked_at = time.time()
+        try:
+            lag = float(await asyncio.wait_for(self._probe(), timeout=self._interval))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.failures += 1
+            self.lag_seconds = None
+            if self.healthy:
+                logger.warning("Réplica injoignable, lectures renvoyées au primaire : %s", exc)
+            self.healthy = False
+            return False
+
+        self.lag_seconds = lag
+        healthy = lag <= self._max_lag
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Réplica disponible (retard %.1fs)", lag)
+            else:
+                logger.warning(
+                    "Réplica en retard de %.1fs (> %.1fs), lectures renvoyées au primaire",
+                    lag,
+                    self._max_lag,
+                )
+        self.healthy = healthy
+        return healthy
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self._interval)
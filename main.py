@@ -17,8 +17,34 @@ import discord
 
 from discord.ext import commands
 
-from config import DATABASE_URL, LOG_LEVEL, OWNER_ID, PREFIX, TOKEN, PET_DEFINITIONS
+from config import (
+    COMMAND_ROUNDTRIP_BUDGET,
+    COMMAND_ROUNDTRIP_BUDGETS,
+    DATABASE_READ_URL,
+    DATABASE_URL,
+    DB_BACKGROUND_POOL_MAX_SIZE,
+    DB_BACKGROUND_POOL_MIN_SIZE,
+    DB_BACKGROUND_STATEMENT_TIMEOUT_MS,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_REPLICA_CHECK_INTERVAL_SECONDS,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_POOL_MAX_SIZE,
+    DB_STATEMENT_TIMEOUT_MS,
+    LOG_LEVEL,
+    MESSAGE_BUFFER_MAX_PENDING,
+    MESSAGE_FLUSH_INTERVAL_SECONDS,
+    METRICS_HOST,
+    METRICS_PORT,
+    OWNER_ID,
+    PREFIX,
+    TOKEN,
+    PET_DEFINITIONS,
+)
 from utils.localization import DEFAULT_LANGUAGE
+from utils.message_ingest import MessageIngestBuffer
+from utils.metrics_server import MetricsServer
+from utils.telemetry import CommandMetrics, CommandTrace, LoopLagMonitor, current_trace
 
 from database.db import Database, DatabaseError
 
@@ -47,7 +73,21 @@ class EcoBot(commands.Bot):
     ) -> None:
         super().__init__(command_prefix=commands.when_mentioned_or(prefix), intents=intents, help_command=None)
         self.database = database
+        self.message_ingest = MessageIngestBuffer(
+            database,
+            flush_interval=MESSAGE_FLUSH_INTERVAL_SECONDS,
+            max_pending=MESSAGE_BUFFER_MAX_PENDING,
+        )
+        self.command_metrics = CommandMetrics(
+            roundtrip_budget=COMMAND_ROUNDTRIP_BUDGET,
+            budgets=COMMAND_ROUNDTRIP_BUDGETS,
+        )
+        self.loop_lag = LoopLagMonitor()
+        self.metrics_server = MetricsServer(self, host=METRICS_HOST, port=METRICS_PORT)
+        self.before_invoke(self._start_command_trace)
+        self.after_invoke(self._finish_command_trace)
         self.initial_extensions: tuple[str, ...] = (
+            "message_router",
             "economy",
             "grades",
             "leaderboard",
@@ -112,6 +152,10 @@ class EcoBot(commands.Bot):
 
     async def setup_hook(self) -> None:  # pragma: no cover - cycle de vie discord.py
         await super().setup_hook()
+        self.message_ingest.start()
+        self.loop_lag.start()
+        if METRICS_PORT > 0:
+            await self.metrics_server.start()
 
         for extension in self.initial_extensions:
             try:
@@ -132,6 +176,17 @@ class EcoBot(commands.Bot):
             except Exception:
                 logger.exception("Impossible de décharger l'extension %s", extension)
 
+        try:
+            await self.message_ingest.stop()
+        except Exception:
+            logger.exception("Impossible de vider le tampon des messages avant l'arrêt")
+
+        await self.loop_lag.stop()
+        try:
+            await self.metrics_server.stop()
+        except Exception:
+            logger.exception("Impossible d'arrêter le serveur de métriques")
+
         try:
             await self.database.close()
         except Exception:
@@ -168,6 +223,22 @@ class EcoBot(commands.Bot):
             )
             return DEFAULT_LANGUAGE
 
+    async def _start_command_trace(self, ctx: commands.Context) -> None:
+        # Les hooks et le callback partagent la tâche de la commande : la trace
+        # posée ici est visible de toutes les requêtes SQL qu'elle émet.
+        if ctx.command is None:
+            return
+        trace = CommandTrace(ctx.command.qualified_name)
+        ctx.telemetry_trace = trace  # type: ignore[attr-defined]
+        ctx.telemetry_token = current_trace.set(trace)  # type: ignore[attr-defined]
+
+    async def _finish_command_trace(self, ctx: commands.Context) -> None:
+        trace = getattr(ctx, "telemetry_trace", None)
+        if trace is None:
+            return
+        current_trace.reset(ctx.telemetry_token)  # type: ignore[attr-defined]
+        self.command_metrics.finish(trace, failed=ctx.command_failed)
+
     async def on_command_completion(self, ctx: commands.Context) -> None:
         await self._maybe_notify_private_usage(ctx)
         await self._maybe_send_first_command_help(ctx)
@@ -316,7 +387,19 @@ async def start_bot() -> None:
     """Initialise la base de données et démarre le bot."""
 
     configure_logging()
-    database = Database(DATABASE_URL)
+    database = Database(
+        DATABASE_URL,
+        min_size=min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+        max_size=DB_POOL_MAX_SIZE,
+        background_min_size=DB_BACKGROUND_POOL_MIN_SIZE,
+        background_max_size=DB_BACKGROUND_POOL_MAX_SIZE,
+        statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+        background_statement_timeout_ms=DB_BACKGROUND_STATEMENT_TIMEOUT_MS,
+        read_dsn=DATABASE_READ_URL,
+        replica_max_size=DB_REPLICA_POOL_MAX_SIZE,
+        replica_max_lag_seconds=DB_REPLICA_MAX_LAG_SECONDS,
+        replica_check_interval=DB_REPLICA_CHECK_INTERVAL_SECONDS,
+    )
     await database.connect()
 
     try:
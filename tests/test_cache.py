@@ -0,0 +1,91 @@
+from utils.cache import LruTTLCache, TTLCache, cache_stats
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_expired_entries_are_purged_without_being_read() -> None:
+    clock = _Clock()
+    cache = TTLCache[int](10, 100, name="test.expiry", clock=clock)
+
+    for key in range(20):
+        cache.set(key, key)
+    clock.now += 11
+    cache.set("fresh", 1)
+
+    assert len(cache) == 1
+    assert cache.stats().expirations == 20
+
+
+def test_lru_bound_and_counters() -> None:
+    cache = LruTTLCache[int](60, 2, name="test.lru")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (2, 1, 1, 2)
+    assert "test.lru" in {entry.name for entry in cache_stats()}
+
+
+def test_ttl_cache_is_bounded() -> None:
+    cache = TTLCache[int](60, 3, name="test.bounded")
+    for key in range(10):
+        cache.set(key, key)
+
+    assert len(cache) == 3
+    assert cache.get(0) is None
+    assert cache.get(9) == 9
+
+
+def test_stale_entries_are_served_during_grace() -> None:
+    clock = _Clock()
+    cache = LruTTLCache[int](10, 10, name="test.stale", stale_seconds=5, clock=clock)
+    cache.set("lb", 1)
+
+    clock.now += 12
+    assert cache.get("lb") is None
+    assert cache.get_stale("lb") == 1
+
+    clock.now += 5
+    assert cache.get_stale("lb") is None
+
+
+def test_set_drops_values_loaded_before_an_invalidation() -> None:
+    cache = TTLCache[str](600, 10, name="test.generation")
+
+    generation = cache.generation()
+    cache.invalidate(1)
+    cache.set(1, "avant la mutation", generation=generation)
+    cache.set(2, "autre joueur", generation=generation)
+    assert cache.get(1) is None
+    assert cache.get(2) == "autre joueur"
+
+    generation = cache.generation()
+    cache.set(1, "après la mutation", generation=generation)
+    assert cache.get(1) == "après la mutation"
+
+    generation = cache.generation()
+    cache.clear()
+    cache.set(2, "avant le vidage", generation=generation)
+    assert cache.get(2) is None
+    assert cache.stats().rejected_sets == 2
+
+
+def test_forgotten_invalidations_stay_conservative() -> None:
+    cache = TTLCache[str](600, 2, name="test.generation_bound")
+
+    generation = cache.generation()
+    for key in range(5):
+        cache.invalidate(key)
+    # L'invalidation de la clé 0 n'est plus mémorisée : la valeur est refusée.
+    cache.set(0, "ancien", generation=generation)
+    assert cache.get(0) is None
@@ -3,6 +3,7 @@ import asyncio
 import os
 import sys
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 os.environ.setdefault("DISCORD_TOKEN", "test-token")
@@ -61,3 +62,80 @@ def test_claim_income_returns_consistent_tuple_length() -> None:
         {},
         {"count": 0, "bonus": 0, "multiplier": 1.0},
     )
+
+
+class _RecordingConnection:
+    def __init__(self, rows: list[dict[str, object]]) -> None:
+        self.rows = rows
+        self.fetch_calls: list[tuple[str, tuple[object, ...]]] = []
+        self.execute_calls: list[tuple[str, tuple[object, ...]]] = []
+
+    async def fetch(self, query: str, *args: object) -> list[dict[str, object]]:
+        self.fetch_calls.append((query, args))
+        return self.rows
+
+    async def execute(self, query: str, *args: object) -> None:
+        self.execute_calls.append((query, args))
+
+
+class _RecordingDatabase(Database):
+    def __init__(self, connection: _RecordingConnection) -> None:
+        super().__init__("postgres://dummy")
+        self._connection = connection
+
+    @asynccontextmanager
+    async def transaction(self):  # pragma: no cover - stub
+        # Comme Database.transaction() : le journal attend le COMMIT.
+        self._ledger_pending.setdefault(id(self._connection), [])
+        yield self._connection
+
+
+def _claim_row(pet_id: int, *, is_huge: bool) -> dict[str, object]:
+    return {
+        "id": pet_id,
+        "nickname": None,
+        "is_active": True,
+        "is_huge": is_huge,
+        "is_gold": False,
+        "is_rainbow": False,
+        "is_galaxy": False,
+        "is_shiny": False,
+        "huge_level": 1,
+        "huge_xp": 0,
+        "acquired_at": None,
+        "pet_id": pet_id,
+        "name": "Huge Test" if is_huge else "Test",
+        "rarity": "Commun",
+        "image_url": "",
+        "base_income_per_hour": 10_000,
+        "pet_last_claim": datetime.now(timezone.utc) - timedelta(hours=2),
+        "balance": 100,
+        "gems": 5,
+        "rebirth_count": 0,
+        "pet_booster_multiplier": 1,
+        "pet_booster_expires_at": None,
+        "pet_booster_activated_at": None,
+        "active_potion_slug": None,
+        "active_potion_expires_at": None,
+        "member_clan_id": None,
+        "best_non_huge_income": 10_000,
+        "prissbucks_power": None,
+    }
+
+
+def test_claim_income_uses_constant_round_trips() -> None:
+    connection = _RecordingConnection(
+        [_claim_row(idx, is_huge=idx % 2 == 0) for idx in range(1, 9)]
+    )
+    database = _RecordingDatabase(connection)
+
+    result = asyncio.run(database.claim_active_pet_income(42))
+
+    assert result[0] > 0
+    assert len(connection.fetch_calls) == 1
+    assert len(connection.execute_calls) == 1
+    query, args = connection.execute_calls[0]
+    assert "unnest" in query
+    assert args[2] == 100 + result[0]
+    # Tous les Huge progressent via une seule mise à jour groupée.
+    assert sorted(args[6]) == sorted(result[5])
@@ -1,10 +1,12 @@
 import asyncio
+import time
+from array import array
 from contextlib import asynccontextmanager
 
 import pytest
 
 from config import GALAXY_PET_COMBINE_REQUIRED, TITANIC_GRIFF_NAME
-from database.db import Database, DatabaseError
+from database.db import Database, DatabaseError, _MarketSnapshot, _PriceMatrix
 
 
 class _FakeConnection:
@@ -17,6 +19,9 @@ class _FakeConnection:
 
     async def fetch(self, query: str, *args: object) -> list[dict[str, object]]:
         self.fetch_calls.append((query, args))
+        if "FROM user_pets AS up" in query and "ANY($1::BIGINT[])" in query:
+            # Relecture des pets pour le recalcul du RAP : inventaire vide.
+            return []
         return self.fetch_results.pop(0)
 
     async def fetchrow(self, query: str, *args: object) -> dict[str, object] | None:
@@ -33,12 +38,17 @@ class _FakeDatabase(Database):
     def __init__(self) -> None:
         super().__init__("postgres://fake")
         self._connection = _FakeConnection()
+        prices: dict = {}
+        self._market_snapshot = _MarketSnapshot(version=0, values=prices, loaded_at=time.monotonic())
+        self._price_matrix = _PriceMatrix(prices, array("q"))
 
     async def ensure_user(self, user_id: int) -> None:  # pragma: no cover - stub
         return None
 
     @asynccontextmanager
     async def transaction(self):  # pragma: no cover - deterministic stub
+        # Comme Database.transaction() : le journal attend le COMMIT.
+        self._ledger_pending.setdefault(id(self._connection), [])
         yield self._connection
 
 
@@ -87,6 +97,12 @@ def test_forge_result_is_marked_huge() -> None:
     # La deuxième requête INSERT INTO user_pets doit marquer le pet comme Huge.
     insert_call = connection.fetchrow_calls[1]
     assert insert_call[1][2] is True
+    # Le RAP stocké du joueur est recalculé dans la même transaction.
+    lock_call, rap_call = connection.execute_calls[-2:]
+    assert "ON CONFLICT (user_id) DO UPDATE" in lock_call[0]
+    assert lock_call[1] == ([1],)
+    assert rap_call[0].strip().startswith("UPDATE user_rap_totals")
+    assert rap_call[1] == ([1], [0])
 
 
 def test_forge_prevented_without_permission() -> None:
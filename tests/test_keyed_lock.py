@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from utils.keyed_lock import KeyedLock, keyed_lock_stats
+
+
+def test_different_keys_do_not_block_each_other() -> None:
+    locks = KeyedLock("test.parallel")
+    inside: list[int] = []
+
+    async def worker(key: int, gate: asyncio.Event) -> None:
+        async with locks(key):
+            inside.append(key)
+            await gate.wait()
+
+    async def scenario() -> None:
+        gate = asyncio.Event()
+        tasks = [asyncio.create_task(worker(key, gate)) for key in (1, 2)]
+        await asyncio.sleep(0)
+        assert sorted(inside) == [1, 2]
+        assert locks.stats().held == 2
+        gate.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert len(locks) == 0
+
+
+def test_cancelled_waiter_releases_its_reference() -> None:
+    locks = KeyedLock("test.cancel")
+
+    async def scenario() -> None:
+        async with locks("user"):
+            waiter = asyncio.create_task(locks("user").__aenter__())
+            await asyncio.sleep(0)
+            assert locks.stats().waiting == 1
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        assert len(locks) == 0
+
+    asyncio.run(scenario())
+    assert locks.stats().waiting == 0
+
+
+def test_striped_locks_keep_constant_memory() -> None:
+    locks = KeyedLock("test.striped", stripes=4)
+
+    async def scenario() -> None:
+        for user_id in range(100):
+            async with locks(user_id):
+                pass
+
+    asyncio.run(scenario())
+    assert len(locks._entries) == 4
+    assert len(locks) == 0
+    assert "test.striped" in {stats.name for stats in keyed_lock_stats()}
@@ -0,0 +1,110 @@
+import asyncio
+
+from database.db import _PET_ZONE_BY_NAME, Database, _VARIANT_FLAG_SLOTS, scale_pet_value
+
+
+def _legacy_row_value(row: dict[str, object], market_values) -> int:
+    """Valorisation ligne par ligne d'avant la matrice de prix."""
+
+    flags = {key: bool(row[key]) for key in ("is_gold", "is_rainbow", "is_galaxy", "is_shiny")}
+    value = Database._resolve_market_price(
+        int(row["pet_id"]), market_values=market_values, **flags
+    )
+    if value <= 0:
+        name = str(row["name"])
+        value = Database._fallback_market_value(
+            name=name,
+            rarity=str(row["rarity"]),
+            base_income_per_hour=int(row["base_income_per_hour"]),
+            is_huge=bool(row["is_huge"]),
+            zone_slug=_PET_ZONE_BY_NAME.get(name.lower(), "exclusif"),
+            **flags,
+        )
+    return max(0, scale_pet_value(value))
+
+
+class _FakePool:
+    def __init__(self, pets: list[dict[str, object]]) -> None:
+        self.pets = pets
+
+    async def fetch(self, query: str, *args: object) -> list[dict[str, object]]:
+        return self.pets
+
+
+class _MatrixDatabase(Database):
+    def __init__(self, pets, market_values) -> None:
+        super().__init__("postgres://dummy")
+        self._pool = _FakePool(pets)
+        self._market_values = market_values
+
+    async def get_pet_market_values(self):
+        return self._market_values
+
+
+def test_price_matrix_matches_legacy_row_valuation() -> None:
+    pets = [
+        {"pet_id": 1, "name": "Chat", "rarity": "Commun", "base_income_per_hour": 1_000},
+        {"pet_id": 3, "name": "Dragon", "rarity": "Mythique", "base_income_per_hour": 90_000},
+        # Pet du catalogue sans cote : repli calculé avec sa zone d'œuf.
+        {"pet_id": 4, "name": "Angelo", "rarity": "Commun", "base_income_per_hour": 35},
+    ]
+    market_values = {(1, "normal"): 40, (1, "gold+shiny"): 900, (3, "rainbow"): 12_000}
+    database = _MatrixDatabase(pets, market_values)
+
+    matrix = asyncio.run(database._get_price_matrix())
+
+    for pet in pets:
+        for flags in range(_VARIANT_FLAG_SLOTS):
+            row = {
+                **pet,
+                "is_gold": bool(flags & 1),
+                "is_rainbow": bool(flags & 2),
+                "is_galaxy": bool(flags & 4),
+                "is_shiny": bool(flags & 8),
+                "is_huge": bool(flags & 16),
+            }
+            expected = _legacy_row_value(row, market_values)
+            assert matrix.lookup(int(pet["pet_id"]), flags) == expected
+            assert database._price_pet_row(row, matrix) == expected
+
+    # Pet inconnu du catalogue : repli sur le calcul complet.
+    assert matrix.lookup(2, 0) is None
+
+
+class _RapConnection:
+    def __init__(self, rows: list[dict[str, object]]) -> None:
+        self.rows = rows
+        self.statements: list[tuple[str, tuple[object, ...]]] = []
+
+    async def execute(self, query: str, *args: object) -> None:
+        self.statements.append((query, args))
+
+    async def fetch(self, query: str, *args: object) -> list[dict[str, object]]:
+        self.statements.append((query, args))
+        user_ids = args[0] if isinstance(args[0], list) else [args[0]]
+        return [row for row in self.rows if row["user_id"] in user_ids]
+
+
+def test_refresh_rap_totals_locks_then_matches_get_user_pet_rap() -> None:
+    pets = [
+        {"pet_id": 1, "name": "Chat", "rarity": "Commun", "base_income_per_hour": 1_000},
+        {"pet_id": 3, "name": "Dragon", "rarity": "Mythique", "base_income_per_hour": 90_000},
+    ]
+    # Le Dragon n'a aucune cote : sa valeur vient du calcul de repli.
+    market_values = {(1, "normal"): 40}
+    database = _MatrixDatabase(pets, market_values)
+    owned = [
+        {**pets[0], "user_id": 7, "pet_id": 1, "is_shiny": False},
+        {**pets[1], "user_id": 7, "pet_id": 3, "is_gold": True, "is_shiny": True},
+    ]
+    connection = _RapConnection(owned)
+
+    asyncio.run(database.refresh_user_rap_totals([7, 7], connection=connection))
+    expected = asyncio.run(database.get_user_pet_rap(7, connection=connection))
+
+    lock, read, update = connection.statements[:3]
+    assert "ON CONFLICT (user_id) DO UPDATE" in lock[0] and lock[1] == ([7],)
+    assert "FROM user_pets" in read[0]
+    assert update[0].strip().startswith("UPDATE user_rap_totals")
+    assert update[1] == ([7], [expected])
+    assert expected > scale_pet_value(40)
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from cogs.message_router import MessageRouter
+
+
+def _message(author_id: int, channel_id: int, *, bot: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(
+        author=SimpleNamespace(id=author_id, bot=bot),
+        channel=SimpleNamespace(id=channel_id),
+    )
+
+
+def test_router_wakes_only_matching_waiters() -> None:
+    async def scenario() -> None:
+        router = MessageRouter(SimpleNamespace())
+        anywhere = asyncio.create_task(router.wait_for_user_message(1))
+        in_channel = asyncio.create_task(router.wait_for_user_message(1, channel_id=10))
+        other_user = asyncio.create_task(router.wait_for_user_message(2))
+        await asyncio.sleep(0)
+        assert len(router) == 3
+
+        assert router.dispatch(_message(1, 99, bot=True)) == 0
+        assert router.dispatch(_message(1, 20)) == 1
+        await asyncio.sleep(0)
+        assert anywhere.done() and not in_channel.done()
+
+        message = _message(1, 10)
+        assert router.dispatch(message) == 1
+        assert await in_channel is message
+        assert not other_user.done()
+
+        other_user.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await other_user
+        assert len(router) == 0
+
+    asyncio.run(scenario())
+
+
+def test_router_timeout_removes_waiter() -> None:
+    async def scenario() -> None:
+        router = MessageRouter(SimpleNamespace())
+        with pytest.raises(asyncio.TimeoutError):
+            await router.wait_for_user_message(1, timeout=0.01)
+        assert len(router) == 0
+        assert router._waiters == {}
+
+    asyncio.run(scenario())
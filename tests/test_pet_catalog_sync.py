@@ -0,0 +1,101 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from database.db import Database
+
+
+_CATALOG = [
+    {"name": "Chat", "rarity": "Commun", "image_url": "chat.png", "base_income_per_hour": 10, "drop_rate": 0.5},
+    {"name": "Dragon", "rarity": "Mythique", "image_url": "dragon.png", "base_income_per_hour": 900, "drop_rate": 0.01},
+]
+
+
+class _FakePool:
+    def __init__(self, digest: str | None) -> None:
+        self.digest = digest
+        self.queries: list[str] = []
+
+    async def fetchval(self, query: str, *args: object) -> object:
+        self.queries.append(query)
+        return self.digest
+
+    async def fetch(self, query: str, *args: object) -> list[dict[str, object]]:
+        self.queries.append(query)
+        return [{"name": "Chat", "pet_id": 1}, {"name": "Dragon", "pet_id": 2}]
+
+
+def test_catalog_digest_ignores_definition_order() -> None:
+    rows = Database._pet_catalog_rows(_CATALOG)
+    reordered = Database._pet_catalog_rows(list(reversed(_CATALOG)))
+    changed = Database._pet_catalog_rows([{**_CATALOG[0], "drop_rate": 0.4}, _CATALOG[1]])
+
+    assert Database._pet_catalog_digest(rows) == Database._pet_catalog_digest(reordered)
+    assert Database._pet_catalog_digest(rows) != Database._pet_catalog_digest(changed)
+
+
+def test_unchanged_catalog_skips_upsert() -> None:
+    database = Database("postgres://dummy")
+    digest = Database._pet_catalog_digest(Database._pet_catalog_rows(_CATALOG))
+    pool = _FakePool(digest)
+    database._pool = pool
+
+    pet_ids = asyncio.run(database.sync_pets(_CATALOG))
+
+    assert pet_ids == {"Chat": 1, "Dragon": 2}
+    assert len(pool.queries) == 2
+    assert not any("INSERT" in query for query in pool.queries)
+
+
+class _CatalogConnection:
+    def __init__(self, changed: list[dict[str, object]]) -> None:
+        self.changed = changed
+        self.executed: list[str] = []
+
+    async def fetch(self, query: str, *args: object) -> list[dict[str, object]]:
+        if "INSERT INTO pets" in query:
+            return self.changed
+        return [{"name": "Chat", "pet_id": 1}, {"name": "Dragon", "pet_id": 2}]
+
+    async def execute(self, query: str, *args: object) -> None:
+        self.executed.append(query)
+
+
+class _CatalogDatabase(Database):
+    def __init__(self, changed: list[dict[str, object]]) -> None:
+        super().__init__("postgres://dummy")
+        self._pool = _FakePool(None)
+        self.connection = _CatalogConnection(changed)
+        self.rebuilt: list[object] = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield self.connection
+
+    async def _rebuild_user_rap_totals(self, connection, market_values=None) -> None:
+        self.rebuilt.append(connection)
+
+
+def test_catalog_change_rebuilds_stored_rap() -> None:
+    database = _CatalogDatabase([{"pet_id": 2}])
+
+    pet_ids = asyncio.run(database.sync_pets(_CATALOG))
+
+    assert pet_ids == {"Chat": 1, "Dragon": 2}
+    assert database.rebuilt == [database.connection]
+
+
+def test_catalog_upsert_without_changes_keeps_stored_rap() -> None:
+    database = _CatalogDatabase([])
+
+    asyncio.run(database.sync_pets(_CATALOG))
+
+    assert database.rebuilt == []
+
+
+def test_partial_sync_leaves_the_catalog_fingerprint_alone() -> None:
+    database = _CatalogDatabase([{"pet_id": 2}])
+
+    asyncio.run(database.sync_pets(_CATALOG[1:], full_catalog=False))
+
+    assert database._pool.queries == []
+    assert not any("catalog_fingerprints" in query for query in database.connection.executed)
@@ -17,14 +17,18 @@ from discord.ext import commands
 
 from cogs import pets as pets_module
 from cogs.pets import _compute_egg_mastery_perks, _compute_pet_mastery_perks
+from database.invalidation import InvalidationBus
+from database.pet_index import PetIndex
 
 
 class DummyDatabase:
     def __init__(self) -> None:
         self.balance = 50_000
         self.last_added: dict[str, object] | None = None
+        self.bulk_calls: list[dict[str, object]] = []
+        self.invalidation_bus = InvalidationBus()
 
-    async def sync_pets(self, definitions):
+    async def sync_pets(self, definitions, *, full_catalog=True):
         return {definition.name: index for index, definition in enumerate(definitions, start=1)}
 
     async def ensure_user(self, user_id: int):  # pragma: no cover - interface contract
@@ -52,6 +56,28 @@ class DummyDatabase:
     async def record_pet_opening(self, user_id: int, pet_id: int):  # pragma: no cover - interface contract
         return None
 
+    async def hatch_egg(self, user_id: int, pet_id: int, *, is_huge: bool = False, is_gold: bool = False, is_rainbow: bool = False, is_galaxy: bool = False, is_shiny: bool = False, currency: str, cost: int, mastery_slug: str, description=None):
+        if self.balance < cost:
+            raise pets_module.InsufficientBalanceError("Solde insuffisant")
+        self.balance -= cost
+        self.last_added = {
+            "user_id": user_id,
+            "pet_id": pet_id,
+            "is_huge": is_huge,
+            "is_gold": is_gold,
+            "is_rainbow": is_rainbow,
+            "is_galaxy": is_galaxy,
+            "is_shiny": is_shiny,
+        }
+        return {"before": self.balance + cost, "after": self.balance, "pet": {"id": 1}, "mastery": {"levels_gained": 0}}
+
+    async def hatch_eggs_bulk(self, user_id: int, pets, *, currency: str, cost: int, mastery_slug: str, description=None):
+        if self.balance < cost:
+            raise pets_module.InsufficientBalanceError("Solde insuffisant")
+        self.balance -= cost
+        self.bulk_calls.append({"pets": list(pets), "cost": cost, "mastery_slug": mastery_slug})
+        return {"before": self.balance + cost, "after": self.balance, "pets": [], "mastery": {"levels_gained": 0}}
+
     async def get_pet_market_values(self):
         return {}
 
@@ -70,8 +96,8 @@ class DummyDatabase:
     async def get_enchantment_powers(self, user_id: int) -> dict[str, int]:
         return {}
 
-    async def get_unique_pet_count(self, user_id: int) -> int:
-        return 0
+    async def get_pet_index(self, user_id: int) -> PetIndex:
+        return PetIndex()
 
 
 class DummyMessage:
@@ -294,3 +320,166 @@ def test_huge_reference_uses_shiny_variants():
             await bot.close()
 
     asyncio.run(_run())
+
+
+def _legacy_probabilities(egg, luck_bonus: float) -> list[float]:
+    """Probabilités de l'ancien ``random.choices`` sur les poids multipliés."""
+
+    weights = [pet.drop_rate for pet in egg.pets]
+    if luck_bonus > 0 and egg.pets:
+        sorted_indices = sorted(
+            range(len(egg.pets)),
+            key=lambda idx: (egg.pets[idx].drop_rate, -egg.pets[idx].base_income_per_hour),
+        )
+        for idx in sorted_indices[: max(1, len(sorted_indices) // 3)]:
+            weights[idx] *= 1.0 + luck_bonus
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+def test_egg_sampler_matches_legacy_probabilities():
+    for egg in pets_module.PET_EGG_DEFINITIONS:
+        if not egg.pets:
+            continue
+        sampler = pets_module._compile_egg_sampler(egg)
+        for luck_bonus in (0.0, 0.05, 0.35, 1.0, 4.2):
+            multiplier = 1.0 + luck_bonus if luck_bonus > 0 else 1.0
+            expected = _legacy_probabilities(egg, luck_bonus)
+            actual = sampler.probabilities(multiplier)
+            for wanted, got in zip(expected, actual):
+                assert abs(wanted - got) < 1e-12, (egg.slug, luck_bonus)
+
+
+def test_egg_sampler_draws_follow_probabilities():
+    import random
+
+    egg = next(egg for egg in pets_module.PET_EGG_DEFINITIONS if len(egg.pets) >= 3)
+    sampler = pets_module._compile_egg_sampler(egg)
+    rng = random.Random(1234)
+    draws = 200_000
+    counts = [0] * len(egg.pets)
+    for _ in range(draws):
+        counts[sampler.draw_index(1.5, rng.random)] += 1
+
+    for expected, count in zip(_legacy_probabilities(egg, 0.5), counts):
+        assert abs(count / draws - expected) < 0.01
+
+
+def test_bulk_hatch_uses_a_single_database_call(monkeypatch):
+    async def _run():
+        cog, database, bot = await _create_cog()
+        try:
+            monkeypatch.setattr(pets_module, "GOLD_PET_CHANCE", 0.0)
+            monkeypatch.setattr(pets_module, "RAINBOW_PET_CHANCE", 0.0)
+            egg = next(egg for egg in cog._eggs.values() if egg.currency == "pb" and egg.price > 0)
+            database.balance = egg.price * 10
+
+            outcome = await cog._hatch_pets_bulk(
+                DummyContext(),
+                egg,
+                10,
+                mastery_perks=_compute_egg_mastery_perks(1),
+                pet_mastery_perks=_compute_pet_mastery_perks(1),
+            )
+
+            assert outcome is not None
+            results, balance = outcome
+            assert len(results) == 10
+            assert balance == 0
+            (call,) = database.bulk_calls
+            assert call["cost"] == egg.price * 10
+            assert len(call["pets"]) == 10
+            assert database.balance == 0
+
+            assert await cog._hatch_pets_bulk(DummyContext(), egg, 10) is None
+            assert len(database.bulk_calls) == 1
+        finally:
+            await bot.close()
+
+    asyncio.run(_run())
+
+
+def test_bulk_confirmation_runs_outside_the_open_lock(monkeypatch):
+    async def _run():
+        cog, database, bot = await _create_cog()
+        try:
+            egg = next(egg for egg in cog._eggs.values() if egg.price > 0)
+            held_during_prompt: list[bool] = []
+            opened: list[str] = []
+
+            async def _ack(ctx):
+                return None
+
+            async def _confirm(ctx, egg_definition, count, *, channel):
+                held_during_prompt.append(cog._egg_open_locks.locked(ctx.author.id))
+                return count == 10
+
+            async def _open(ctx, request, **kwargs):
+                opened.append(request)
+
+            monkeypatch.setattr(cog, "_ack_heavy_command", _ack)
+            monkeypatch.setattr(cog, "_confirm_bulk_hatch", _confirm)
+            monkeypatch.setattr(cog, "_openbox_impl", _open)
+
+            await cog.openbox.callback(cog, DummyContext(), f"{egg.slug} x100")
+            await cog.openbox.callback(cog, DummyContext(), f"{egg.slug} x10")
+
+            assert held_during_prompt == [False, False]
+            assert opened == [f"{egg.slug} x10"]
+        finally:
+            await bot.close()
+
+    asyncio.run(_run())
+
+
+def test_openbox_request_parsing():
+    parse = pets_module.Pets._parse_openbox_request
+    assert parse("basique x100") == ("basique", False, False, 100)
+    assert parse("basique 100x") == ("basique", False, True, 0)
+    assert parse("oeuf rare gold x2") == ("oeuf rare", True, True, 0)
+    assert parse("basique x7") == ("basique x7", False, False, 0)
+
+
+def test_multi_reveal_embed_groups_identical_pulls():
+    from utils import embeds
+
+    pets = [{"name": "Shelly", "rarity": "Commun", "income_per_hour": 10}] * 40
+    pets += [
+        {"name": f"Pet {index}", "rarity": "Rare", "income_per_hour": index}
+        for index in range(30)
+    ]
+    embed = embeds.pet_multi_reveal_embed(egg_name="Œuf", pets=pets)
+
+    assert len(embed.fields) == embeds._MULTI_REVEAL_MAX_FIELDS
+    assert embed.fields[-1].value == "Et **47** autres pets."
+    assert "Tu obtiens **70** pets" in (embed.description or "")
+
+
+def test_auto_hatch_summary_aggregates_batches():
+    egg = next(egg for egg in pets_module.PET_EGG_DEFINITIONS if egg.pets and egg.currency == "pb")
+    common = egg.pets[0]
+    summary = pets_module.AutoHatchSummary(egg)
+    summary.record(
+        [
+            pets_module.PetHatchResult(definition=common, income_per_hour=10, market_value=0),
+            pets_module.PetHatchResult(
+                definition=common, income_per_hour=40, market_value=0, is_rainbow=True, bonus=True
+            ),
+        ],
+        spent=egg.price,
+    )
+    summary.record(
+        [pets_module.PetHatchResult(definition=common, income_per_hour=10, market_value=0, is_gold=True)],
+        spent=egg.price,
+    )
+
+    assert summary.opened == 3
+    assert summary.bonus == 1
+    assert summary.spent == egg.price * 2
+    assert summary.rarities == {common.rarity: 3}
+    assert summary.variants["Rainbow"] == 1 and summary.variants["Or"] == 1
+    assert [entry["is_rainbow"] for entry in summary.highlights] == [True]
+
+    embed = summary.embed(running=False, stop_reason="Arrêt demandé.")
+    assert "**3**" in (embed.description or "")
+    assert embed.fields[-1].value == "Arrêt demandé."
@@ -4,12 +4,22 @@ from types import SimpleNamespace
 from cogs.pets import Pets
 
 
-def test_get_open_lock_is_reused_for_user() -> None:
+def test_open_lock_serializes_same_user_and_releases_memory() -> None:
     bot = SimpleNamespace(database=SimpleNamespace())
     cog = Pets(bot)
+    order: list[str] = []
 
-    lock_a = cog._get_open_lock(42)
-    lock_b = cog._get_open_lock(42)
+    async def open_egg(user_id: int, label: str) -> None:
+        async with cog._egg_open_locks(user_id):
+            order.append(f"{label}:start")
+            await asyncio.sleep(0)
+            order.append(f"{label}:end")
 
-    assert isinstance(lock_a, asyncio.Lock)
-    assert lock_a is lock_b
+    async def scenario() -> None:
+        await asyncio.gather(open_egg(42, "a"), open_egg(42, "b"))
+
+    asyncio.run(scenario())
+
+    assert order == ["a:start", "a:end", "b:start", "b:end"]
+    assert len(cog._egg_open_locks) == 0
+    assert cog._egg_open_locks.stats().contended == 1
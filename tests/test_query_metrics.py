@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+import asyncpg
+
+from database.instrumentation import (
+    InstrumentedConnection,
+    QueryMetrics,
+    _status_rows,
+    label_queries,
+)
+
+
+def test_percentiles_and_ordering() -> None:
+    metrics = QueryMetrics(window=100, slow_threshold_seconds=10, explain_sample_rate=0)
+    for index in range(100):
+        metrics.observe("get_user_pets", "SELECT 1", (), (index + 1) / 1000, rows=2)
+    metrics.observe("ensure_user", "INSERT", (), 0.001, failed=True)
+
+    first, second = metrics.snapshot()
+    assert first["label"] == "get_user_pets"
+    assert first["calls"] == 100
+    assert first["rows"] == 200
+    assert round(first["p50"] * 1000) in (50, 51)
+    assert round(first["p99"] * 1000) == 99
+    assert second["errors"] == 1
+
+
+def test_slow_queries_are_logged(caplog) -> None:
+    metrics = QueryMetrics(window=10, slow_threshold_seconds=0.1, explain_sample_rate=0)
+    with caplog.at_level(logging.WARNING, logger="database.slow_queries"):
+        metrics.observe("get_pet_rap_leaderboard", "SELECT  *\n FROM users", (), 0.5)
+        metrics.observe("fetch_balance", "SELECT 1", (), 0.01)
+
+    assert metrics.slow_queries == 1
+    assert "get_pet_rap_leaderboard" in caplog.text
+    assert "SELECT * FROM users" in caplog.text
+
+
+def test_status_rows() -> None:
+    assert _status_rows("UPDATE 3") == 3
+    assert _status_rows("COPY 500") == 500
+    assert _status_rows("CREATE TABLE") == 0
+
+
+def _stub_connection(monkeypatch, metrics: QueryMetrics) -> InstrumentedConnection:
+    async def execute(self, query, *args, timeout=None):
+        return "SELECT 1"
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        return 1
+
+    async def noop(self):
+        return None
+
+    monkeypatch.setattr(asyncpg.Connection, "execute", execute)
+    monkeypatch.setattr(asyncpg.Connection, "fetchval", fetchval)
+    monkeypatch.setattr(asyncpg.Connection, "_reset", noop)
+    monkeypatch.setattr(asyncpg.Connection, "get_reset_query", lambda self: "RESET ALL;")
+    connection = InstrumentedConnection.__new__(InstrumentedConnection)
+    # Connexion jamais ouverte : ``__del__`` la voit déjà fermée.
+    connection._aborted = True
+    connection._protocol = None
+    connection.query_metrics = metrics
+    return connection
+
+
+def test_labels_come_from_the_method_and_reset_is_not_counted(monkeypatch) -> None:
+    metrics = QueryMetrics(window=10, slow_threshold_seconds=10, explain_sample_rate=0)
+    connection = _stub_connection(monkeypatch, metrics)
+
+    @label_queries
+    class _Repository:
+        async def get_balance(self) -> int:
+            return await connection.fetchval("SELECT balance FROM users")
+
+    async def scenario() -> None:
+        await _Repository().get_balance()
+        # Nettoyage fait par ``Pool.release`` : hors statistiques.
+        await connection.reset()
+
+    asyncio.run(scenario())
+
+    assert [entry["label"] for entry in metrics.snapshot()] == ["get_balance"]
+    assert metrics.stats["get_balance"].calls == 1
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from database.migrations import (
+    Migration,
+    build_registry,
+    load_sql_migrations,
+    pending_migrations,
+)
+
+
+async def _noop(connection) -> None:
+    return None
+
+
+def test_registry_merges_python_and_sql_migrations_in_order() -> None:
+    sql_migrations = load_sql_migrations()
+    registry = build_registry(
+        (Migration(1, "baseline", _noop), Migration(4, "economy_data", _noop)),
+        sql_migrations,
+    )
+
+    assert [migration.version for migration in registry] == [1, 2, 3, 4]
+    assert [migration.name for migration in sql_migrations] == [
+        "add_config_flags",
+        "add_daily_streak",
+    ]
+    assert [migration.version for migration in pending_migrations(registry, 2)] == [3, 4]
+    assert pending_migrations(registry, 4) == []
+
+
+def test_registry_rejects_duplicate_versions() -> None:
+    with pytest.raises(ValueError):
+        build_registry((Migration(1, "baseline", _noop),), (Migration(1, "other", _noop),))
+
+
+class _FlagConnection:
+    def __init__(self, flags: set[str]) -> None:
+        self.flags = flags
+
+    async def fetchval(self, query: str, names: list[str]) -> int:
+        return sum(1 for name in names if name in self.flags)
+
+
+def test_gems_rebase_factor_change_is_detected_at_boot(monkeypatch) -> None:
+    from database import db as db_module
+
+    database = db_module.Database("postgres://dummy")
+    monkeypatch.setattr(db_module, "GEMS_REBASE_FACTOR", 10)
+    connection = _FlagConnection(set(database._economy_data_flags()))
+    assert not asyncio.run(database._economy_data_pending(connection))
+
+    # Un nouveau facteur a son propre drapeau : la correction repasse.
+    monkeypatch.setattr(db_module, "GEMS_REBASE_FACTOR", 100)
+    assert asyncio.run(database._economy_data_pending(connection))
+    assert all(migration.name != "economy_data" for migration in database._schema_migrations())
@@ -0,0 +1,39 @@
+import asyncio
+
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_load() -> None:
+    calls = 0
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def scenario() -> list[int]:
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run("lb", load) for _ in range(10)))
+        assert len(flight) == 0
+        assert flight.coalesced == 9
+        return results
+
+    assert asyncio.run(scenario()) == [42] * 10
+    assert calls == 1
+
+
+def test_failure_reaches_every_waiter_and_is_not_kept() -> None:
+    async def broken() -> int:
+        await asyncio.sleep(0)
+        raise RuntimeError("requête échouée")
+
+    async def scenario() -> None:
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            flight.run("lb", broken), flight.run("lb", broken), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await flight.run("lb", lambda: asyncio.sleep(0, result=7)) == 7
+
+    asyncio.run(scenario())
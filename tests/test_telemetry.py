@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import asyncpg
+from aiohttp.test_utils import TestClient, TestServer
+
+from database.instrumentation import InstrumentedConnection, InstrumentedPool, QueryMetrics
+from utils.metrics_server import MetricsServer
+from utils.telemetry import (
+    CommandMetrics,
+    CommandTrace,
+    LoopLagMonitor,
+    current_trace,
+    mark_loop,
+    traced_interaction,
+)
+
+
+class _DummyDatabase:
+    def __init__(self) -> None:
+        self.query_metrics = QueryMetrics(window=10, slow_threshold_seconds=10, explain_sample_rate=0)
+        self.connected = True
+
+    def replica_status(self):
+        return {"healthy": 1.0, "lag_seconds": 2.5, "probe_failures": 0, "fallbacks": 1}
+
+    def pool_stats(self):
+        if not self.connected:
+            return None
+        lane = {
+            "size": 4,
+            "idle": 3,
+            "min": 1,
+            "max": 10,
+            "waiting": 0,
+            "acquires": 12,
+            "acquire_timeouts": 0,
+            "acquire_wait_seconds": 0.5,
+            "acquire_wait_max_seconds": 0.2,
+            "acquire_wait_p95_seconds": 0.1,
+        }
+        return {"interactive": lane, "background": dict(lane, size=1)}
+
+
+class _DummyBot:
+    def __init__(self) -> None:
+        self.database = _DummyDatabase()
+        self.command_metrics = CommandMetrics(window=10)
+        self.loop_lag = LoopLagMonitor()
+        self.latency = 0.042
+        self.ready = False
+
+    def is_ready(self) -> bool:
+        return self.ready
+
+    def is_closed(self) -> bool:
+        return False
+
+
+def test_metrics_endpoints() -> None:
+    bot = _DummyBot()
+    bot.command_metrics.observe("openbox", 0.2)
+    bot.command_metrics.observe("openbox", 0.4, failed=True)
+    bot.loop_lag.record(0.015)
+    bot.database.query_metrics.observe("get_user_pets", "SELECT 1", (), 0.01)
+    mark_loop("drops")
+
+    async def scenario() -> None:
+        server = MetricsServer(bot, host="127.0.0.1", port=0)  # type: ignore[arg-type]
+        async with TestClient(TestServer(server.build_app())) as client:
+            assert (await client.get("/healthz")).status == 200
+            assert (await client.get("/readyz")).status == 503
+            bot.ready = True
+            assert (await client.get("/readyz")).status == 200
+
+            response = await client.get("/metrics")
+            assert response.status == 200
+            body = await response.text()
+
+        assert 'ecobot_command_duration_seconds_count{command="openbox"} 2' in body
+        assert 'ecobot_command_errors_total{command="openbox"} 1' in body
+        assert "ecobot_event_loop_lag_seconds 0.015" in body
+        assert "ecobot_gateway_latency_seconds 0.042" in body
+        assert "ecobot_db_replica_lag_seconds 2.5" in body
+        assert 'ecobot_db_pool_idle{lane="interactive"} 3' in body
+        assert 'ecobot_db_pool_size{lane="background"} 1' in body
+        assert 'ecobot_db_pool_acquire_wait_seconds_total{lane="interactive"} 0.5' in body
+        assert 'ecobot_db_queries_total{label="get_user_pets"} 1' in body
+        assert 'ecobot_background_loop_last_run_timestamp_seconds{loop="drops"}' in body
+        assert body.count("# TYPE ecobot_command_duration_seconds summary") == 1
+
+    asyncio.run(scenario())
+
+
+def test_loop_lag_monitor_keeps_window_maximum() -> None:
+    monitor = LoopLagMonitor(window=2)
+    monitor.record(0.5)
+    monitor.record(0.1)
+    monitor.record(-0.01)
+
+    assert monitor.last_lag == 0.0
+    assert monitor.max_lag == 0.1
+
+
+def test_traced_interaction_records_sql_work_and_budget(caplog) -> None:
+    metrics = CommandMetrics(roundtrip_budget=10, budgets={"drop.claim": 2})
+
+    class _View:
+        @traced_interaction("drop.claim")
+        async def claim(self, interaction, button) -> None:
+            trace = current_trace.get()
+            assert trace is not None
+            for _ in range(3):
+                trace.record_statement(0.001, 1)
+
+    interaction = SimpleNamespace(client=SimpleNamespace(command_metrics=metrics))
+    with caplog.at_level(logging.WARNING, logger="utils.telemetry"):
+        asyncio.run(_View().claim(interaction, None))
+
+    assert current_trace.get() is None
+    (entry,) = metrics.snapshot()
+    assert entry["command"] == "drop.claim"
+    assert entry["statements_max"] == 3
+    assert entry["over_budget"] == 1
+    assert "budget 2" in caplog.text
+
+
+def test_pool_round_trip_records_a_single_statement(monkeypatch) -> None:
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        return 1
+
+    async def execute(self, query, *args, timeout=None):
+        return "RESET"
+
+    async def noop(self):
+        return None
+
+    monkeypatch.setattr(asyncpg.Connection, "fetchval", fetchval)
+    monkeypatch.setattr(asyncpg.Connection, "execute", execute)
+    monkeypatch.setattr(asyncpg.Connection, "_reset", noop)
+    monkeypatch.setattr(asyncpg.Connection, "get_reset_query", lambda self: "RESET ALL;")
+    connection = InstrumentedConnection.__new__(InstrumentedConnection)
+    connection._aborted = True
+    connection._protocol = None
+
+    class _Pool:
+        async def acquire(self, *, timeout=None):
+            return connection
+
+        async def release(self, released, *, timeout=None) -> None:
+            # Comme asyncpg : la libération réinitialise la connexion.
+            await released.reset(timeout=timeout)
+
+    trace = CommandTrace("profile")
+
+    async def scenario() -> None:
+        token = current_trace.set(trace)
+        try:
+            async with InstrumentedPool(_Pool(), lane="interactive").acquire() as acquired:
+                await acquired.fetchval("SELECT 1")
+        finally:
+            current_trace.reset(token)
+
+    asyncio.run(scenario())
+
+    assert trace.statements == 1
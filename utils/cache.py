@@ -1,83 +1,231 @@
 """Cache TTL léger en mémoire pour les commandes intensives."""
 from __future__ import annotations
 
+import heapq
 import time
+import weakref
 from collections import OrderedDict
-from typing import Generic, MutableMapping, Optional, Tuple, TypeVar
+from dataclasses import dataclass
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
 
 T = TypeVar("T")
 
+_REGISTRY: "weakref.WeakSet[_ExpiringCache[object]]" = weakref.WeakSet()
 
-class TTLCache(Generic[T]):
-    """Cache en mémoire avec expiration simple."""
 
-    def __init__(self, ttl_seconds: int) -> None:
-        self._ttl = max(0, int(ttl_seconds))
-        self._data: MutableMapping[object, Tuple[float, T]] = {}
+@dataclass(frozen=True)
+class CacheStats:
+    """Compteurs d'un cache depuis sa création."""
 
-    def get(self, key: object) -> Optional[T]:
-        if self._ttl <= 0:
-            return None
-        entry = self._data.get(key)
-        if entry is None:
-            return None
-        expires_at, value = entry
-        if expires_at < time.monotonic():
-            self._data.pop(key, None)
-            return None
-        return value
+    name: str
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    stale_hits: int
+    rejected_sets: int
+    size: int
+    max_entries: int
 
-    def set(self, key: object, value: T, *, ttl_seconds: int | None = None) -> None:
-        ttl = self._ttl if ttl_seconds is None else max(0, int(ttl_seconds))
-        if ttl <= 0:
-            self._data.pop(key, None)
-            return
-        self._data[key] = (time.monotonic() + ttl, value)
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
 
-    def clear(self) -> None:
-        self._data.clear()
 
+class _ExpiringCache(Generic[T]):
+    """Socle commun : tas d'expirations et taille bornée.
 
-class LruTTLCache(Generic[T]):
-    """Cache TTL avec éviction LRU et taille maximale."""
+    Chaque écriture pousse ``(expiration, clé)`` sur un tas ; les entrées
+    expirées sont retirées depuis le sommet en O(log n) amorti au lieu de
+    parcourir tout le dictionnaire. Les positions périmées du tas (clé
+    réécrite ou supprimée) sont ignorées, et le tas est reconstruit dès
+    qu'elles dépassent le nombre d'entrées vivantes.
+
+    Avec ``stale_seconds``, une entrée expirée reste disponible via
+    :meth:`get_stale` pendant ce délai de grâce, le temps qu'un
+    rafraîchissement en arrière-plan la remplace.
+
+    Un chargement lent peut se terminer après l'invalidation de sa clé : on
+    relève :meth:`generation` avant de charger et on la passe à :meth:`set`,
+    qui ignore alors une valeur lue avant la dernière invalidation.
+    """
 
-    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+    _refresh_on_read = False
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int,
+        *,
+        name: str | None = None,
+        stale_seconds: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self._ttl = max(0, int(ttl_seconds))
+        self._clock = clock
+        self._stale = max(0, int(stale_seconds))
         self._max_entries = max(1, int(max_entries))
         self._data: "OrderedDict[object, Tuple[float, T]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, object]] = []
+        self._sequence = 0
+        self.name = name or type(self).__name__
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        self.rejected_sets = 0
+        # Génération courante, et génération de la dernière invalidation de
+        # chaque clé (bornée : au-delà, on retient seulement la plus récente
+        # des invalidations oubliées, ce qui reste prudent).
+        self._generation = 0
+        self._invalidated: "OrderedDict[object, int]" = OrderedDict()
+        self._forgotten_generation = 0
+        _REGISTRY.add(self)
 
-    def _evict_expired(self) -> None:
-        if self._ttl <= 0:
-            self._data.clear()
-            return
-        now = time.monotonic()
-        expired_keys = [key for key, (expires_at, _value) in self._data.items() if expires_at < now]
-        for key in expired_keys:
-            self._data.pop(key, None)
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _purge_expired(self, now: float) -> None:
+        heap = self._expiry_heap
+        while heap and heap[0][0] + self._stale < now:
+            expires_at, _sequence, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del self._data[key]
+                self.expirations += 1
+        if len(heap) > 2 * len(self._data) + 64:
+            self._expiry_heap = [
+                (expires_at, index, key)
+                for index, (key, (expires_at, _value)) in enumerate(self._data.items())
+            ]
+            heapq.heapify(self._expiry_heap)
+            self._sequence = len(self._expiry_heap)
 
     def get(self, key: object) -> Optional[T]:
         if self._ttl <= 0:
             return None
         entry = self._data.get(key)
         if entry is None:
+            self.misses += 1
             return None
         expires_at, value = entry
-        if expires_at < time.monotonic():
-            self._data.pop(key, None)
+        now = self._clock()
+        if expires_at < now:
+            if expires_at + self._stale < now:
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
             return None
-        self._data.move_to_end(key)
+        if self._refresh_on_read:
+            self._data.move_to_end(key)
+        self.hits += 1
         return value
 
-    def set(self, key: object, value: T, *, ttl_seconds: int | None = None) -> None:
+    def get_stale(self, key: object) -> Optional[T]:
+        """Retourne une entrée expirée encore dans son délai de grâce."""
+
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at + self._stale < self._clock():
+            return None
+        self.stale_hits += 1
+        return value
+
+    def generation(self) -> int:
+        """Jeton à relever avant un chargement destiné à :meth:`set`."""
+
+        return self._generation
+
+    def _is_outdated(self, key: object, generation: int) -> bool:
+        if self._forgotten_generation > generation:
+            return True
+        return self._invalidated.get(key, 0) > generation
+
+    def set(
+        self,
+        key: object,
+        value: T,
+        *,
+        ttl_seconds: int | None = None,
+        generation: int | None = None,
+    ) -> None:
+        if generation is not None and self._is_outdated(key, generation):
+            self.rejected_sets += 1
+            return
         ttl = self._ttl if ttl_seconds is None else max(0, int(ttl_seconds))
         if ttl <= 0:
             self._data.pop(key, None)
             return
-        self._data[key] = (time.monotonic() + ttl, value)
+        now = self._clock()
+        expires_at = now + ttl
+        self._data[key] = (expires_at, value)
         self._data.move_to_end(key)
-        self._evict_expired()
+        self._sequence += 1
+        heapq.heappush(self._expiry_heap, (expires_at, self._sequence, key))
+        self._purge_expired(now)
         while len(self._data) > self._max_entries:
             self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: object) -> None:
+        self._data.pop(key, None)
+        self._generation += 1
+        self._invalidated[key] = self._generation
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self._max_entries:
+            _key, forgotten = self._invalidated.popitem(last=False)
+            self._forgotten_generation = forgotten
 
     def clear(self) -> None:
         self._data.clear()
+        self._expiry_heap.clear()
+        self._generation += 1
+        self._invalidated.clear()
+        self._forgotten_generation = self._generation
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            name=self.name,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            stale_hits=self.stale_hits,
+            rejected_sets=self.rejected_sets,
+            size=len(self._data),
+            max_entries=self._max_entries,
+        )
+
+
+class TTLCache(_ExpiringCache[T]):
+    """Cache en mémoire avec expiration et taille bornée (éviction FIFO)."""
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int = 5000,
+        *,
+        name: str | None = None,
+        stale_seconds: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(
+            ttl_seconds, max_entries, name=name, stale_seconds=stale_seconds, clock=clock
+        )
+
+
+class LruTTLCache(_ExpiringCache[T]):
+    """Cache TTL avec éviction LRU et taille maximale."""
+
+    _refresh_on_read = True
+
+
+def cache_stats() -> List[CacheStats]:
+    """Statistiques de tous les caches encore vivants, triées par nom."""
+
+    return sorted((cache.stats() for cache in list(_REGISTRY)), key=lambda stats: stats.name)
+
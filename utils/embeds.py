@@ -13,6 +13,7 @@ from config import (
     Colors,
     Emojis,
     PET_RARITY_COLORS,
+    PET_RARITY_ORDER,
     PREFIX,
     GradeDefinition,
     PetDefinition,
@@ -34,6 +35,10 @@ _BRANDING_REPLACEMENTS: dict[str, str] = {
 
 _PB_EMOJI_PATTERN = re.compile(r"\bPB\b(?!\s*🪙)")
 
+# Discord refuse les embeds de plus de 25 champs ; un champ reste libre pour
+# le détail des bonus de chance ajouté après coup.
+_MULTI_REVEAL_MAX_FIELDS = 24
+
 
 def _apply_branding(text: str | None) -> str | None:
     """Remplace les anciennes références de marque par les nouvelles."""
@@ -717,9 +722,32 @@ def pet_multi_reveal_embed(
     description = f"Tu obtiens **{count}** pets !"
     embed = _base_embed(f"🎁 {egg_name}", description, color=Colors.PRIMARY)
 
+    # Les ouvertures multiples regroupent les tirages identiques pour rester
+    # sous la limite de champs d'un embed Discord.
+    grouped: OrderedDict[tuple[object, ...], list[PetDisplay]] = OrderedDict()
     for display in displays:
-        field_name, field_value = display.multi_reveal_field()
+        key = (display.collection_key(), display.bonus, display.forced)
+        grouped.setdefault(key, []).append(display)
+
+    groups = list(grouped.values())
+    if len(groups) > _MULTI_REVEAL_MAX_FIELDS:
+        groups.sort(
+            key=lambda group: (
+                group[0].is_huge,
+                PET_RARITY_ORDER.get(group[0].rarity, -1),
+                group[0].income_per_hour,
+            ),
+            reverse=True,
+        )
+    shown = groups
+    if len(groups) > _MULTI_REVEAL_MAX_FIELDS:
+        shown = groups[: _MULTI_REVEAL_MAX_FIELDS - 1]
+    for group in shown:
+        field_name, field_value = group[0].multi_reveal_field(quantity=len(group))
         embed.add_field(name=field_name, value=field_value, inline=False)
+    hidden = sum(len(group) for group in groups[len(shown):])
+    if hidden:
+        embed.add_field(name="…", value=f"Et **{hidden}** autres pets.", inline=False)
 
     first_image = displays[0].image_url
     if first_image:
@@ -732,6 +760,61 @@ def pet_multi_reveal_embed(
     return _finalize_embed(embed)
 
 
+def auto_hatch_summary_embed(
+    *,
+    egg_name: str,
+    opened: int,
+    bonus: int,
+    spent_text: str,
+    rarity_counts: Mapping[str, int],
+    variant_counts: Mapping[str, int],
+    highlights: Sequence[Mapping[str, object]],
+    running: bool,
+    notes: Sequence[str] = (),
+    stop_reason: str | None = None,
+) -> discord.Embed:
+    """Récapitulatif unique d'une session AUTO, réédité au fil des lots."""
+
+    status = "⏳ En cours — envoie un message pour arrêter." if running else "⏹️ Terminé."
+    description = "\n".join(
+        [
+            status,
+            f"Œufs ouverts : **{opened}**" + (f" (dont **{bonus}** bonus)" if bonus else ""),
+            f"Dépensé : **{spent_text}**",
+        ]
+    )
+    embed = _base_embed(
+        f"🤖 AUTO — {egg_name}",
+        description,
+        color=Colors.INFO if running else Colors.NEUTRAL,
+    )
+
+    if rarity_counts:
+        ordered = sorted(
+            rarity_counts.items(),
+            key=lambda item: PET_RARITY_ORDER.get(item[0], -1),
+            reverse=True,
+        )
+        embed.add_field(
+            name="Raretés",
+            value="\n".join(f"{rarity} : **{count}**" for rarity, count in ordered),
+            inline=True,
+        )
+    variant_lines = [
+        f"{label} : **{count}**" for label, count in variant_counts.items() if count
+    ]
+    if variant_lines:
+        embed.add_field(name="Variantes", value="\n".join(variant_lines), inline=True)
+    if highlights:
+        lines = [PetDisplay.from_mapping(entry).title() for entry in highlights]
+        embed.add_field(name="Meilleurs tirages", value="\n".join(lines), inline=False)
+    if notes:
+        embed.add_field(name="Améliorations auto", value="\n".join(notes), inline=False)
+    if stop_reason:
+        embed.add_field(name="Arrêt", value=stop_reason, inline=False)
+    return _finalize_embed(embed)
+
+
 def pet_collection_embed(
     *,
     member: discord.abc.User,
@@ -920,7 +1003,9 @@ def pet_index_embed(
     return _finalize_embed(embed)
 
 
-def egg_index_embed(*, eggs: Sequence[PetEggDefinition]) -> discord.Embed:
+def egg_index_embed(
+    *, eggs: Sequence[PetEggDefinition], owned: Collection[str] | None = None
+) -> discord.Embed:
     embed = _base_embed(
         "Index des œufs",
         "Probabilités de drop connues pour chaque œuf.",
@@ -931,10 +1016,13 @@ def egg_index_embed(*, eggs: Sequence[PetEggDefinition]) -> discord.Embed:
         if not egg.pets:
             continue
         lines: list[str] = []
+        discovered = 0
         for pet in egg.pets:
             name = pet.name
             if not name:
                 continue
+            found = owned is not None and name.casefold() in owned
+            discovered += found
             emoji = _pet_emoji(name)
             rarity = pet.rarity
             if pet.is_huge:
@@ -949,8 +1037,9 @@ def egg_index_embed(*, eggs: Sequence[PetEggDefinition]) -> discord.Embed:
                     chance_text = f"{formatted}%"
             emoji_prefix = f"{emoji} " if emoji else ""
             marker = " ✨" if pet.is_huge else ""
+            status = "✅ " if found else ""
             lines.append(
-                f"{emoji_prefix}**{name}** ({rarity}) — {chance_text}{marker}"
+                f"{status}{emoji_prefix}**{name}** ({rarity}) — {chance_text}{marker}"
             )
 
         if not lines:
@@ -963,11 +1052,16 @@ def egg_index_embed(*, eggs: Sequence[PetEggDefinition]) -> discord.Embed:
             else:
                 price_display = format_currency(egg.price)
             field_name = f"{egg.name} — {price_display}"
+            if owned is not None:
+                field_name = f"{field_name} · {discovered}/{len(lines)}"
             if len(chunks) > 1:
                 field_name = f"{field_name} ({index})"
             embed.add_field(name=field_name, value=value, inline=False)
 
-    embed.set_footer(text="Les chances indiquées sont susceptibles de changer avec les mises à jour.")
+    footer = "Les chances indiquées sont susceptibles de changer avec les mises à jour."
+    if owned is not None:
+        footer = f"✅ Pet déjà découvert · {footer}"
+    embed.set_footer(text=footer)
     return _finalize_embed(embed)
 
 
@@ -0,0 +1,128 @@
+"""Verrous asyncio par clé (joueur…) à mémoire bornée et contention mesurée."""
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Hashable, List
+
+_REGISTRY: "weakref.WeakSet[KeyedLock]" = weakref.WeakSet()
+
+
+@dataclass(frozen=True)
+class KeyedLockStats:
+    """Compteurs d'un :class:`KeyedLock` depuis sa création."""
+
+    name: str
+    active_keys: int
+    held: int
+    waiting: int
+    acquisitions: int
+    contended: int
+    wait_seconds: float
+    max_wait_seconds: float
+
+
+class _Entry:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+class KeyedLock:
+    """Sérialise les sections critiques qui partagent une même clé.
+
+    Chaque verrou est compté par référence : il disparaît dès que plus
+    personne ne le détient ni ne l'attend, si bien que la table ne contient
+    que les clés actives. Avec ``stripes``, les clés sont réparties sur un
+    nombre fixe de verrous préalloués (deux clés peuvent alors partager un
+    verrou, en échange d'une mémoire constante).
+    """
+
+    def __init__(self, name: str, *, stripes: int = 0) -> None:
+        self.name = name
+        self._stripes = max(0, int(stripes))
+        self._entries: Dict[Hashable, _Entry] = {}
+        if self._stripes:
+            for index in range(self._stripes):
+                self._entries[index] = _Entry()
+        self.held = 0
+        self.waiting = 0
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        _REGISTRY.add(self)
+
+    def __len__(self) -> int:
+        if self._stripes:
+            return sum(1 for entry in self._entries.values() if entry.refs)
+        return len(self._entries)
+
+    def _slot(self, key: Hashable) -> Hashable:
+        return hash(key) % self._stripes if self._stripes else key
+
+    def locked(self, key: Hashable) -> bool:
+        entry = self._entries.get(self._slot(key))
+        return entry is not None and entry.lock.locked()
+
+    def _release_ref(self, slot: Hashable, entry: _Entry) -> None:
+        entry.refs -= 1
+        if entry.refs == 0 and not self._stripes:
+            self._entries.pop(slot, None)
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        slot = self._slot(key)
+        entry = self._entries.get(slot)
+        if entry is None:
+            entry = self._entries[slot] = _Entry()
+        entry.refs += 1
+
+        contended = entry.lock.locked()
+        if contended:
+            self.contended += 1
+            self.waiting += 1
+        start = time.monotonic()
+        try:
+            await entry.lock.acquire()
+        except BaseException:
+            self._release_ref(slot, entry)
+            raise
+        finally:
+            if contended:
+                self.waiting -= 1
+                waited = time.monotonic() - start
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self.acquisitions += 1
+        self.held += 1
+        try:
+            yield
+        finally:
+            self.held -= 1
+            entry.lock.release()
+            self._release_ref(slot, entry)
+
+    def stats(self) -> KeyedLockStats:
+        return KeyedLockStats(
+            name=self.name,
+            active_keys=len(self),
+            held=self.held,
+            waiting=self.waiting,
+            acquisitions=self.acquisitions,
+            contended=self.contended,
+            wait_seconds=self.wait_seconds,
+            max_wait_seconds=self.max_wait_seconds,
+        )
+
+
+def keyed_lock_stats() -> List[KeyedLockStats]:
+    """Statistiques de tous les verrous par clé encore vivants, triées par nom."""
+
+    return sorted((lock.stats() for lock in list(_REGISTRY)), key=lambda stats: stats.name)
@@ -0,0 +1,105 @@
+"""Agrégation en mémoire des messages avant écriture groupée en base."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover - import uniquement pour le typage
+    from database.db import Database
+
+logger = logging.getLogger(__name__)
+
+ActivityKey = Tuple[int, int]
+# ``(user_id, montant brut d'un message)`` : le bonus de rebirth s'applique
+# message par message, on garde donc le nombre de messages par montant.
+RewardKey = Tuple[int, int]
+
+
+class MessageIngestBuffer:
+    """Accumule l'activité et les récompenses de messages puis les vide par lots.
+
+    Les cogs signalent chaque message via :meth:`add_activity` et
+    :meth:`add_reward` ; une tâche de fond applique périodiquement le lot avec
+    :meth:`Database.apply_message_batch`, en une seule transaction.
+    """
+
+    def __init__(
+        self,
+        database: "Database",
+        *,
+        flush_interval: float,
+        max_pending: int,
+    ) -> None:
+        self._database = database
+        self._flush_interval = max(0.5, float(flush_interval))
+        self._max_pending = max(1, int(max_pending))
+        self._activity: Dict[ActivityKey, Tuple[int, datetime]] = {}
+        self._rewards: Counter[RewardKey] = Counter()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._activity) + len(self._rewards)
+
+    def add_activity(self, guild_id: int, user_id: int) -> None:
+        key = (int(guild_id), int(user_id))
+        now = datetime.now(timezone.utc)
+        count, _last = self._activity.get(key, (0, now))
+        self._activity[key] = (count + 1, now)
+        self._maybe_wake()
+
+    def add_reward(self, user_id: int, amount: int) -> None:
+        if amount <= 0:
+            return
+        self._rewards[(int(user_id), int(amount))] += 1
+        self._maybe_wake()
+
+    def _maybe_wake(self) -> None:
+        if self.pending >= self._max_pending:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Échec de l'écriture groupée des messages")
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._activity and not self._rewards:
+                return
+            activity, self._activity = self._activity, {}
+            rewards, self._rewards = self._rewards, Counter()
+            try:
+                await self._database.apply_message_batch(activity, rewards)
+            except BaseException:
+                # Le lot est réinjecté pour être retenté au prochain cycle.
+                for key, (count, last_at) in activity.items():
+                    current_count, current_last = self._activity.get(key, (0, last_at))
+                    self._activity[key] = (current_count + count, max(current_last, last_at))
+                self._rewards.update(rewards)
+                raise
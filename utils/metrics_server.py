@@ -0,0 +1,201 @@
+"""Serveur HTTP de santé et de métriques (Prometheus) exécuté sur la boucle du bot."""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from aiohttp import web
+
+from utils.cache import cache_stats
+from utils.keyed_lock import keyed_lock_stats
+from utils.telemetry import PrometheusWriter, render_command_metrics, render_loop_runs
+
+if TYPE_CHECKING:  # pragma: no cover - import uniquement pour le typage
+    from main import EcoBot
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics(bot: "EcoBot") -> str:
+    """Exposition Prometheus de l'état courant du bot."""
+
+    writer = PrometheusWriter()
+    writer.gauge("ecobot_up", "Le processus répond.", 1)
+    writer.gauge("ecobot_ready", "Le bot est connecté à la gateway Discord.", int(bot.is_ready()))
+    writer.gauge(
+        "ecobot_gateway_latency_seconds",
+        "Latence du heartbeat de la gateway Discord.",
+        float(bot.latency),
+    )
+    writer.gauge(
+        "ecobot_event_loop_lag_seconds",
+        "Retard de la dernière mesure de l'event loop.",
+        bot.loop_lag.last_lag,
+    )
+    writer.gauge(
+        "ecobot_event_loop_lag_max_seconds",
+        "Retard maximal de l'event loop sur la fenêtre récente.",
+        bot.loop_lag.max_lag,
+    )
+
+    lanes = bot.database.pool_stats() or {}
+    for key, kind, help_text in (
+        ("size", "gauge", "Connexions ouvertes dans le pool asyncpg."),
+        ("idle", "gauge", "Connexions libres dans le pool asyncpg."),
+        ("min", "gauge", "Taille minimale du pool asyncpg."),
+        ("max", "gauge", "Taille maximale du pool asyncpg."),
+        ("waiting", "gauge", "Coroutines en attente d'une connexion."),
+        ("acquires", "counter", "Connexions obtenues du pool."),
+        ("acquire_timeouts", "counter", "Attentes de connexion expirées."),
+        ("acquire_wait_seconds", "counter", "Attente cumulée d'une connexion."),
+        ("acquire_wait_max_seconds", "gauge", "Attente maximale d'une connexion."),
+        ("acquire_wait_p95_seconds", "gauge", "95e centile d'attente sur la fenêtre récente."),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        writer.metric(
+            f"ecobot_db_pool_{key}{suffix}",
+            kind,
+            help_text,
+            [({"lane": lane}, stats[key]) for lane, stats in sorted(lanes.items())],
+        )
+
+    replica = bot.database.replica_status()
+    if replica is not None:
+        writer.gauge("ecobot_db_replica_healthy", "Le réplica sert les lectures.", replica["healthy"])
+        writer.gauge(
+            "ecobot_db_replica_lag_seconds",
+            "Retard de rejeu du réplica (-1 si inconnu).",
+            replica["lag_seconds"],
+        )
+        writer.metric(
+            "ecobot_db_replica_fallbacks_total",
+            "counter",
+            "Lectures renvoyées au primaire après une erreur du réplica.",
+            [({}, replica["fallbacks"])],
+        )
+
+    render_command_metrics(writer, bot.command_metrics)
+    render_loop_runs(writer)
+
+    caches = cache_stats()
+    for attribute, kind, help_text in (
+        ("hits", "counter", "Lectures servies par le cache."),
+        ("misses", "counter", "Lectures absentes du cache."),
+        ("stale_hits", "counter", "Lectures servies depuis le délai de grâce."),
+        ("rejected_sets", "counter", "Chargements ignorés car lus avant une invalidation."),
+        ("evictions", "counter", "Entrées évincées faute de place."),
+        ("expirations", "counter", "Entrées expirées."),
+        ("size", "gauge", "Entrées présentes."),
+        ("max_entries", "gauge", "Capacité maximale."),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        writer.metric(
+            f"ecobot_cache_{attribute}{suffix}",
+            kind,
+            help_text,
+            [({"cache": stats.name}, getattr(stats, attribute)) for stats in caches],
+        )
+
+    locks = keyed_lock_stats()
+    for attribute, kind, help_text in (
+        ("active_keys", "gauge", "Clés ayant un verrou détenu ou attendu."),
+        ("held", "gauge", "Verrous actuellement détenus."),
+        ("waiting", "gauge", "Coroutines en attente d'un verrou."),
+        ("acquisitions", "counter", "Verrous obtenus."),
+        ("contended", "counter", "Acquisitions ayant dû attendre."),
+        ("wait_seconds", "counter", "Attente cumulée des acquisitions contestées."),
+        ("max_wait_seconds", "gauge", "Attente maximale observée."),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        writer.metric(
+            f"ecobot_keyed_lock_{attribute}{suffix}",
+            kind,
+            help_text,
+            [({"lock": stats.name}, getattr(stats, attribute)) for stats in locks],
+        )
+
+    queries = bot.database.query_metrics.snapshot()
+    writer.metric(
+        "ecobot_db_queries_total",
+        "counter",
+        "Requêtes SQL exécutées par méthode appelante.",
+        [({"label": entry["label"]}, entry["calls"]) for entry in queries],
+    )
+    writer.metric(
+        "ecobot_db_query_errors_total",
+        "counter",
+        "Requêtes SQL en échec par méthode appelante.",
+        [({"label": entry["label"]}, entry["errors"]) for entry in queries],
+    )
+    writer.metric(
+        "ecobot_db_query_seconds_total",
+        "counter",
+        "Temps SQL cumulé par méthode appelante.",
+        [({"label": entry["label"]}, entry["total_seconds"]) for entry in queries],
+    )
+    writer.metric(
+        "ecobot_db_query_p95_seconds",
+        "gauge",
+        "95e centile de latence SQL sur la fenêtre récente.",
+        [({"label": entry["label"]}, entry["p95"]) for entry in queries],
+    )
+    return writer.render()
+
+
+class MetricsServer:
+    """Expose ``/healthz``, ``/readyz`` et ``/metrics`` pour Koyeb et Prometheus."""
+
+    def __init__(self, bot: "EcoBot", *, host: str, port: int) -> None:
+        self._bot = bot
+        self._host = host
+        self._port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/healthz", self._healthz)
+        app.router.add_get("/readyz", self._readyz)
+        app.router.add_get("/metrics", self._metrics)
+        return app
+
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+        runner = web.AppRunner(self.build_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self._host, self._port)
+        try:
+            await site.start()
+        except OSError:
+            await runner.cleanup()
+            logger.exception("Impossible d'ouvrir le serveur de métriques sur le port %s", self._port)
+            return
+        self._runner = runner
+        logger.info("Serveur de métriques à l'écoute sur %s:%s", self._host, self._port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _healthz(self, _request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def _readyz(self, _request: web.Request) -> web.Response:
+        bot = self._bot
+        ready = bot.is_ready() and not bot.is_closed() and bot.database.pool_stats() is not None
+        if not ready:
+            return web.Response(status=503, text="not ready")
+        return web.Response(text="ready")
+
+    async def _metrics(self, _request: web.Request) -> web.Response:
+        try:
+            body = render_metrics(self._bot)
+        except Exception:
+            logger.exception("Impossible de produire les métriques")
+            return web.Response(status=500, text="metrics unavailable")
+        return web.Response(
+            body=body.encode("utf-8"), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE}
+        )
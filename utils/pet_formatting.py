@@ -162,8 +162,10 @@ class PetDisplay:
             lines.append(f"Valeur marché : **{format_gems(self.market_value)}**")
         return lines
 
-    def multi_reveal_field(self) -> tuple[str, str]:
+    def multi_reveal_field(self, *, quantity: int = 1) -> tuple[str, str]:
         field_name = f"{self.emoji} {self.name}"
+        if quantity > 1:
+            field_name += f" ×{quantity}"
         lines = [
             f"Rareté : **{self.rarity}**",
             f"Revenus : **{self.income_text}**",
@@ -0,0 +1,126 @@
+"""Tirages pondérés en O(1) par tables d'alias (méthode de Walker/Vose)."""
+from __future__ import annotations
+
+import random
+from typing import Callable, Generic, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+Uniform = Callable[[], float]
+
+
+class AliasTable:
+    """Table d'alias construite une fois pour des poids fixes.
+
+    Chaque colonne ``i`` garde l'issue ``i`` avec la probabilité
+    ``prob[i]`` et renvoie ``alias[i]`` sinon : un tirage coûte un nombre
+    aléatoire, quel que soit le nombre d'issues.
+    """
+
+    __slots__ = ("prob", "alias", "total")
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError("Au moins un poids strictement positif est requis")
+        scaled = [float(weight) * count / total for weight in weights]
+        prob = [1.0] * count
+        alias = list(range(count))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            prob[low] = scaled[low]
+            alias[low] = high
+            scaled[high] = (scaled[high] + scaled[low]) - 1.0
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Les restes valent 1 aux erreurs d'arrondi près : colonnes pleines.
+        for index in small + large:
+            prob[index] = 1.0
+        self.prob: Tuple[float, ...] = tuple(prob)
+        self.alias: Tuple[int, ...] = tuple(alias)
+        self.total = total
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def draw(self, uniform: Uniform = random.random) -> int:
+        # Un seul tirage : la partie entière choisit la colonne, la partie
+        # fractionnaire tranche entre l'issue et son alias.
+        point = uniform() * len(self.prob)
+        column = min(int(point), len(self.prob) - 1)
+        return column if point - column < self.prob[column] else self.alias[column]
+
+    def probabilities(self) -> List[float]:
+        """Probabilités effectives encodées par la table."""
+
+        count = len(self.prob)
+        result = [0.0] * count
+        for column, keep in enumerate(self.prob):
+            result[column] += keep / count
+            result[self.alias[column]] += (1.0 - keep) / count
+        return result
+
+
+class BoostedSampler(Generic[T]):
+    """Tirage pondéré dont un sous-ensemble « boosté » peut être multiplié.
+
+    Multiplier tous les poids du sous-ensemble par ``m`` ne change pas leurs
+    rapports internes : on tire d'abord le groupe (boosté avec probabilité
+    ``m·B / (m·B + C)``), puis l'issue dans la table d'alias du groupe. Les
+    trois tables sont construites une fois ; chaque tirage reste en O(1) pour
+    n'importe quel multiplicateur, avec exactement les mêmes probabilités
+    que ``random.choices`` sur les poids multipliés.
+    """
+
+    def __init__(
+        self, items: Sequence[T], weights: Sequence[float], boosted: Sequence[int]
+    ) -> None:
+        self.items: Tuple[T, ...] = tuple(items)
+        self._weights = tuple(float(weight) for weight in weights)
+        boosted_set = set(boosted)
+        self._boosted = tuple(index for index in range(len(self.items)) if index in boosted_set)
+        self._regular = tuple(
+            index for index in range(len(self.items)) if index not in boosted_set
+        )
+        self._full = AliasTable(self._weights)
+        self._boosted_total = sum(self._weights[index] for index in self._boosted)
+        self._regular_total = sum(self._weights[index] for index in self._regular)
+        self._boosted_table = self._group_table(self._boosted, self._boosted_total)
+        self._regular_table = self._group_table(self._regular, self._regular_total)
+
+    def _group_table(self, indices: Sequence[int], total: float) -> AliasTable | None:
+        if total <= 0:
+            return None
+        return AliasTable([self._weights[index] for index in indices])
+
+    def _boosted_share(self, multiplier: float) -> float:
+        boosted = self._boosted_total * multiplier
+        return boosted / (boosted + self._regular_total)
+
+    def draw_index(self, multiplier: float = 1.0, uniform: Uniform = random.random) -> int:
+        if multiplier == 1.0 or self._boosted_table is None or self._regular_table is None:
+            return self._full.draw(uniform)
+        if uniform() < self._boosted_share(multiplier):
+            return self._boosted[self._boosted_table.draw(uniform)]
+        return self._regular[self._regular_table.draw(uniform)]
+
+    def draw(self, multiplier: float = 1.0, uniform: Uniform = random.random) -> T:
+        return self.items[self.draw_index(multiplier, uniform)]
+
+    def probabilities(self, multiplier: float = 1.0) -> List[float]:
+        """Probabilités effectives de chaque issue pour ``multiplier``."""
+
+        if multiplier == 1.0 or self._boosted_table is None or self._regular_table is None:
+            return self._full.probabilities()
+        share = self._boosted_share(multiplier)
+        result = [0.0] * len(self.items)
+        for group, table, weight in (
+            (self._boosted, self._boosted_table, share),
+            (self._regular, self._regular_table, 1.0 - share),
+        ):
+            for position, probability in enumerate(table.probabilities()):
+                result[group[position]] += weight * probability
+        return result
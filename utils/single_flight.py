@@ -0,0 +1,61 @@
+"""Regroupement des lectures concurrentes sur une même clé (« single-flight »)."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Garantit qu'une seule coroutine par clé est en cours à un instant donné.
+
+    Les appelants concurrents attendent la même tâche et reçoivent son résultat
+    (ou son exception). La tâche est protégée par :func:`asyncio.shield` :
+    l'annulation d'un appelant n'interrompt pas la requête des autres.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task[object]] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def _start(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> asyncio.Task[T]:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task  # type: ignore[return-value]
+
+        async def runner() -> T:
+            try:
+                return await factory()
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.create_task(runner())
+        self._inflight[key] = task  # type: ignore[assignment]
+        self.started += 1
+        return task  # type: ignore[return-value]
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        return await asyncio.shield(self._start(key, factory))
+
+    def refresh(self, key: Hashable, factory: Callable[[], Awaitable[object]]) -> None:
+        """Lance (au plus une fois) un rafraîchissement en arrière-plan."""
+
+        task = self._start(key, factory)
+        task.add_done_callback(self._log_background_failure)
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Task[object]) -> None:
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.warning("Rafraîchissement en arrière-plan échoué : %s", exc)
@@ -0,0 +1,378 @@
+"""Télémétrie du processus : commandes, boucles de fond et latence de l'event loop."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import logging
+import math
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+# Dernier passage (horodatage Unix) de chaque boucle ``tasks.loop`` instrumentée.
+_LOOP_RUNS: Dict[str, float] = {}
+
+
+def mark_loop(name: str) -> None:
+    """Signale qu'une boucle de fond vient de démarrer une itération."""
+
+    _LOOP_RUNS[name] = time.time()
+
+
+def loop_runs() -> Dict[str, float]:
+    return dict(_LOOP_RUNS)
+
+
+def _percentile(ordered: Sequence[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+@dataclass
+class CommandTrace:
+    """Travail SQL accumulé pendant une commande ou un callback d'interaction."""
+
+    name: str
+    statements: int = 0
+    rows: int = 0
+    sql_seconds: float = 0.0
+    acquire_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    def record_statement(self, elapsed: float, rows: int) -> None:
+        self.statements += 1
+        self.rows += rows
+        self.sql_seconds += elapsed
+
+
+# Trace de la commande en cours : la couche ``Database`` l'alimente à chaque
+# requête et à chaque attente de connexion du pool.
+current_trace: ContextVar[Optional[CommandTrace]] = ContextVar("current_trace", default=None)
+
+
+@dataclass
+class CommandStats:
+    """Compteurs cumulés et fenêtre glissante de durées pour une commande."""
+
+    window: int
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    statements: int = 0
+    rows: int = 0
+    sql_seconds: float = 0.0
+    acquire_seconds: float = 0.0
+    max_statements: int = 0
+    over_budget: int = 0
+    latencies: Deque[float] = field(default_factory=deque)
+
+    def __post_init__(self) -> None:
+        self.latencies = deque(maxlen=max(1, self.window))
+
+    def observe(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.total_seconds += elapsed
+        if failed:
+            self.errors += 1
+        self.latencies.append(elapsed)
+
+    def observe_trace(self, trace: CommandTrace) -> None:
+        self.statements += trace.statements
+        self.rows += trace.rows
+        self.sql_seconds += trace.sql_seconds
+        self.acquire_seconds += trace.acquire_seconds
+        self.max_statements = max(self.max_statements, trace.statements)
+
+    def percentiles(self) -> Tuple[float, float, float]:
+        ordered = sorted(self.latencies)
+        return (
+            _percentile(ordered, 0.50),
+            _percentile(ordered, 0.95),
+            _percentile(ordered, 0.99),
+        )
+
+
+class CommandMetrics:
+    """Registre des durées d'exécution, indexé par nom qualifié de commande.
+
+    ``roundtrip_budget`` borne le nombre de requêtes SQL attendu par commande
+    (0 le désactive) ; ``budgets`` le précise commande par commande. Chaque
+    dépassement est journalisé et compté.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: int = 256,
+        roundtrip_budget: int = 0,
+        budgets: Mapping[str, int] | None = None,
+    ) -> None:
+        self._window = max(1, int(window))
+        self._default_budget = max(0, int(roundtrip_budget))
+        self._budgets = {name: max(0, int(value)) for name, value in (budgets or {}).items()}
+        self.stats: Dict[str, CommandStats] = {}
+
+    def _stats_for(self, command: str) -> CommandStats:
+        stats = self.stats.get(command)
+        if stats is None:
+            stats = self.stats[command] = CommandStats(self._window)
+        return stats
+
+    def budget_for(self, command: str) -> int:
+        return self._budgets.get(command, self._default_budget)
+
+    def observe(
+        self,
+        command: str,
+        elapsed: float,
+        *,
+        failed: bool = False,
+        trace: CommandTrace | None = None,
+    ) -> None:
+        stats = self._stats_for(command)
+        stats.observe(max(0.0, elapsed), failed)
+        if trace is None:
+            return
+        stats.observe_trace(trace)
+        budget = self.budget_for(command)
+        if budget and trace.statements > budget:
+            stats.over_budget += 1
+            logger.warning(
+                "Commande %s : %d requêtes SQL (budget %d), %d lignes, "
+                "%.0f ms SQL, %.0f ms d'attente du pool, %.0f ms au total",
+                command,
+                trace.statements,
+                budget,
+                trace.rows,
+                trace.sql_seconds * 1000,
+                trace.acquire_seconds * 1000,
+                elapsed * 1000,
+            )
+
+    def finish(self, trace: CommandTrace, *, failed: bool = False) -> None:
+        self.observe(
+            trace.name, time.perf_counter() - trace.started, failed=failed, trace=trace
+        )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Résumé par commande, trié par temps total décroissant."""
+
+        summary: List[Dict[str, Any]] = []
+        for command, stats in self.stats.items():
+            p50, p95, p99 = stats.percentiles()
+            calls = max(1, stats.calls)
+            summary.append(
+                {
+                    "command": command,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "total_seconds": stats.total_seconds,
+                    "p50": p50,
+                    "p95": p95,
+                    "p99": p99,
+                    "statements_avg": stats.statements / calls,
+                    "statements_max": stats.max_statements,
+                    "rows_avg": stats.rows / calls,
+                    "sql_seconds": stats.sql_seconds,
+                    "acquire_seconds": stats.acquire_seconds,
+                    "budget": self.budget_for(command),
+                    "over_budget": stats.over_budget,
+                }
+            )
+        summary.sort(key=lambda entry: entry["total_seconds"], reverse=True)
+        return summary
+
+
+def traced_interaction(
+    name: str,
+) -> Callable[[Callable[..., Awaitable[R]]], Callable[..., Awaitable[R]]]:
+    """Trace un callback de composant (``callback(self, interaction, ...)``).
+
+    Les requêtes émises pendant le callback sont rattachées à ``name`` dans
+    ``interaction.client.command_metrics``, comme une commande préfixée.
+    """
+
+    def decorator(callback: Callable[..., Awaitable[R]]) -> Callable[..., Awaitable[R]]:
+        @functools.wraps(callback)
+        async def wrapper(self: Any, interaction: Any, *args: Any) -> R:
+            trace = CommandTrace(name)
+            token = current_trace.set(trace)
+            failed = False
+            try:
+                return await callback(self, interaction, *args)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                current_trace.reset(token)
+                metrics = getattr(interaction.client, "command_metrics", None)
+                if isinstance(metrics, CommandMetrics):
+                    metrics.finish(trace, failed=failed)
+
+        return wrapper
+
+    return decorator
+
+
+class LoopLagMonitor:
+    """Mesure le retard de l'event loop en dormant à intervalle fixe.
+
+    L'écart entre le réveil attendu et le réveil réel correspond au temps
+    pendant lequel une coroutine a monopolisé la boucle.
+    """
+
+    def __init__(self, *, interval: float = 0.5, window: int = 120) -> None:
+        self._interval = max(0.05, float(interval))
+        self._samples: Deque[float] = deque(maxlen=max(1, int(window)))
+        self._task: asyncio.Task[None] | None = None
+        self.last_lag = 0.0
+
+    @property
+    def max_lag(self) -> float:
+        return max(self._samples, default=0.0)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def record(self, lag: float) -> None:
+        self.last_lag = max(0.0, lag)
+        self._samples.append(self.last_lag)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self.record(loop.time() - expected)
+
+
+def _escape_label(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class PrometheusWriter:
+    """Construit une exposition au format texte Prometheus (version 0.0.4)."""
+
+    def __init__(self) -> None:
+        self._lines: List[str] = []
+        self._declared: set[str] = set()
+
+    def metric(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        samples: Iterable[Tuple[Dict[str, object], float]],
+        *,
+        suffix: str = "",
+    ) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if labels:
+                rendered = ",".join(
+                    f'{key}="{_escape_label(label)}"' for key, label in labels.items()
+                )
+                self._lines.append(f"{name}{suffix}{{{rendered}}} {_format_value(value)}")
+            else:
+                self._lines.append(f"{name}{suffix} {_format_value(value)}")
+
+    def gauge(self, name: str, help_text: str, value: float) -> None:
+        self.metric(name, "gauge", help_text, [({}, value)])
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def render_command_metrics(writer: PrometheusWriter, metrics: CommandMetrics) -> None:
+    quantiles: List[Tuple[Dict[str, object], float]] = []
+    sums: List[Tuple[Dict[str, object], float]] = []
+    counts: List[Tuple[Dict[str, object], float]] = []
+    errors: List[Tuple[Dict[str, object], float]] = []
+    for command, stats in sorted(metrics.stats.items()):
+        for quantile, value in zip(("0.5", "0.95", "0.99"), stats.percentiles()):
+            quantiles.append(({"command": command, "quantile": quantile}, value))
+        sums.append(({"command": command}, stats.total_seconds))
+        counts.append(({"command": command}, stats.calls))
+        errors.append(({"command": command}, stats.errors))
+    help_text = "Durée d'exécution des commandes."
+    writer.metric("ecobot_command_duration_seconds", "summary", help_text, quantiles)
+    writer.metric("ecobot_command_duration_seconds", "summary", help_text, sums, suffix="_sum")
+    writer.metric("ecobot_command_duration_seconds", "summary", help_text, counts, suffix="_count")
+    writer.metric(
+        "ecobot_command_errors_total", "counter", "Commandes terminées en erreur.", errors
+    )
+    for metric, attribute, help_text in (
+        ("ecobot_command_sql_statements_total", "statements", "Requêtes SQL émises par commande."),
+        ("ecobot_command_sql_rows_total", "rows", "Lignes SQL lues ou écrites par commande."),
+        ("ecobot_command_sql_seconds_total", "sql_seconds", "Temps SQL cumulé par commande."),
+        (
+            "ecobot_command_pool_wait_seconds_total",
+            "acquire_seconds",
+            "Attente cumulée d'une connexion du pool par commande.",
+        ),
+        (
+            "ecobot_command_over_budget_total",
+            "over_budget",
+            "Exécutions ayant dépassé le budget de requêtes SQL.",
+        ),
+    ):
+        writer.metric(
+            metric,
+            "counter",
+            help_text,
+            [
+                ({"command": command}, getattr(stats, attribute))
+                for command, stats in sorted(metrics.stats.items())
+            ],
+        )
+
+
+def render_loop_runs(writer: PrometheusWriter, runs: Optional[Dict[str, float]] = None) -> None:
+    samples = sorted((runs if runs is not None else loop_runs()).items())
+    writer.metric(
+        "ecobot_background_loop_last_run_timestamp_seconds",
+        "gauge",
+        "Horodatage Unix de la dernière itération des boucles de fond.",
+        [({"loop": name}, timestamp) for name, timestamp in samples],
+    )